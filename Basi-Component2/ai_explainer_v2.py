@@ -9,22 +9,166 @@ import re
 import sys
 import json
 import base64
+import itertools
 import subprocess
 import threading
 import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeout
 from dotenv import load_dotenv
+from service_protocol import FrameReader, write_frame
 from typing import Dict, Optional
 
 load_dotenv()
 
 
-class ModelServiceClient:
-    """Client for communicating with the model service subprocess"""
+class ModelServiceAPI(ABC):
+    """
+    Request helpers shared by a single model service client and a pool of
+    them. Subclasses provide submit(), _forget() and an is_ready flag;
+    everything else is built on those.
+    """
     
-    def __init__(self):
+    # Seconds to wait for a response before giving up on a request
+    REQUEST_TIMEOUT = 30
+    
+    is_ready = False
+    
+    @abstractmethod
+    def submit(self, request: dict) -> Optional[Future]:
+        """Send a request without waiting; None when nothing can take it"""
+    
+    @abstractmethod
+    def _forget(self, future: Future):
+        """Stop tracking a request whose caller gave up waiting"""
+    
+    def _send_request(self, request: dict, timeout: Optional[float] = None):
+        """Send a request to the model service and wait for its answer"""
+        future = self.submit(request)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout or self.REQUEST_TIMEOUT)
+        except FutureTimeout:
+            print(f"⚠ Model service did not answer {request.get('action')} in time")
+            self._forget(future)
+            return None
+    
+    def compare(self, artifact1_id: str, artifact2_id: str) -> Optional[dict]:
+        """Compare two artifacts using the trained model"""
+        return self._send_request({
+            "action": "compare",
+            "artifact1_id": artifact1_id,
+            "artifact2_id": artifact2_id
+        })
+    
+    @staticmethod
+    def _unpack_ranking(result):
+        """
+        Turn a ranking response (ids plus score arrays) into a list of
+        {'id', 'similarity_score', ...} entries; errors pass through
+        """
+        if not isinstance(result, dict) or "ids" not in result:
+            return result
+        entries = []
+        for i, artifact_id in enumerate(result["ids"]):
+            entry = {"id": artifact_id, "similarity_score": float(result["scores"][i])}
+            if "same_cluster" in result:
+                entry["same_cluster"] = bool(result["same_cluster"][i])
+            if "field_scores" in result:
+                entry["field_scores"] = dict(zip(result["fields"],
+                                                 result["field_scores"][i].tolist()))
+            entries.append(entry)
+        return entries
+    
+    def find_similar(self, artifact_id: str, top_k: int = 5,
+                     n_probe: Optional[int] = None,
+                     field_weights: Optional[Dict[str, float]] = None) -> Optional[list]:
+        """
+        Find similar artifacts (ids and scores, best first); *n_probe*
+        overrides the approximate index's probe count. With *field_weights*
+        (semantic field -> weight) the ranking mixes per-field similarities
+        instead, and entries also carry 'field_scores'.
+        """
+        return self._unpack_ranking(self._send_request({
+            "action": "similar",
+            "artifact_id": artifact_id,
+            "top_k": top_k,
+            "n_probe": n_probe,
+            "field_weights": field_weights
+        }))
+    
+    def compare_many(self, pairs: list) -> Optional[list]:
+        """
+        Compare many (artifact1_id, artifact2_id) pairs in one request;
+        returns one comparison (or {'error': ...}) per pair
+        """
+        return self._send_request({
+            "action": "compare_many",
+            "pairs": [list(pair) for pair in pairs]
+        })
+    
+    def find_similar_many(self, artifact_ids: list, top_k: int = 5,
+                          n_probe: Optional[int] = None) -> Optional[list]:
+        """Find similar artifacts for several artifacts in one request"""
+        result = self._send_request({
+            "action": "similar_many",
+            "artifact_ids": list(artifact_ids),
+            "top_k": top_k,
+            "n_probe": n_probe
+        })
+        if not isinstance(result, list):
+            return result
+        return [self._unpack_ranking(ranking) for ranking in result]
+    
+    def search(self, query: str, top_k: int = 10,
+               n_probe: Optional[int] = None) -> Optional[list]:
+        """Semantic free-text search (ids and scores, best first)"""
+        return self._unpack_ranking(self._send_request({
+            "action": "search",
+            "query": query,
+            "top_k": top_k,
+            "n_probe": n_probe
+        }))
+    
+    def get_status(self) -> dict:
+        """Get model status"""
+        if not self.is_ready:
+            return {"model_trained": False}
+        result = self._send_request({"action": "status"})
+        return result if isinstance(result, dict) and "error" not in result else {"model_trained": False}
+    
+
+class ModelServiceClient(ModelServiceAPI):
+    """
+    Client for communicating with the model service subprocess.
+    
+    Every request carries a correlation "id"; a reader thread routes each
+    response line to the Future of the request with that id and ignores
+    anything else the subprocess prints. Many requests can be in flight at
+    once from any number of threads.
+    """
+    
+    # Seconds to wait for the service to load the model and report ready
+    STARTUP_TIMEOUT = 60
+    
+    def __init__(self, threads: Optional[int] = None):
         self.process = None
+        self.threads = threads
         self.is_ready = False
         self.artifact_count = 0
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._reader = None
+        self._frames = None
+        self._ready: Future = Future()
+        self._exited = False
+        # time.monotonic() of the last frame read from the service
+        self.last_response = time.monotonic()
+        # Called from the reader thread when the service exits
+        self.on_exit = None
         self._start_service()
     
     def _start_service(self):
@@ -32,113 +176,137 @@ class ModelServiceClient:
         try:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             service_path = os.path.join(script_dir, "model_service.py")
+            env = os.environ.copy()
+            if self.threads:
+                env["MODEL_SERVICE_THREADS"] = str(self.threads)
             
-            # Use PIPE for stdin/stdout, redirect stderr to stdout
+            # Binary pipes for framed requests/responses; the service's log
+            # output goes to stderr, which is shared with this process
             self.process = subprocess.Popen(
                 [sys.executable, "-u", service_path],  # -u for unbuffered
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                cwd=script_dir
+                cwd=script_dir,
+                env=env
             )
+            self._frames = FrameReader(self.process.stdout.fileno())
             
-            # Wait for ready signal with timeout
-            import select
-            import time
-            
-            start_time = time.time()
-            timeout = 60  # Give model 60 seconds to load
+            # The reader thread reads the ready frame too; waiting on a Future
+            # keeps the deadline on every platform, even if the service hangs
+            # without writing anything (pipes cannot be polled on Windows)
+            self._ready = Future()
+            self._reader = threading.Thread(target=self._read_responses, daemon=True)
+            self._reader.start()
+            try:
+                response = self._ready.result(timeout=self.STARTUP_TIMEOUT)
+            except FutureTimeout:
+                self._ready.cancel()
+                response = None
             
-            while time.time() - start_time < timeout:
-                if self.process.poll() is not None:
-                    # Process ended
-                    break
-                
-                # Try to read a line
-                try:
-                    line = self.process.stdout.readline()
-                    if line:
-                        line = line.strip()
-                        # Skip non-JSON output (loading messages)
-                        if line.startswith('{'):
-                            response = json.loads(line)
-                            if response.get("status") == "ready":
-                                self.is_ready = True
-                                self.artifact_count = response.get("artifacts", 0)
-                                print(f"✓ Model service started with {self.artifact_count} artifacts")
-                                return
-                            elif "error" in response:
-                                print(f"⚠ Model service error: {response['error']}")
-                                break
-                except json.JSONDecodeError:
-                    continue  # Skip non-JSON lines
-                except Exception as e:
-                    print(f"Read error: {e}")
-                    continue
+            if isinstance(response, dict) and response.get("status") == "ready":
+                with self._pending_lock:
+                    # The service may already have exited again
+                    self.is_ready = not self._exited
+                if self.is_ready:
+                    self.artifact_count = response.get("artifacts", 0)
+                    print(f"✓ Model service started with {self.artifact_count} artifacts")
+                    return
+            if isinstance(response, dict) and "error" in response:
+                print(f"⚠ Model service error: {response['error']}")
             
-            if not self.is_ready:
-                print("⚠ Model service timed out or failed to start")
-                self._cleanup()
+            print("⚠ Model service timed out or failed to start")
+            self._cleanup()
                 
         except Exception as e:
             print(f"⚠ Could not start model service: {e}")
             self._cleanup()
     
-    def _read_response(self, timeout=30):
-        """Read a JSON response from the subprocess"""
+    def _read_responses(self):
+        """
+        Reader thread: hand the first frame (the ready message) to
+        _start_service(), then dispatch each response frame to its
+        request's Future
+        """
+        frames = self._frames
         try:
-            if self.process and self.process.stdout:
-                import time
-                start = time.time()
-                while time.time() - start < timeout:
-                    line = self.process.stdout.readline()
-                    if line:
-                        line = line.strip()
-                        if line.startswith('{'):
-                            return json.loads(line)
-                    if self.process.poll() is not None:
-                        break
+            message = frames.read()
+            self.last_response = time.monotonic()
+            try:
+                self._ready.set_result(message)
+            except InvalidStateError:
+                return  # startup already timed out
+            if not (isinstance(message, dict) and message.get("status") == "ready"):
+                return
+            while True:
+                message = frames.read()
+                if message is None:
+                    break
+                self.last_response = time.monotonic()
+                if not isinstance(message, dict):
+                    continue
+                with self._pending_lock:
+                    future = self._pending.pop(message.get("id"), None)
+                if future is None:
+                    if "error" in message:
+                        print(f"⚠ Model service error: {message['error']}")
+                    continue  # stray or timed-out response
+                if "error" in message:
+                    future.set_result({"error": message["error"]})
+                else:
+                    future.set_result(message.get("result"))
         except Exception as e:
             print(f"Error reading from model service: {e}")
-        return None
+        finally:
+            # The service exited: fail everything still waiting
+            try:
+                self._ready.set_result(None)
+            except InvalidStateError:
+                pass
+            with self._pending_lock:
+                self._exited = True
+                self.is_ready = False
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_result(None)
+            if self.on_exit:
+                self.on_exit()
     
-    def _send_request(self, request: dict) -> Optional[dict]:
-        """Send a request to the model service"""
+    def submit(self, request: dict) -> Optional[Future]:
+        """
+        Send a request without waiting for the answer (pipelining).
+        
+        Returns:
+            Future resolving to the result (or {"error": ...}, or None if the
+            service died), or None when the service is not running
+        """
         if not self.is_ready or not self.process:
             return None
         
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
         try:
-            self.process.stdin.write(json.dumps(request) + "\n")
-            self.process.stdin.flush()
-            return self._read_response()
+            with self._write_lock:
+                write_frame(self.process.stdin, {**request, "id": request_id})
         except Exception as e:
             print(f"Error communicating with model service: {e}")
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
             return None
+        return future
     
-    def compare(self, artifact1_id: str, artifact2_id: str) -> Optional[dict]:
-        """Compare two artifacts using the trained model"""
-        return self._send_request({
-            "action": "compare",
-            "artifact1_id": artifact1_id,
-            "artifact2_id": artifact2_id
-        })
+    def _forget(self, future: Future):
+        """Stop tracking a request whose caller gave up waiting"""
+        with self._pending_lock:
+            for request_id, pending in list(self._pending.items()):
+                if pending is future:
+                    del self._pending[request_id]
     
-    def find_similar(self, artifact_id: str, top_k: int = 5) -> Optional[list]:
-        """Find similar artifacts"""
-        return self._send_request({
-            "action": "similar",
-            "artifact_id": artifact_id,
-            "top_k": top_k
-        })
-    
-    def get_status(self) -> dict:
-        """Get model status"""
-        if not self.is_ready:
-            return {"model_trained": False}
-        result = self._send_request({"action": "status"})
-        return result if result else {"model_trained": False}
+    @property
+    def outstanding(self) -> int:
+        """Number of requests sent but not yet answered"""
+        return len(self._pending)
     
     def _cleanup(self):
         """Clean up the subprocess"""
@@ -147,6 +315,9 @@ class ModelServiceClient:
             try:
                 self.process.terminate()
                 self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                # Wedged (or stopped) processes may ignore SIGTERM
+                self.process.kill()
             except:
                 pass
             self.process = None
@@ -155,6 +326,246 @@ class ModelServiceClient:
         """Cleanup on deletion"""
         self._cleanup()
 
+
+class ModelServicePool(ModelServiceAPI):
+    """
+    Several model service processes (ModelServiceClient workers) behind the
+    same request API as a single client.
+    
+    Each request goes to the ready worker with the fewest outstanding
+    requests. Workers memory-map the same saved model files
+    (artifact_embeddings.npy, the record store, field embeddings, ...), so
+    the operating system keeps a single copy of those pages however many
+    workers run; only the sentence-transformer weights are per worker.
+    """
+    
+    def __init__(self, workers: int = 1):
+        workers = max(1, workers)
+        # Split the CPU threads between workers, as the encoding pool does
+        threads = max(1, (os.cpu_count() or workers) // workers) if workers > 1 else None
+        self.threads = threads
+        self.workers = []
+        self._workers_lock = threading.Lock()
+        
+        # Start workers side by side; each loads the model independently
+        starters = [threading.Thread(target=self._add_worker, args=(threads,))
+                    for _ in range(workers)]
+        for starter in starters:
+            starter.start()
+        for starter in starters:
+            starter.join()
+        
+        self.artifact_count = max((w.artifact_count for w in self.workers), default=0)
+        if workers > 1:
+            print(f"✓ Model service pool: {len(self.ready_workers)}/{workers} workers ready")
+    
+    def _add_worker(self, threads: Optional[int]):
+        worker = ModelServiceClient(threads=threads)
+        with self._workers_lock:
+            self.workers.append(worker)
+    
+    def replace_worker(self, old: ModelServiceClient, new: ModelServiceClient):
+        """Swap a failed worker for a freshly started one"""
+        with self._workers_lock:
+            self.workers[self.workers.index(old)] = new
+            self.artifact_count = new.artifact_count or self.artifact_count
+    
+    @property
+    def ready_workers(self) -> list:
+        return [w for w in self.workers if w.is_ready]
+    
+    @property
+    def is_ready(self) -> bool:
+        return bool(self.ready_workers)
+    
+    @property
+    def outstanding(self) -> int:
+        return sum(w.outstanding for w in self.workers)
+    
+    def submit(self, request: dict) -> Optional[Future]:
+        """Send a request to the least busy ready worker"""
+        ready = self.ready_workers
+        if not ready:
+            return None
+        return min(ready, key=lambda w: w.outstanding).submit(request)
+    
+    def _forget(self, future: Future):
+        for worker in self.workers:
+            worker._forget(future)
+    
+    def _cleanup(self):
+        """Stop every worker"""
+        for worker in getattr(self, 'workers', []):
+            worker._cleanup()
+    
+    def __del__(self):
+        """Cleanup on deletion"""
+        self._cleanup()
+
+
+class ModelServiceSupervisor:
+    """
+    Keeps the model service pool healthy.
+    
+    A background thread pings every worker each HEALTH_INTERVAL seconds (and
+    at once when a worker's process exits). The service answers requests in
+    order, so a ping can wait behind a long request; a worker is only taken
+    to be hung once it has answered nothing at all, ping or otherwise, for
+    STALL_TIMEOUT seconds. Workers that have exited or hung are stopped and
+    restarted; failed restarts are retried with exponential backoff. With a warm
+    standby, a spare service that has already loaded the model is swapped
+    in immediately and a new spare is started in the background.
+    """
+    
+    HEALTH_INTERVAL = 5
+    PING_TIMEOUT = 5
+    # Seconds without any response before a worker counts as hung; longer
+    # than the slowest request the service is expected to handle
+    STALL_TIMEOUT = 60
+    RESTART_BACKOFF_INITIAL = 1
+    RESTART_BACKOFF_MAX = 60
+    
+    def __init__(self, pool: ModelServicePool, standby: bool = False, on_ready=None):
+        """
+        Args:
+            pool: Pool whose workers are supervised
+            standby: Keep a pre-warmed spare service process
+            on_ready: Called after a worker has been (re)started successfully
+        """
+        self.pool = pool
+        self.standby_enabled = standby
+        self.standby: Optional[ModelServiceClient] = None
+        self.on_ready = on_ready
+        self.restarts = 0
+        self.failed_restarts = 0
+        self.last_restart = None
+        self._backoff = self.RESTART_BACKOFF_INITIAL
+        self._next_attempt = 0.0
+        self._standby_starting = False
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠ Model service supervisor error: {e}")
+            wait = self.HEALTH_INTERVAL
+            if not all(w.is_ready for w in self.pool.workers):
+                wait = min(wait, max(0.5, self._next_attempt - time.time()))
+            self._wake.wait(wait)
+            self._wake.clear()
+    
+    def _healthy(self, worker: ModelServiceClient) -> bool:
+        worker.on_exit = self._wake.set
+        if not worker.is_ready:
+            return False
+        result = worker._send_request({"action": "ping"}, timeout=self.PING_TIMEOUT)
+        return isinstance(result, dict) and result.get("status") == "ok"
+    
+    def check(self):
+        """Ping every worker once and restart the ones that have failed"""
+        for worker in list(self.pool.workers):
+            if self._stopped.is_set():
+                return
+            if self._healthy(worker):
+                continue
+            if worker.is_ready:
+                # The ping may be queued behind a long request: busy workers
+                # keep answering something, hung ones go silent
+                if time.monotonic() - worker.last_response < self.STALL_TIMEOUT:
+                    continue
+                print("⚠ Model service stopped responding, restarting it")
+            self._restart(worker)
+        self._fill_standby()
+    
+    def _restart(self, worker: ModelServiceClient):
+        if self.standby is not None and self.standby.is_ready:
+            replacement, self.standby = self.standby, None
+        elif time.time() >= self._next_attempt:
+            worker._cleanup()
+            replacement = ModelServiceClient(threads=self.pool.threads)
+        else:
+            worker._cleanup()
+            return  # still backing off
+        
+        if self._stopped.is_set() or not replacement.is_ready:
+            replacement._cleanup()
+            if self._stopped.is_set():
+                return
+            self.failed_restarts += 1
+            self._next_attempt = time.time() + self._backoff
+            print(f"⚠ Model service restart failed, retrying in {self._backoff}s")
+            self._backoff = min(self._backoff * 2, self.RESTART_BACKOFF_MAX)
+            return
+        
+        replacement.on_exit = self._wake.set
+        self.pool.replace_worker(worker, replacement)
+        worker._cleanup()
+        self.restarts += 1
+        self.last_restart = time.time()
+        self._backoff = self.RESTART_BACKOFF_INITIAL
+        self._next_attempt = 0.0
+        print(f"✓ Model service restarted (restart #{self.restarts})")
+        if self.on_ready:
+            self.on_ready()
+    
+    def _fill_standby(self):
+        if not self.standby_enabled or self._standby_starting:
+            return
+        if self.standby is not None and self.standby.is_ready:
+            return
+        if time.time() < self._next_attempt:
+            return
+        self._standby_starting = True
+        threading.Thread(target=self._start_standby, daemon=True).start()
+    
+    def _start_standby(self):
+        try:
+            if self.standby is not None:
+                self.standby._cleanup()
+                self.standby = None
+            standby = ModelServiceClient(threads=self.pool.threads)
+            if self._stopped.is_set():
+                standby._cleanup()
+            elif standby.is_ready:
+                standby.on_exit = self._wake.set
+                self.standby = standby
+                print("✓ Model service standby ready")
+        finally:
+            self._standby_starting = False
+    
+    def status(self) -> dict:
+        """Readiness and restart counts for /api/model/status"""
+        ready = len(self.pool.ready_workers)
+        if not self.standby_enabled:
+            standby = 'disabled'
+        elif self.standby is not None and self.standby.is_ready:
+            standby = 'ready'
+        else:
+            standby = 'starting' if self._standby_starting else 'down'
+        return {
+            'ready': ready > 0,
+            'workers': len(self.pool.workers),
+            'ready_workers': ready,
+            'restarts': self.restarts,
+            'failed_restarts': self.failed_restarts,
+            'last_restart': self.last_restart,
+            'standby': standby
+        }
+    
+    def stop(self):
+        """Stop supervising and shut down the pool and standby"""
+        self._stopped.set()
+        self._wake.set()
+        self.pool._cleanup()
+        if self.standby is not None:
+            self.standby._cleanup()
+
+
 class AIExplainer:
     def __init__(self, preload_model=True):
         """Initialize the AI Explainer with model support"""
@@ -171,6 +582,7 @@ class AIExplainer:
         
         # Model service client (runs in subprocess to avoid DLL issues)
         self.model_service = None
+        self.model_supervisor = None
         self.trained_model = None  # For backwards compatibility
         self._model_load_attempted = False
         
@@ -227,19 +639,41 @@ class AIExplainer:
         
         self._model_load_attempted = True
         try:
-            self.model_service = ModelServiceClient()
+            workers = int(os.getenv('MODEL_SERVICE_WORKERS', '1'))
+            standby = os.getenv('MODEL_SERVICE_STANDBY', '0').lower() in ('1', 'true', 'yes')
+            self.model_service = ModelServicePool(workers)
             if self.model_service.is_ready:
-                # Create a dummy trained_model for backwards compatibility checks
-                self.trained_model = type('TrainedModel', (), {
-                    'is_trained': True,
-                    'artifacts': [None] * self.model_service.artifact_count,
-                    'model_name': 'all-MiniLM-L6-v2',
-                    'clusters': True
-                })()
+                self._on_model_service_ready()
+            # Restarts crashed or stalled workers (also retries a failed start)
+            self.model_supervisor = ModelServiceSupervisor(
+                self.model_service, standby=standby, on_ready=self._on_model_service_ready)
         except Exception as e:
             print(f"⚠ Could not start model service: {e}")
             self.model_service = None
     
+    def _on_model_service_ready(self):
+        """Create a dummy trained_model for backwards compatibility checks"""
+        if self.trained_model is None:
+            self.trained_model = type('TrainedModel', (), {
+                'is_trained': True,
+                'artifacts': [None] * self.model_service.artifact_count,
+                'model_name': 'all-MiniLM-L6-v2',
+                'clusters': True
+            })()
+    
+    def model_service_status(self) -> dict:
+        """Readiness and restart counts of the supervised model service"""
+        if self.model_supervisor is None:
+            return {'ready': False, 'started': self._model_load_attempted}
+        return self.model_supervisor.status()
+    
+    def stop_model_service(self):
+        """Shut down the model service processes and their supervisor"""
+        if self.model_supervisor is not None:
+            self.model_supervisor.stop()
+        elif self.model_service is not None:
+            self.model_service._cleanup()
+    
     def _load_trained_model(self):
         """Backwards compatibility - now starts the service instead"""
         self._start_model_service()
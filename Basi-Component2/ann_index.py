@@ -0,0 +1,166 @@
+"""
+Approximate Nearest-Neighbour Index - Pure NumPy IVF (inverted file) search
+Partitions unit-normalised embeddings into k-means lists so a query only scans
+the few lists whose centroids are closest, instead of the whole catalog
+"""
+
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# Lists probed per query unless the caller asks for more/fewer (replaced by
+# the calibrated count when the index is built through calibrate())
+ANN_DEFAULT_PROBES = 8
+
+# calibrate() picks the fewest probes whose sampled recall@k reaches this
+ANN_TARGET_RECALL = 0.9
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-normalised vectors (inner product = cosine).
+
+    Rows are grouped by their nearest centroid; ``list_ids`` holds the row
+    ids of list ``i`` in ``list_ids[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, list_ids: np.ndarray,
+                 n_probe: int = ANN_DEFAULT_PROBES):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.list_ids = np.asarray(list_ids, dtype=np.int64)
+        self.n_probe = n_probe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def default_n_lists(n: int) -> int:
+        """Rule-of-thumb list count (~sqrt(N)), at least 1"""
+        return max(1, int(round(math.sqrt(n))))
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: Optional[int] = None,
+              centroids: Optional[np.ndarray] = None,
+              n_probe: int = ANN_DEFAULT_PROBES, random_state: int = 42) -> 'IVFIndex':
+        """
+        Build the index.
+
+        Args:
+            embeddings: (N, d) unit-normalised vectors
+            n_lists: Number of inverted lists (default ~sqrt(N))
+            centroids: Existing k-means centroids to reuse instead of fitting
+            n_probe: Default number of lists scanned per query
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if centroids is None:
+            n_lists = min(n_lists or cls.default_n_lists(len(embeddings)), len(embeddings))
+            if len(embeddings) > 10000:
+                km = MiniBatchKMeans(n_clusters=n_lists, random_state=random_state,
+                                     batch_size=4096, n_init=3)
+            else:
+                km = KMeans(n_clusters=n_lists, random_state=random_state, n_init=1)
+            km.fit(embeddings)
+            centroids = km.cluster_centers_
+        centroids = np.asarray(centroids, dtype=np.float32)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = centroids / norms
+
+        assignment = cls._assign(embeddings, centroids)
+        list_ids = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(centroids, offsets, list_ids, n_probe)
+
+    @staticmethod
+    def _assign(embeddings: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """Nearest centroid per row, in chunks to bound the score matrix"""
+        out = np.empty(len(embeddings), dtype=np.int64)
+        for start in range(0, len(embeddings), chunk):
+            out[start:start + chunk] = np.argmax(embeddings[start:start + chunk] @ centroids.T, axis=1)
+        return out
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Row ids in the n_probe lists whose centroids best match *query*"""
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        if n_probe < self.n_lists:
+            probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        else:
+            probe = np.arange(self.n_lists)
+        return np.concatenate([self.list_ids[self.offsets[i]:self.offsets[i + 1]] for i in probe])
+
+    def search(self, embeddings: np.ndarray, query: np.ndarray, top_k: int,
+               n_probe: Optional[int] = None, exclude: Optional[int] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top_k rows of *embeddings* by inner product with *query*.
+
+        Returns:
+            (row ids, scores), best first
+        """
+        cand = self.candidates(query, n_probe)
+        if exclude is not None:
+            cand = cand[cand != exclude]
+        if len(cand) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = embeddings[cand] @ query
+        k = min(top_k, len(cand))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return cand[top], scores[top]
+
+    def recall(self, embeddings: np.ndarray, n_probe: int, k: int = 10,
+               sample: int = 200, seed: int = 0) -> float:
+        """Sampled recall@k of search() at *n_probe* against an exact scan"""
+        n = len(embeddings)
+        k = min(k, n - 1)
+        if k <= 0:
+            return 1.0
+        rows = np.random.default_rng(seed).choice(n, size=min(sample, n), replace=False)
+        hits = 0
+        for row in rows.tolist():
+            query = embeddings[row]
+            scores = embeddings @ query
+            scores[row] = -np.inf
+            expected = np.argpartition(-scores, k - 1)[:k]
+            found = self.search(embeddings, query, k, n_probe=n_probe, exclude=row)[0]
+            hits += len(np.intersect1d(found, expected))
+        return hits / (k * len(rows))
+
+    def calibrate(self, embeddings: np.ndarray, target: float = ANN_TARGET_RECALL,
+                  k: int = 10, sample: int = 200) -> float:
+        """
+        Set the default n_probe to the fewest lists (1, 2, 4, ...) whose
+        sampled recall@k reaches *target*; all lists if none does
+
+        Returns:
+            The sampled recall at the chosen n_probe
+        """
+        n_probe = 1
+        while True:
+            n_probe = min(n_probe, self.n_lists)
+            recall = self.recall(embeddings, n_probe, k, sample)
+            if recall >= target or n_probe == self.n_lists:
+                self.n_probe = n_probe
+                return recall
+            n_probe *= 2
+
+    def save(self, path: str) -> None:
+        """Save as a .npz archive"""
+        np.savez(path, centroids=self.centroids, offsets=self.offsets,
+                 list_ids=self.list_ids, n_probe=np.int64(self.n_probe))
+
+    @classmethod
+    def load(cls, path: str) -> Optional['IVFIndex']:
+        """Load an index saved with save(); None if the file does not exist"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data['centroids'], data['offsets'], data['list_ids'],
+                       int(data['n_probe']))
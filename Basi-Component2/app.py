@@ -23,13 +23,16 @@ if sys.platform == 'win32':
     except Exception as e:
         print(f"⚠ DLL directory setup failed: {e}")
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 import pandas as pd
 import json
+import subprocess
 import time
-from comparison_engine import ComparisonEngine
+from comparison_engine import ComparisonEngine, FILTER_FACETS, HYBRID_SEMANTIC_WEIGHT
 from cache_manager import ExplanationCache
+from search_index import ArtifactSearchIndex
+from era_index import EraIntervalIndex
 
 # ── Admin / moderation integration ────────────────────────────────────────
 _ADMIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
@@ -91,7 +94,8 @@ def load_artifacts():
     return artifacts
 
 artifacts = load_artifacts()
-comparison_engine = ComparisonEngine(artifacts)
+# Fitted index is snapshotted to disk and memory-mapped on later starts
+comparison_engine = ComparisonEngine(artifacts, snapshot_dir='index_snapshots')
 ai_explainer = AIExplainer()
 explanation_cache = ExplanationCache()
 
@@ -100,9 +104,9 @@ explanation_cache.clear()
 
 # Development helper: add minimal `C001` artifact at runtime if it's not present
 def _ensure_dev_c001():
-    ids = {a['id'] for a in artifacts}
-    if 'C001' not in ids:
-        artifacts.append({
+    if 'C001' not in comparison_engine.artifact_dict:
+        # Goes through the engine so it is indexed for similarity search too
+        comparison_engine.add_artifact({
             'id': 'C001',
             'name': 'Japanese Katana (dev)',
             'category': 'Sword',
@@ -120,11 +124,73 @@ def _ensure_dev_c001():
 
 _ensure_dev_c001()
 
+def _refresh_catalog(current):
+    """Point the routes at the engine's current catalog and rebuild the
+    full-text and era indexes over it (runs after every engine edit)"""
+    global artifacts, search_index, era_index
+    search_index = ArtifactSearchIndex(current)
+    era_index = EraIntervalIndex(current)
+    artifacts = current
+
+# Built after the dev helper so every served artifact is searchable, and
+# rebuilt whenever the comparison engine's catalog is edited
+_refresh_catalog(comparison_engine.artifacts)
+comparison_engine.on_edit = _refresh_catalog
+
 @app.route('/api/artifacts', methods=['GET'])
 def get_artifacts():
-    """Get all artifacts"""
+    """Get all artifacts, or those whose era overlaps ?from=YEAR&to=YEAR
+
+    Years are integers; negative years are BCE.
+    """
+    if 'from' in request.args or 'to' in request.args:
+        try:
+            start = int(request.args['from']) if request.args.get('from') else None
+            end = int(request.args['to']) if request.args.get('to') else None
+        except ValueError:
+            return jsonify({'error': 'from/to must be integer years'}), 400
+        return jsonify(era_index.overlapping(start, end))
     return jsonify(artifacts)
 
+@app.route('/api/search', methods=['GET'])
+def search_artifacts():
+    """Full-text (BM25) search over the catalog, paginated"""
+    query = request.args.get('q', default='', type=str)
+    page = request.args.get('page', default=1, type=int)
+    per_page = min(request.args.get('per_page', default=20, type=int), 100)
+    return jsonify(search_index.search(query, page, per_page))
+
+@app.route('/api/search/semantic', methods=['GET'])
+def semantic_search_artifacts():
+    """Meaning-based search ("ritual masks for healing") via the trained model
+
+    Optional ``n_probe`` overrides the approximate index's probe count.
+    """
+    query = request.args.get('q', default='', type=str)
+    limit = min(request.args.get('limit', default=10, type=int), 100)
+    n_probe = request.args.get('n_probe', default=None, type=int)
+    service = getattr(ai_explainer, 'model_service', None)
+    if service is None or not service.is_ready:
+        return jsonify({'error': 'Semantic search is not available yet'}), 503
+    ranked = service.search(query, top_k=limit, n_probe=n_probe)
+    if not isinstance(ranked, list):
+        message = ranked.get('error') if isinstance(ranked, dict) else 'No response from model service'
+        return jsonify({'error': message}), 502
+    # The service answers with ids and scores; attach the catalog records
+    results = []
+    for entry in ranked:
+        artifact = comparison_engine.artifact_dict.get(entry['id'])
+        if artifact is not None:
+            results.append({**artifact, 'similarity_score': entry['similarity_score']})
+    return jsonify({'query': query, 'results': results})
+
+@app.route('/api/search/autocomplete', methods=['GET'])
+def autocomplete_artifacts():
+    """Typeahead suggestions for artifact names"""
+    prefix = request.args.get('q', default='', type=str)
+    limit = min(request.args.get('limit', default=10, type=int), 20)
+    return jsonify(search_index.autocomplete(prefix, limit))
+
 @app.route('/api/artifacts/<artifact_id>', methods=['GET'])
 def get_artifact(artifact_id):
     """Get a specific artifact by ID"""
@@ -135,11 +201,172 @@ def get_artifact(artifact_id):
 
 @app.route('/api/artifacts/<artifact_id>/similar', methods=['GET'])
 def get_similar_artifacts(artifact_id):
-    """Get similar artifacts for comparison"""
+    """Get similar artifacts for comparison
+
+    Optional ``weights`` re-weights the score per request, e.g.
+    ``?weights=materials:0.6,function:0.2`` (unlisted fields keep defaults).
+    Optional facet filters restrict candidates before scoring, e.g.
+    ``?origin=japan&materials=bronze,brass&is_sri_lankan=false``.
+    """
+    num_results = request.args.get('limit', default=6, type=int)
+    try:
+        weights = parse_weights(request.args.get('weights'))
+        filters = parse_filters(request.args)
+        similar = comparison_engine.find_similar(artifact_id, num_results,
+                                                 weights=weights, filters=filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(similar)
+
+# Embedding candidates re-ranked per hybrid request (default and cap)
+HYBRID_CANDIDATES = 300
+MAX_HYBRID_CANDIDATES = 1000
+
+@app.route('/api/artifacts/<artifact_id>/similar/hybrid', methods=['GET'])
+def get_similar_artifacts_hybrid(artifact_id):
+    """Get similar artifacts by semantic retrieval + lexical re-ranking
+
+    The trained model's embedding search supplies ``candidates`` (default
+    300) nearest artifacts; only those are scored by the comparison engine
+    and ranked by ``semantic_weight * semantic + (1 - semantic_weight) *
+    lexical``. ``weights`` re-weights the lexical part as for ``/similar``.
+    Falls back to the lexical-only ranking while the model service is
+    unavailable (results then carry no ``semantic_score``). Optional
+    ``n_probe`` overrides the approximate index's probe count. Optional
+    ``field_weights`` picks the semantic side by a per-field mix, e.g.
+    ``?field_weights=symbolism:1,function:0.5``.
+    """
     num_results = request.args.get('limit', default=6, type=int)
-    similar = comparison_engine.find_similar(artifact_id, num_results)
+    num_candidates = min(request.args.get('candidates', default=HYBRID_CANDIDATES, type=int),
+                         MAX_HYBRID_CANDIDATES)
+    semantic_weight = request.args.get('semantic_weight', default=HYBRID_SEMANTIC_WEIGHT, type=float)
+    n_probe = request.args.get('n_probe', default=None, type=int)
+    try:
+        weights = parse_weights(request.args.get('weights'))
+        field_weights = parse_weights(request.args.get('field_weights'))
+        service = getattr(ai_explainer, 'model_service', None)
+        neighbours = None
+        if service is not None and service.is_ready:
+            neighbours = service.find_similar(artifact_id, top_k=num_candidates, n_probe=n_probe,
+                                              field_weights=field_weights)
+        if field_weights and isinstance(neighbours, dict) and 'error' in neighbours:
+            raise ValueError(neighbours['error'])
+        if not isinstance(neighbours, list):
+            return jsonify(comparison_engine.find_similar(artifact_id, num_results, weights=weights))
+        candidates = {n['id']: n.get('similarity_score', 0.0) for n in neighbours}
+        similar = comparison_engine.find_similar_hybrid(
+            artifact_id, candidates, num_results,
+            weights=weights, semantic_weight=semantic_weight
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(similar)
+
+# Upper bounds per batch request (artifact_ids and results per artifact)
+MAX_BATCH_ARTIFACTS = 500
+MAX_BATCH_RESULTS = 100
+
+@app.route('/api/artifacts/similar/batch', methods=['POST'])
+def get_similar_artifacts_batch():
+    """Get similar artifacts for many artifacts in one call
+
+    Body: ``{"artifact_ids": [...], "limit": 6, "weights": {"materials": 0.6},
+    "filters": {"origin": ["japan"], "is_sri_lankan": false}}``
+    Returns ``{artifact_id: [similar artifacts]}``. At most
+    ``MAX_BATCH_ARTIFACTS`` ids per request; ``limit`` is capped at
+    ``MAX_BATCH_RESULTS``.
+    """
+    data = request.json or {}
+    artifact_ids = data.get('artifact_ids')
+    if not isinstance(artifact_ids, list) or not artifact_ids:
+        return jsonify({'error': 'artifact_ids must be a non-empty list'}), 400
+    if len(artifact_ids) > MAX_BATCH_ARTIFACTS:
+        return jsonify({'error': f'At most {MAX_BATCH_ARTIFACTS} artifacts per request'}), 400
+    num_results = data.get('limit', 6)
+    if data.get('weights') is not None and not isinstance(data['weights'], dict):
+        return jsonify({'error': 'weights must be an object of field: weight'}), 400
+    if data.get('filters') is not None and not isinstance(data['filters'], dict):
+        return jsonify({'error': 'filters must be an object of facet: values'}), 400
+    try:
+        similar = comparison_engine.find_similar_batch(
+            [str(a) for a in artifact_ids], min(int(num_results), MAX_BATCH_RESULTS),
+            weights=data.get('weights'), filters=data.get('filters')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(similar)
 
+# Upper bound on artifacts per similarity-matrix request (N x N payload)
+MAX_MATRIX_ARTIFACTS = 500
+
+@app.route('/api/artifacts/similarity-matrix', methods=['POST'])
+def get_similarity_matrix():
+    """Get the pairwise similarity matrix for a set of artifacts
+
+    Body: ``{"artifact_ids": [...], "weights": {...}, "format": "json" | "float32"}``
+    ``float32`` returns the row-major matrix as raw little-endian float32
+    bytes, with the row/column order in the ``X-Artifact-Ids`` header.
+    """
+    data = request.json or {}
+    artifact_ids = data.get('artifact_ids')
+    if not isinstance(artifact_ids, list) or not artifact_ids:
+        return jsonify({'error': 'artifact_ids must be a non-empty list'}), 400
+    if len(artifact_ids) > MAX_MATRIX_ARTIFACTS:
+        return jsonify({'error': f'At most {MAX_MATRIX_ARTIFACTS} artifacts per request'}), 400
+    if data.get('weights') is not None and not isinstance(data['weights'], dict):
+        return jsonify({'error': 'weights must be an object of field: weight'}), 400
+    try:
+        ids, matrix, missing = comparison_engine.similarity_matrix(
+            [str(a) for a in artifact_ids], weights=data.get('weights')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if data.get('format') == 'float32':
+        response = Response(matrix.astype('<f4').tobytes(), mimetype='application/octet-stream')
+        response.headers['X-Artifact-Ids'] = ','.join(ids)
+        response.headers['X-Matrix-Shape'] = f'{len(ids)},{len(ids)}'
+        if missing:
+            response.headers['X-Missing-Artifact-Ids'] = ','.join(missing)
+        response.headers['Access-Control-Expose-Headers'] = \
+            'X-Artifact-Ids, X-Matrix-Shape, X-Missing-Artifact-Ids'
+        return response
+    return jsonify({
+        'artifact_ids': ids,
+        'matrix': [[round(float(v), 4) for v in row] for row in matrix],
+        'missing': missing,
+    })
+
+def parse_weights(spec):
+    """Parse a ``field:weight,field:weight`` query string into a dict"""
+    if not spec:
+        return None
+    weights = {}
+    for part in spec.split(','):
+        field, sep, value = part.partition(':')
+        if not sep:
+            raise ValueError(f"Invalid weight '{part}', expected field:weight")
+        try:
+            weights[field.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight value for '{field.strip()}': {value}")
+    return weights
+
+def parse_filters(args):
+    """Collect facet filters (comma-separated values) from query arguments"""
+    filters = {}
+    for facet in FILTER_FACETS:
+        value = args.get(facet)
+        if not value:
+            continue
+        if facet == 'is_sri_lankan':
+            if value.lower() not in ('true', 'false', '1', '0'):
+                raise ValueError("is_sri_lankan must be true or false")
+            filters[facet] = value.lower() in ('true', '1')
+        else:
+            filters[facet] = [v for v in value.split(',') if v.strip()]
+    return filters or None
+
 @app.route('/api/artifacts/<artifact_id>/explain', methods=['GET'])
 def explain_artifact(artifact_id):
     """Get AI-generated explanation for an artifact"""
@@ -387,35 +614,73 @@ def model_status():
         'model_trained': model_trained,
         'openai_available': ai_explainer.use_openai,
         'model_info': model_info,
-        'comparison_source': 'trained_model' if model_trained else ('openai' if ai_explainer.use_openai else 'template')
+        'comparison_source': 'trained_model' if model_trained else ('openai' if ai_explainer.use_openai else 'template'),
+        'model_service': (ai_explainer.model_service_status()
+                          if hasattr(ai_explainer, 'model_service_status') else None)
     })
 
 @app.route('/api/model/train', methods=['POST'])
 def train_model():
-    """Train or retrain the artifact comparison model"""
+    """Train or retrain the artifact comparison model
+
+    The model service is stopped first: its workers memory-map the current
+    model files, and the train process should not compete with them for
+    memory. A fresh AI explainer (and service) loads the result, or the
+    previous model again when training fails.
+    """
+    global ai_explainer
+    if hasattr(ai_explainer, 'stop_model_service'):
+        ai_explainer.stop_model_service()
     try:
-        from artifact_model import train_model as do_train
-        model = do_train()
-        
-        # Reload the AI explainer to use the new model
-        global ai_explainer
-        try:
-            from ai_explainer_v2 import AIExplainer
-            ai_explainer = AIExplainer()
-        except:
-            pass
-        
-        return jsonify({
-            'success': True,
-            'message': 'Model trained successfully',
-            'artifact_count': len(model.artifacts),
-            'model_name': model.model_name
-        })
+        summary = _run_training()
     except Exception as e:
+        _reload_ai_explainer()
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    _reload_ai_explainer()
+    return jsonify({
+        'success': True,
+        'message': 'Model trained successfully',
+        **summary
+    })
+
+def _run_training():
+    """Run artifact_model.py's training in a child process
+
+    Multi-worker encoding (ENCODE_WORKERS > 1) uses a spawn pool, which
+    re-imports the parent's __main__; training in this process would re-run
+    the app's startup in every encoder. The child inherits the environment
+    and writes the model where the model service reads it.
+
+    Returns:
+        The saved model's artifact_count and model_name
+    """
+    from artifact_model import ArtifactComparisonModel
+    from artifact_store import model_version_dir
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, os.path.join(script_dir, 'artifact_model.py')],
+                            cwd=script_dir)
+    if result.returncode != 0:
+        raise RuntimeError(f"Training exited with code {result.returncode} (see the server log)")
+    model_dir = model_version_dir(os.path.join(script_dir, ArtifactComparisonModel.MODEL_DIR))
+    with open(os.path.join(model_dir, ArtifactComparisonModel.METADATA_FILE), 'r',
+              encoding='utf-8') as f:
+        metadata = json.load(f)
+    return {
+        'artifact_count': len(metadata['artifact_index']),
+        'model_name': metadata['model_name']
+    }
+
+def _reload_ai_explainer():
+    """Replace the AI explainer so its model service loads the saved model"""
+    global ai_explainer
+    try:
+        from ai_explainer_v2 import AIExplainer
+        ai_explainer = AIExplainer()
+    except Exception as e:
+        print(f"⚠ Could not reload AI explainer: {e}")
 
 @app.route('/api/cache/stats', methods=['GET'])
 def cache_stats():
@@ -6,7 +6,12 @@ Trains on your artifact dataset and provides real-time comparison capabilities
 import os
 import sys
 import json
+import time
 import pickle
+import shutil
+import hashlib
+import tempfile
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 
@@ -29,9 +34,92 @@ if sys.platform == 'win32':
         print(f"Warning: Could not add torch DLL directory: {e}")
 
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
-from typing import List, Dict, Tuple, Optional
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from typing import List, Dict, NamedTuple, Tuple, Optional, Union
+from era_index import EraIntervalIndex, intervals_overlap, parse_era
+from ann_index import IVFIndex, ANN_TARGET_RECALL
+from artifact_store import (ArtifactStore, CURRENT_VERSION_FILE, OFFSETS_FILE, RECORDS_FILE,
+                            model_version_dir, write_artifact_records)
+from compact_embeddings import CompactEmbeddings, RERANK_FACTOR, RERANK_MIN
+from embedding_pipeline import encode_texts
+from keyword_automaton import KeywordMatcher
+
+# Fields embedded on their own for field-aware search ("similar symbolism")
+SEMANTIC_FIELDS = ('function', 'symbolism', 'materials', 'notes')
+
+# Keyword vocabularies behind the comparison narrative rules
+CATEGORY_GROUPS = [
+    ['sword', 'weapon', 'blade', 'dagger'],
+    ['mask', 'headdress', 'crown', 'ceremonial'],
+    ['drum', 'musical', 'instrument', 'bell'],
+    ['statue', 'sculpture', 'figure', 'idol'],
+    ['jewelry', 'ornament', 'pendant', 'necklace'],
+    ['vessel', 'pot', 'container', 'bowl']
+]
+ASIAN_COUNTRIES = ['sri lanka', 'india', 'china', 'japan', 'korea', 'thailand', 'indonesia', 'nepal', 'tibet']
+COMMON_MATERIALS = ['gold', 'silver', 'bronze', 'brass', 'copper', 'iron', 'steel',
+                    'wood', 'ivory', 'jade', 'stone', 'clay', 'ceramic', 'silk',
+                    'leather', 'lacquer', 'enamel', 'gemstone', 'pearl']
+UNIQUE_MATERIALS = ['gold', 'silver', 'bronze', 'brass', 'copper', 'iron', 'steel',
+                    'wood', 'ivory', 'jade', 'stone', 'clay', 'ceramic']
+FUNCTION_GROUPS = [
+    (['ceremony', 'ritual', 'religious', 'sacred', 'worship', 'temple'],
+     "Both serve ceremonial or religious purposes"),
+    (['royal', 'king', 'queen', 'palace', 'court', 'noble'],
+     "Both associated with royal or noble contexts"),
+    (['war', 'battle', 'military', 'warrior', 'combat', 'weapon'],
+     "Both have military or warrior associations"),
+]
+SYMBOLIC_THEMES = {
+    'power': ['power', 'authority', 'strength', 'dominance'],
+    'spirituality': ['spiritual', 'divine', 'sacred', 'holy', 'religious'],
+    'protection': ['protection', 'guard', 'ward', 'shield', 'amulet'],
+    'prosperity': ['prosperity', 'wealth', 'fortune', 'abundance'],
+    'wisdom': ['wisdom', 'knowledge', 'enlightenment', 'learning']
+}
+
+# Vocabularies compiled once; each rule below is a bitwise test on masks
+_CATEGORY_MATCHER = KeywordMatcher(w for group in CATEGORY_GROUPS for w in group)
+_CATEGORY_GROUP_MASKS = [_CATEGORY_MATCHER.bits(group) for group in CATEGORY_GROUPS]
+_ORIGIN_MATCHER = KeywordMatcher(ASIAN_COUNTRIES)
+_MATERIAL_MATCHER = KeywordMatcher(COMMON_MATERIALS + UNIQUE_MATERIALS)
+_COMMON_MATERIALS_MASK = _MATERIAL_MATCHER.bits(COMMON_MATERIALS)
+_UNIQUE_MATERIALS_MASK = _MATERIAL_MATCHER.bits(UNIQUE_MATERIALS)
+_FUNCTION_MATCHER = KeywordMatcher(w for terms, _ in FUNCTION_GROUPS for w in terms)
+_FUNCTION_GROUP_MASKS = [(_FUNCTION_MATCHER.bits(terms), message) for terms, message in FUNCTION_GROUPS]
+_THEME_MATCHER = KeywordMatcher(w for words in SYMBOLIC_THEMES.values() for w in words)
+_THEME_MASKS = [(theme, _THEME_MATCHER.bits(words)) for theme, words in SYMBOLIC_THEMES.items()]
+
+# Field scanned by each matcher, in rule-mask column order
+RULE_FIELDS = (
+    ('category', _CATEGORY_MATCHER),
+    ('origin', _ORIGIN_MATCHER),
+    ('materials', _MATERIAL_MATCHER),
+    ('function', _FUNCTION_MATCHER),
+    ('symbolism', _THEME_MATCHER),
+)
+
+
+class RuleMasks(NamedTuple):
+    """Keyword bitmasks of one artifact, one per RULE_FIELDS field"""
+    category: int
+    origin: int
+    materials: int
+    function: int
+    symbolism: int
+
+
+def _rule_masks(artifact: Dict) -> RuleMasks:
+    """Scan an artifact's rule fields once"""
+    return RuleMasks(*(matcher.mask(artifact.get(field, '')) for field, matcher in RULE_FIELDS))
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return float32 rows scaled to unit L2 norm (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
 
 class ArtifactComparisonModel:
     """
@@ -41,8 +129,34 @@ class ArtifactComparisonModel:
     """
     
     MODEL_DIR = "trained_model"
-    EMBEDDINGS_FILE = "artifact_embeddings.pkl"
+    EMBEDDINGS_FILE = "artifact_embeddings.npy"
+    CLUSTERS_FILE = "artifact_clusters.npy"
+    CLUSTER_CENTERS_FILE = "artifact_cluster_centers.npy"
     METADATA_FILE = "artifact_metadata.json"
+    LEGACY_EMBEDDINGS_FILE = "artifact_embeddings.pkl"
+    ANN_INDEX_FILE = "artifact_ann_index.npz"
+    FIELD_EMBEDDINGS_FILE = "artifact_field_embeddings.npy"
+    FIELD_NEIGHBOURS_FILE = "artifact_field_neighbours.npy"
+    RULE_MASKS_FILE = "artifact_rule_masks.npy"
+    # Each save_model() writes a new MODEL_DIR/model_<timestamp>_* directory
+    VERSION_PREFIX = "model_"
+    
+    # Refit clusters (and ANN lists) only when this share of rows changed
+    CLUSTER_REFIT_FRACTION = 0.1
+    
+    # Above this many artifacts clustering uses MiniBatchKMeans
+    MINIBATCH_KMEANS_THRESHOLD = 10000
+    
+    # Per-field nearest neighbours precomputed at train time (catalogs up to
+    # FIELD_NEIGHBOURS_MAX_ARTIFACTS); weighted queries score their union
+    FIELD_TOP_K = 100
+    FIELD_NEIGHBOURS_MAX_ARTIFACTS = 20000
+    
+    # Encoded free-text queries kept for repeat searches
+    QUERY_CACHE_SIZE = 256
+    
+    # Score cells (queries x artifacts) per matrix product in find_similar_many
+    BATCH_SCORE_CELLS = 2 ** 24
     
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         """
@@ -55,9 +169,19 @@ class ArtifactComparisonModel:
         self.model_name = model_name
         self.model: Optional[SentenceTransformer] = None
         self.artifact_embeddings: Optional[np.ndarray] = None
-        self.artifacts: List[Dict] = []
+        self.artifacts: Union[List[Dict], ArtifactStore] = []
         self.artifact_index: Dict[str, int] = {}
         self.clusters: Optional[np.ndarray] = None
+        self.cluster_centers: Optional[np.ndarray] = None
+        self.text_hashes: List[str] = []
+        self.field_embeddings: Optional[np.ndarray] = None
+        self.field_text_hashes: Dict[str, List[str]] = {}
+        self.field_neighbours: Optional[np.ndarray] = None
+        self.rule_masks: Optional[np.ndarray] = None
+        self._query_cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self.era_index: Optional[EraIntervalIndex] = None
+        self.ann_index: Optional[IVFIndex] = None
+        self.compact: Optional[CompactEmbeddings] = None
         self.is_trained = False
         
         # Load model if trained version exists
@@ -65,9 +189,12 @@ class ArtifactComparisonModel:
             self.load_model()
     
     def _model_exists(self) -> bool:
-        """Check if a trained model exists"""
-        return (os.path.exists(os.path.join(self.MODEL_DIR, self.EMBEDDINGS_FILE)) and
-                os.path.exists(os.path.join(self.MODEL_DIR, self.METADATA_FILE)))
+        """Check if a trained model exists (current or legacy pickle format)"""
+        model_dir = model_version_dir(self.MODEL_DIR)
+        if not os.path.exists(os.path.join(model_dir, self.METADATA_FILE)):
+            return False
+        return (os.path.exists(os.path.join(model_dir, self.EMBEDDINGS_FILE)) or
+                os.path.exists(os.path.join(model_dir, self.LEGACY_EMBEDDINGS_FILE)))
     
     def _create_artifact_text(self, artifact: Dict) -> str:
         """
@@ -103,95 +230,401 @@ class ArtifactComparisonModel:
         
         return " | ".join(parts)
     
-    def train(self, artifacts: List[Dict], n_clusters: int = 5) -> None:
+    @staticmethod
+    def _build_rule_masks(artifacts) -> np.ndarray:
+        """(N, len(RULE_FIELDS)) uint64 keyword masks, one row per artifact"""
+        masks = np.zeros((len(artifacts), len(RULE_FIELDS)), dtype=np.uint64)
+        for i, artifact in enumerate(artifacts):
+            masks[i] = _rule_masks(artifact)
+        return masks
+    
+    def _masks_at(self, idx: int) -> RuleMasks:
+        """Precomputed rule masks of catalog row *idx*"""
+        if self.rule_masks is None:
+            return _rule_masks(self.artifacts[idx])
+        return RuleMasks(*(int(v) for v in self.rule_masks[idx]))
+    
+    @staticmethod
+    def _field_text(artifact: Dict, field: str) -> str:
+        """Text of one semantic field ('' when missing)"""
+        value = artifact.get(field)
+        if not value or value == 'nan':
+            return ''
+        return str(value)
+    
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        """Content hash of an artifact's embedding text"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    
+    def _embed_reusing(self, texts: List[str], hashes: List[str], previous_hashes: List[str],
+                       previous_embeddings: Optional[np.ndarray], encode_workers: int,
+                       dim: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Unit-normalised embeddings for *texts*, copying rows whose hash the
+        previous model already embedded. Empty texts get zero rows.
+        
+        Returns:
+            (embeddings, number of texts encoded)
+        """
+        previous_rows: Dict[str, int] = {}
+        if previous_embeddings is not None:
+            for row, text_hash in enumerate(previous_hashes):
+                previous_rows.setdefault(text_hash, row)
+        stale = [i for i, (t, h) in enumerate(zip(texts, hashes)) if t and h not in previous_rows]
+        reused = [i for i, (t, h) in enumerate(zip(texts, hashes)) if t and h in previous_rows]
+        
+        encoded = None
+        if stale:
+            if self.model is None and encode_workers <= 1:
+                print(f"Loading {self.model_name} model...")
+                self.model = SentenceTransformer(self.model_name)
+            encoded = _normalize_rows(encode_texts(
+                [texts[i] for i in stale],
+                model=self.model,
+                model_name=self.model_name,
+                workers=encode_workers
+            ))
+            dim = encoded.shape[1]
+        elif reused:
+            dim = previous_embeddings.shape[1]
+        
+        embeddings = np.zeros((len(texts), dim or 0), dtype=np.float32)
+        if reused:
+            embeddings[reused] = previous_embeddings[[previous_rows[hashes[i]] for i in reused]]
+        if stale:
+            embeddings[stale] = encoded
+        return embeddings, len(stale)
+    
+    def train(self, artifacts: List[Dict], n_clusters: int = 5,
+              ann_lists: Optional[int] = None, storage: str = 'float32',
+              pca_dims: Optional[int] = None, reuse_embeddings: bool = True,
+              encode_workers: int = 1, field_embeddings: bool = True) -> None:
         """
         Train the model on artifact data.
         
+        Only artifacts whose embedding text changed since the last training
+        run are re-encoded; clusters are refit when more than
+        CLUSTER_REFIT_FRACTION of the rows changed, otherwise new rows are
+        assigned to the existing centroids.
+        
         Args:
             artifacts: List of artifact dictionaries
             n_clusters: Number of clusters for grouping similar artifacts
+            ann_lists: Build an approximate (IVF) search index with this many
+                       inverted lists (None = exact search only). The probe
+                       count is calibrated to ANN_TARGET_RECALL recall@10.
+            storage: First-pass search vectors: 'float32' (search the full
+                     embeddings directly), 'float16' or 'int8' (storage
+                     only unless PCA-reduced)
+            pca_dims: Reduce first-pass vectors to this many principal
+                      directions; candidates are re-ranked at full precision
+            reuse_embeddings: Reuse embeddings of unchanged artifacts from the
+                              previously trained model (False re-encodes all)
+            encode_workers: CPU encoder processes for the embedding step
+                            (1 encodes in this process)
+            field_embeddings: Also embed each of SEMANTIC_FIELDS separately
+                              for find_similar_by_fields()
         """
         print(f"Training artifact comparison model with {len(artifacts)} artifacts...")
+        start_time = time.time()
+        
+        # Create text representations and their content hashes
+        print("Creating artifact text representations...")
+        artifact_texts = [self._create_artifact_text(a) for a in artifacts]
+        text_hashes = [self._text_hash(t) for t in artifact_texts]
+        
+        # Previous model state that can be reused, by content hash
+        reuse = reuse_embeddings and self.is_trained and bool(self.text_hashes)
+        previous_hashes = self.text_hashes if reuse else []
+        previous_embeddings = self.artifact_embeddings if reuse else None
+        previous_field_hashes = self.field_text_hashes if reuse else {}
+        previous_fields = self.field_embeddings if reuse else None
+        previous_ann = self.ann_index
+        removed = len(set(previous_hashes) - set(text_hashes))
         
         # Store artifacts and create index
+        if isinstance(self.artifacts, ArtifactStore):
+            self.artifacts.close()
         self.artifacts = artifacts
         self.artifact_index = {a['id']: i for i, a in enumerate(artifacts)}
+        self.era_index = EraIntervalIndex(artifacts)
+        self.rule_masks = self._build_rule_masks(artifacts)
+        self.text_hashes = text_hashes
         
-        # Load the sentence transformer model
-        print(f"Loading {self.model_name} model...")
-        self.model = SentenceTransformer(self.model_name)
-        
-        # Create text representations
-        print("Creating artifact text representations...")
-        artifact_texts = [self._create_artifact_text(a) for a in artifacts]
-        
-        # Generate embeddings
+        # Generate embeddings (stored unit-normalised so cosine is a dot product)
         print("Generating embeddings...")
-        self.artifact_embeddings = self.model.encode(
-            artifact_texts,
-            show_progress_bar=True,
-            convert_to_numpy=True
-        )
+        self.artifact_embeddings, n_encoded = self._embed_reusing(
+            artifact_texts, text_hashes, previous_hashes, previous_embeddings, encode_workers)
+        print(f"✓ Encoded {n_encoded} new or changed artifacts "
+              f"({len(artifacts) - n_encoded} reused)")
+        
+        # Per-field embeddings, one normalised block per field, side by side
+        self.field_embeddings = None
+        self.field_text_hashes = {}
+        self.field_neighbours = None
+        if field_embeddings:
+            self._train_field_embeddings(artifacts, previous_field_hashes, previous_fields,
+                                         encode_workers)
         
         # Cluster artifacts for better comparison insights
-        print(f"Clustering artifacts into {n_clusters} groups...")
-        if len(artifacts) >= n_clusters:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        changed_fraction = (n_encoded + removed) / max(len(artifacts), 1)
+        refit = (changed_fraction > self.CLUSTER_REFIT_FRACTION or self.cluster_centers is None
+                 or len(self.cluster_centers) != n_clusters)
+        if len(artifacts) < n_clusters:
+            self.clusters = None
+            self.cluster_centers = None
+        elif refit:
+            print(f"Clustering artifacts into {n_clusters} groups...")
+            if len(artifacts) > self.MINIBATCH_KMEANS_THRESHOLD:
+                kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42,
+                                         batch_size=4096, n_init=3)
+            else:
+                kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
             self.clusters = kmeans.fit_predict(self.artifact_embeddings)
+            self.cluster_centers = kmeans.cluster_centers_.astype(np.float32)
+        else:
+            print(f"Assigning artifacts to the existing {n_clusters} clusters "
+                  f"({changed_fraction:.0%} changed)...")
+            # Nearest centroid by squared distance, ||x||^2 dropped as it is constant per row
+            centers = self.cluster_centers
+            distances = (centers ** 2).sum(axis=1) - 2 * (self.artifact_embeddings @ centers.T)
+            self.clusters = np.argmin(distances, axis=1)
+        
+        # Approximate nearest-neighbour index (opt-in: it trades recall for speed)
+        self.ann_index = None
+        if ann_lists:
+            print("Building approximate search index...")
+            reuse_lists = (not refit and previous_ann is not None
+                           and ann_lists == previous_ann.n_lists)
+            self.ann_index = IVFIndex.build(
+                self.artifact_embeddings, n_lists=ann_lists,
+                centroids=previous_ann.centroids if reuse_lists else None)
+            recall = self.ann_index.calibrate(self.artifact_embeddings)
+            print(f"✓ {self.ann_index.n_lists} inverted lists, probing {self.ann_index.n_probe} "
+                  f"per query (recall@10 {recall:.3f}, target {ANN_TARGET_RECALL})")
+            if self.ann_index.n_probe * 4 >= self.ann_index.n_lists:
+                print(f"⚠ That scans {self.ann_index.n_probe / self.ann_index.n_lists:.0%} of the "
+                      f"catalog per query; exact search (ann_lists=None) is likely as fast")
+        
+        # Compact first-pass vectors (quantized and/or PCA-reduced)
+        self.compact = None
+        if storage != 'float32' or pca_dims:
+            print(f"Building {storage} search vectors"
+                  + (f" ({pca_dims} dims)..." if pca_dims else "..."))
+            self.compact = CompactEmbeddings.build(self.artifact_embeddings, storage, pca_dims)
+            if not self.compact.first_pass:
+                print(f"⚠ Full-width {storage} vectors are not used as a first pass: widening "
+                      "them costs more than scanning the float32 embeddings, which queries "
+                      "keep using (set pca_dims for a faster first pass)")
+            else:
+                report = self.compact_report()
+                print(f"✓ Search vectors use {report['compact_mb']:.2f} MB instead of "
+                      f"{report['full_mb']:.2f} MB ({report['memory_saved_pct']:.0f}% saved), "
+                      f"recall@{report['k']} {report['recall']:.3f} vs exact search")
         
         self.is_trained = True
-        print("Training complete!")
+        print(f"Training complete in {time.time() - start_time:.1f}s!")
         
         # Save the trained model
         self.save_model()
     
+    def _train_field_embeddings(self, artifacts: List[Dict],
+                                previous_hashes: Dict[str, List[str]],
+                                previous_embeddings: Optional[np.ndarray],
+                                encode_workers: int) -> None:
+        """Embed each SEMANTIC_FIELDS field and precompute its neighbour lists"""
+        dim = self.artifact_embeddings.shape[1]
+        blocks = []
+        for j, field in enumerate(SEMANTIC_FIELDS):
+            texts = [self._field_text(a, field) for a in artifacts]
+            hashes = [self._text_hash(t) for t in texts]
+            previous_block = None
+            if previous_embeddings is not None and field in previous_hashes:
+                previous_block = previous_embeddings[:, j * dim:(j + 1) * dim]
+            block, n_encoded = self._embed_reusing(
+                texts, hashes, previous_hashes.get(field, []), previous_block,
+                encode_workers, dim=dim)
+            print(f"✓ {field}: encoded {n_encoded} texts")
+            blocks.append(block)
+            self.field_text_hashes[field] = hashes
+        self.field_embeddings = np.hstack(blocks)
+        
+        if len(artifacts) <= self.FIELD_NEIGHBOURS_MAX_ARTIFACTS:
+            print("Precomputing per-field neighbour lists...")
+            k = min(self.FIELD_TOP_K, len(artifacts) - 1)
+            neighbours = np.empty((len(SEMANTIC_FIELDS), len(artifacts), max(k, 0)), dtype=np.int32)
+            for j, block in enumerate(blocks):
+                for start in range(0, len(artifacts), 1024):
+                    scores = block[start:start + 1024] @ block.T
+                    for offset, row_scores in enumerate(scores):
+                        neighbours[j, start + offset] = self._top_k_indices(
+                            row_scores, k, exclude=start + offset)
+            self.field_neighbours = neighbours
+    
     def save_model(self) -> None:
-        """Save the trained model and embeddings to disk"""
+        """
+        Save the trained model to disk.
+        
+        Embeddings are written as a raw .npy array and artifacts as compact
+        JSON lines with an offset index, so load_model() can memory-map both
+        and every process shares one page-cached copy.
+        
+        Each save goes to a new version directory under MODEL_DIR and then
+        switches the CURRENT pointer, so files that running services (or this
+        model) still have memory-mapped are never overwritten; Windows refuses
+        to replace a mapped file. The previous version is kept for those
+        services until the next save.
+        """
         os.makedirs(self.MODEL_DIR, exist_ok=True)
+        previous_dir = model_version_dir(self.MODEL_DIR)
+        version_dir = tempfile.mkdtemp(prefix=time.strftime(self.VERSION_PREFIX + '%Y%m%d_%H%M%S_'),
+                                       dir=self.MODEL_DIR)
         
-        # Save embeddings
-        embeddings_path = os.path.join(self.MODEL_DIR, self.EMBEDDINGS_FILE)
-        with open(embeddings_path, 'wb') as f:
-            pickle.dump({
-                'embeddings': self.artifact_embeddings,
-                'clusters': self.clusters,
-                'model_name': self.model_name
-            }, f)
-        
-        # Save artifact metadata
-        metadata_path = os.path.join(self.MODEL_DIR, self.METADATA_FILE)
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        # Save embeddings (already unit-normalised float32)
+        np.save(os.path.join(version_dir, self.EMBEDDINGS_FILE),
+                np.ascontiguousarray(self.artifact_embeddings, dtype=np.float32))
+        
+        # Save artifact records and the id -> row index
+        write_artifact_records(version_dir, self.artifacts)
+        with open(os.path.join(version_dir, self.METADATA_FILE), 'w', encoding='utf-8') as f:
             json.dump({
-                'artifacts': self.artifacts,
-                'artifact_index': self.artifact_index
-            }, f, ensure_ascii=False, indent=2)
+                'model_name': self.model_name,
+                'artifact_index': self.artifact_index,
+                'text_hashes': self.text_hashes,
+                'field_text_hashes': self.field_text_hashes
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        
+        # Clusters, per-field embeddings, neighbour lists and rule masks
+        for name, values in ((self.CLUSTERS_FILE, self.clusters),
+                             (self.CLUSTER_CENTERS_FILE, self.cluster_centers),
+                             (self.FIELD_EMBEDDINGS_FILE, self.field_embeddings),
+                             (self.FIELD_NEIGHBOURS_FILE, self.field_neighbours),
+                             (self.RULE_MASKS_FILE, self.rule_masks)):
+            if values is not None:
+                np.save(os.path.join(version_dir, name), np.ascontiguousarray(values))
+        
+        # Compact first-pass vectors and the approximate search index
+        if self.compact is not None:
+            self.compact.save(version_dir)
+        if self.ann_index is not None:
+            self.ann_index.save(os.path.join(version_dir, self.ANN_INDEX_FILE))
+        
+        # Switch to the new version, then drop the ones nothing should map
+        pointer_path = os.path.join(self.MODEL_DIR, CURRENT_VERSION_FILE)
+        with open(pointer_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(os.path.basename(version_dir))
+        os.replace(pointer_path + '.tmp', pointer_path)
+        self._prune_versions(keep={version_dir, previous_dir})
+        
+        print(f"Model saved to {version_dir}/")
+    
+    def _prune_versions(self, keep: set) -> None:
+        """
+        Delete model versions other than *keep*, and the files of the
+        unversioned (pre-CURRENT) layout once it is no longer current.
         
-        print(f"Model saved to {self.MODEL_DIR}/")
+        Files still mapped by a process cannot be deleted on Windows; those
+        versions are skipped and retried on the next save.
+        """
+        keep = {os.path.normpath(path) for path in keep}
+        for name in os.listdir(self.MODEL_DIR):
+            path = os.path.join(self.MODEL_DIR, name)
+            if (name.startswith(self.VERSION_PREFIX) and os.path.isdir(path)
+                    and os.path.normpath(path) not in keep):
+                shutil.rmtree(path, ignore_errors=True)
+        
+        if os.path.normpath(self.MODEL_DIR) in keep:
+            return
+        for name in (self.EMBEDDINGS_FILE, self.CLUSTERS_FILE, self.CLUSTER_CENTERS_FILE,
+                     self.METADATA_FILE, self.LEGACY_EMBEDDINGS_FILE, self.ANN_INDEX_FILE,
+                     self.FIELD_EMBEDDINGS_FILE, self.FIELD_NEIGHBOURS_FILE,
+                     self.RULE_MASKS_FILE, RECORDS_FILE, OFFSETS_FILE):
+            try:
+                os.remove(os.path.join(self.MODEL_DIR, name))
+            except OSError:
+                pass
+        try:
+            CompactEmbeddings.remove(self.MODEL_DIR)
+        except OSError:
+            pass
     
     def load_model(self) -> None:
         """Load a previously trained model from disk"""
         print("Loading trained artifact comparison model...")
+        model_dir = model_version_dir(self.MODEL_DIR)
+        
+        embeddings_path = os.path.join(model_dir, self.EMBEDDINGS_FILE)
+        if not os.path.exists(embeddings_path) or not ArtifactStore.exists(model_dir):
+            self._load_legacy_model()
+        else:
+            # Memory-map embeddings and artifact records read-only
+            self.artifact_embeddings = np.load(embeddings_path, mmap_mode='r')
+            clusters_path = os.path.join(model_dir, self.CLUSTERS_FILE)
+            self.clusters = np.load(clusters_path) if os.path.exists(clusters_path) else None
+            centers_path = os.path.join(model_dir, self.CLUSTER_CENTERS_FILE)
+            self.cluster_centers = np.load(centers_path) if os.path.exists(centers_path) else None
+            
+            metadata_path = os.path.join(model_dir, self.METADATA_FILE)
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                self.model_name = data.get('model_name', 'all-MiniLM-L6-v2')
+                self.artifact_index = data['artifact_index']
+                self.text_hashes = data.get('text_hashes', [])
+                self.field_text_hashes = data.get('field_text_hashes', {})
+            fields_path = os.path.join(model_dir, self.FIELD_EMBEDDINGS_FILE)
+            neighbours_path = os.path.join(model_dir, self.FIELD_NEIGHBOURS_FILE)
+            self.field_embeddings = (np.load(fields_path, mmap_mode='r')
+                                     if os.path.exists(fields_path) else None)
+            self.field_neighbours = (np.load(neighbours_path, mmap_mode='r')
+                                     if os.path.exists(neighbours_path) else None)
+            if isinstance(self.artifacts, ArtifactStore):
+                self.artifacts.close()
+            self.artifacts = ArtifactStore(model_dir)
+        
+        # Eras are parsed once here; the index reads records through the store
+        self.era_index = EraIntervalIndex(self.artifacts)
+        
+        # Keyword rule masks (scanned at train time; rebuilt for older models)
+        masks_path = os.path.join(model_dir, self.RULE_MASKS_FILE)
+        if os.path.exists(masks_path):
+            self.rule_masks = np.load(masks_path, mmap_mode='r')
+        else:
+            self.rule_masks = self._build_rule_masks(self.artifacts)
+        
+        # Load the approximate search index if one was built
+        self.ann_index = IVFIndex.load(os.path.join(model_dir, self.ANN_INDEX_FILE))
+        if self.ann_index is not None and len(self.ann_index.list_ids) != len(self.artifacts):
+            print("⚠ Approximate search index does not match the embeddings, using exact search")
+            self.ann_index = None
+        self.compact = CompactEmbeddings.load(model_dir)
         
-        # Load embeddings
-        embeddings_path = os.path.join(self.MODEL_DIR, self.EMBEDDINGS_FILE)
-        with open(embeddings_path, 'rb') as f:
+        # Load the sentence transformer model
+        self.model = SentenceTransformer(self.model_name)
+        self.is_trained = True
+        
+        print(f"Loaded model with {len(self.artifacts)} artifacts")
+    
+    def _load_legacy_model(self) -> None:
+        """Load a model saved in the old pickle + JSON format and convert it"""
+        model_dir = model_version_dir(self.MODEL_DIR)
+        legacy_path = os.path.join(model_dir, self.LEGACY_EMBEDDINGS_FILE)
+        with open(legacy_path, 'rb') as f:
             data = pickle.load(f)
-            self.artifact_embeddings = data['embeddings']
+            self.artifact_embeddings = _normalize_rows(data['embeddings'])
             self.clusters = data.get('clusters')
             self.model_name = data.get('model_name', 'all-MiniLM-L6-v2')
         
-        # Load metadata
-        metadata_path = os.path.join(self.MODEL_DIR, self.METADATA_FILE)
+        metadata_path = os.path.join(model_dir, self.METADATA_FILE)
         with open(metadata_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
             self.artifacts = data['artifacts']
             self.artifact_index = data['artifact_index']
+        self.ann_index = IVFIndex.load(os.path.join(model_dir, self.ANN_INDEX_FILE))
+        self.compact = CompactEmbeddings.load(model_dir)
         
-        # Load the sentence transformer model
-        self.model = SentenceTransformer(self.model_name)
-        self.is_trained = True
-        
-        print(f"Loaded model with {len(self.artifacts)} artifacts")
+        print("Converting model files to the memory-mapped format...")
+        self.save_model()
     
     def get_similarity_score(self, artifact1_id: str, artifact2_id: str) -> float:
         """
@@ -209,18 +642,21 @@ class ArtifactComparisonModel:
         if idx1 is None or idx2 is None:
             return 0.0
         
-        emb1 = self.artifact_embeddings[idx1].reshape(1, -1)
-        emb2 = self.artifact_embeddings[idx2].reshape(1, -1)
-        
-        return float(cosine_similarity(emb1, emb2)[0][0])
+        # Embeddings are unit-normalised, so cosine similarity is a dot product
+        return float(np.dot(self.artifact_embeddings[idx1], self.artifact_embeddings[idx2]))
     
-    def find_similar(self, artifact_id: str, top_k: int = 5) -> List[Dict]:
+    def find_similar(self, artifact_id: str, top_k: int = 5,
+                     n_probe: Optional[int] = None, exact: bool = False) -> List[Dict]:
         """
         Find the most similar artifacts to the given artifact.
         
         Args:
             artifact_id: ID of the artifact to find similar items for
             top_k: Number of similar artifacts to return
+            n_probe: Inverted lists to scan when the approximate index is used
+                     (more lists = better recall, slower)
+            exact: Score every artifact at full precision, ignoring the
+                   approximate index and compact search vectors
             
         Returns:
             List of similar artifacts with similarity scores
@@ -232,24 +668,282 @@ class ArtifactComparisonModel:
         if idx is None:
             return []
         
-        # Calculate similarities
-        query_embedding = self.artifact_embeddings[idx].reshape(1, -1)
-        similarities = cosine_similarity(query_embedding, self.artifact_embeddings)[0]
-        
-        # Get top-k similar (excluding self)
-        similar_indices = np.argsort(similarities)[::-1]
-        similar_indices = [i for i in similar_indices if i != idx][:top_k]
-        
+        similar_indices, scores = self._nearest_rows(
+            self.artifact_embeddings[idx], top_k, exclude=idx, n_probe=n_probe, exact=exact)
+        return self._similar_entries(idx, similar_indices, scores)
+    
+    def _similar_entries(self, idx: int, rows: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """Result records for the neighbours *rows* of artifact row *idx*"""
         results = []
-        for sim_idx in similar_indices:
+        for sim_idx, score in zip(rows.tolist(), scores.tolist()):
             artifact = self.artifacts[sim_idx].copy()
-            artifact['similarity_score'] = float(similarities[sim_idx])
+            artifact['similarity_score'] = float(score)
             artifact['same_cluster'] = (self.clusters is not None and 
                                         self.clusters[idx] == self.clusters[sim_idx])
             results.append(artifact)
+        return results
+    
+    def find_similar_many(self, artifact_ids: List[str], top_k: int = 5,
+                          n_probe: Optional[int] = None, exact: bool = False) -> List[List[Dict]]:
+        """
+        find_similar() for several artifacts in one call.
+        
+        Without an approximate index or compact search vectors (or when
+        *exact*), the queries are scored together: one matrix product per
+        block of query rows, then a row-wise top-k selection. Otherwise
+        each query takes the find_similar() path (with *n_probe*).
+        
+        Returns:
+            One list of similar artifacts per id, in order ([] for unknown ids)
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        rows = [self.artifact_index.get(a) for a in artifact_ids]
+        unique = sorted({r for r in rows if r is not None})
+        neighbours = {}
+        embeddings = self.artifact_embeddings
+        
+        first_pass = self.compact is not None and self.compact.first_pass
+        if exact or (self.ann_index is None and not first_pass):
+            n = len(embeddings)
+            k = min(top_k, n - 1)
+            block = max(1, self.BATCH_SCORE_CELLS // max(n, 1))
+            for start in range(0, len(unique) if k > 0 else 0, block):
+                chunk = np.array(unique[start:start + block])
+                scores = embeddings[chunk] @ embeddings.T
+                scores[np.arange(len(chunk)), chunk] = -np.inf
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+                for row, similar_rows, similar_scores in zip(chunk.tolist(), top, top_scores):
+                    neighbours[row] = (similar_rows, similar_scores)
+        else:
+            for row in unique:
+                neighbours[row] = self._nearest_rows(embeddings[row], top_k, exclude=row,
+                                                     n_probe=n_probe)
+        
+        return [self._similar_entries(row, *neighbours[row]) if row in neighbours else []
+                for row in rows]
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Unit-normalised embedding of a free-text query, served from a
+        bounded LRU cache for repeated queries
+        """
+        key = " ".join(str(query).split()).lower()
+        vector = self._query_cache.get(key)
+        if vector is not None:
+            self._query_cache.move_to_end(key)
+            return vector
+        if self.model is None:
+            self.model = SentenceTransformer(self.model_name)
+        vector = _normalize_rows(self.model.encode([key], convert_to_numpy=True))[0]
+        self._query_cache[key] = vector
+        if len(self._query_cache) > self.QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return vector
+    
+    def search(self, query: str, top_k: int = 10, n_probe: Optional[int] = None) -> List[Dict]:
+        """
+        Semantic search: artifacts closest in meaning to a free-text query
+        (e.g. "ritual masks for healing").
+        
+        Args:
+            query: Visitor search text
+            top_k: Number of artifacts to return
+            n_probe: Inverted lists to scan when the approximate index is used
+            
+        Returns:
+            List of artifacts with similarity scores, best first
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        if not str(query).strip():
+            return []
+        
+        rows, scores = self._nearest_rows(self.encode_query(query), top_k, n_probe=n_probe)
+        results = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            artifact = self.artifacts[row].copy()
+            artifact['similarity_score'] = float(score)
+            results.append(artifact)
+        return results
+    
+    def resolve_field_weights(self, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Weight vector over SEMANTIC_FIELDS, rescaled to sum to 1
+        
+        Args:
+            weights: Field name -> non-negative weight; fields not given get 0
+                     (None weights every field equally)
+        
+        Raises:
+            ValueError: for unknown fields, negative weights or an all-zero result
+        """
+        if not weights:
+            return np.full(len(SEMANTIC_FIELDS), 1.0 / len(SEMANTIC_FIELDS))
+        unknown = set(weights) - set(SEMANTIC_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown semantic field(s): {', '.join(sorted(unknown))}")
+        vec = np.array([float(weights.get(f, 0.0)) for f in SEMANTIC_FIELDS])
+        if (vec < 0).any() or not np.isfinite(vec).all():
+            raise ValueError("Field weights must be non-negative numbers")
+        total = vec.sum()
+        if total <= 0:
+            raise ValueError("At least one field weight must be positive")
+        return vec / total
+    
+    def find_similar_by_fields(self, artifact_id: str, weights: Optional[Dict[str, float]] = None,
+                               top_k: int = 5, exact: bool = False) -> List[Dict]:
+        """
+        Find similar artifacts by a weighted mix of per-field similarities,
+        e.g. weights={'symbolism': 1} for "similar symbolism".
+        
+        The fused score is sum_f w_f * cos_f, computed as one product of the
+        side-by-side field embeddings with a re-weighted query row. Unless
+        *exact*, only the union of the precomputed per-field neighbour lists
+        of the weighted fields is scored.
+        
+        Args:
+            artifact_id: ID of the artifact to find similar items for
+            weights: Field name -> weight over SEMANTIC_FIELDS (see resolve_field_weights)
+            top_k: Number of similar artifacts to return
+            exact: Score every artifact instead of the neighbour-list union
+            
+        Returns:
+            List of similar artifacts with 'similarity_score' and per-field
+            'field_scores'
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        if self.field_embeddings is None:
+            raise RuntimeError("Model was trained without field embeddings.")
+        
+        w = self.resolve_field_weights(weights)
+        idx = self.artifact_index.get(artifact_id)
+        if idx is None:
+            return []
+        
+        dim = self.field_embeddings.shape[1] // len(SEMANTIC_FIELDS)
+        query = np.asarray(self.field_embeddings[idx]) * np.repeat(w, dim).astype(np.float32)
+        
+        if (not exact and self.field_neighbours is not None
+                and top_k <= self.field_neighbours.shape[2]):
+            candidates = np.unique(self.field_neighbours[w > 0, idx].ravel())
+            scores = self.field_embeddings[candidates] @ query
+            top = self._top_k_indices(scores, top_k)
+            rows, fused = candidates[top], scores[top]
+        else:
+            scores = self.field_embeddings @ query
+            rows = self._top_k_indices(scores, top_k, exclude=idx)
+            fused = scores[rows]
+        
+        results = []
+        for row, score in zip(rows.tolist(), fused.tolist()):
+            artifact = self.artifacts[row].copy()
+            artifact['similarity_score'] = float(score)
+            artifact['field_scores'] = {
+                field: float(self.field_embeddings[row, j * dim:(j + 1) * dim]
+                             @ self.field_embeddings[idx, j * dim:(j + 1) * dim])
+                for j, field in enumerate(SEMANTIC_FIELDS)
+            }
+            artifact['same_cluster'] = (self.clusters is not None and 
+                                        self.clusters[idx] == self.clusters[row])
+            results.append(artifact)
         
         return results
     
+    def _nearest_rows(self, query: np.ndarray, top_k: int, exclude: Optional[int] = None,
+                      n_probe: Optional[int] = None, exact: bool = False
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows most similar to a unit query vector, best first, with their
+        full-precision scores.
+        
+        Candidates come from the approximate index (if built) and are
+        narrowed with the compact vectors (if built) before the final
+        full-precision scoring.
+        """
+        embeddings = self.artifact_embeddings
+        if exact:
+            similarities = embeddings @ query
+            rows = self._top_k_indices(similarities, top_k, exclude=exclude)
+            return rows, similarities[rows]
+        
+        candidates = None
+        if self.ann_index is not None:
+            candidates = self.ann_index.candidates(query, n_probe)
+            if exclude is not None:
+                candidates = candidates[candidates != exclude]
+        
+        if self.compact is not None and self.compact.first_pass:
+            approx = self.compact.scores(query, candidates)
+            keep = max(top_k * RERANK_FACTOR, RERANK_MIN)
+            if candidates is None:
+                candidates = self._top_k_indices(approx, keep, exclude=exclude)
+            else:
+                candidates = candidates[self._top_k_indices(approx, keep)]
+        
+        if candidates is None:
+            # Calculate similarities (one matmul against the unit-normalised matrix)
+            similarities = embeddings @ query
+            rows = self._top_k_indices(similarities, top_k, exclude=exclude)
+            return rows, similarities[rows]
+        
+        # Full-precision re-rank of the candidates (ascending rows read the memmap in order)
+        candidates = np.sort(candidates)
+        similarities = embeddings[candidates] @ query
+        top = self._top_k_indices(similarities, top_k)
+        return candidates[top], similarities[top]
+    
+    def compact_report(self, k: int = 10, sample: int = 200) -> Dict:
+        """
+        Memory saved by the compact search vectors and their recall@k
+        (after re-ranking) against exact full-precision search.
+        
+        Vectors that are not a first pass (full width, see
+        CompactEmbeddings.first_pass) save no search memory: queries scan
+        the float32 embeddings, so recall is exact.
+        """
+        n = len(self.artifact_embeddings)
+        full_bytes = self.artifact_embeddings.shape[0] * self.artifact_embeddings.shape[1] * 4
+        first_pass = self.compact is not None and self.compact.first_pass
+        compact_bytes = self.compact.nbytes if first_pass else full_bytes
+        k = min(k, n - 1)
+        
+        hits = 0
+        rows = np.random.default_rng(0).choice(n, size=min(sample, n), replace=False)
+        for row in rows.tolist():
+            query = self.artifact_embeddings[row]
+            expected = self._nearest_rows(query, k, exclude=row, exact=True)[0]
+            found = self._nearest_rows(query, k, exclude=row)[0]
+            hits += len(np.intersect1d(found, expected))
+        
+        return {
+            'k': k,
+            'storage': self.compact.storage if self.compact is not None else 'float32',
+            'first_pass': first_pass,
+            'full_mb': full_bytes / 2 ** 20,
+            'compact_mb': compact_bytes / 2 ** 20,
+            'memory_saved_pct': 100.0 * (1 - compact_bytes / full_bytes),
+            'recall': hits / (k * len(rows)) if k > 0 and len(rows) else 1.0,
+        }
+    
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int, exclude: Optional[int] = None) -> np.ndarray:
+        """Indices of the top_k highest scores, best first, skipping *exclude*"""
+        if exclude is not None:
+            scores = scores.copy()
+            scores[exclude] = -np.inf
+        k = min(top_k, len(scores) - (exclude is not None))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+    
     def compare_artifacts(self, artifact1_id: str, artifact2_id: str) -> Dict:
         """
         Generate a detailed comparison between two artifacts using the trained model.
@@ -265,11 +959,44 @@ class ArtifactComparisonModel:
         if not self.is_trained:
             raise RuntimeError("Model not trained. Call train() first.")
         
-        artifact1 = self.artifacts[self.artifact_index[artifact1_id]]
-        artifact2 = self.artifacts[self.artifact_index[artifact2_id]]
+        idx1 = self.artifact_index[artifact1_id]
+        idx2 = self.artifact_index[artifact2_id]
+        return self._comparison(idx1, idx2, self.get_similarity_score(artifact1_id, artifact2_id))
+    
+    def compare_many(self, pairs: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        compare_artifacts() for many (artifact1_id, artifact2_id) pairs.
+        
+        The similarity scores of all pairs come from one row-wise product
+        of the two sides' embedding rows.
         
-        # Calculate similarity score
-        similarity_score = self.get_similarity_score(artifact1_id, artifact2_id)
+        Returns:
+            One comparison per pair, in order; pairs with an unknown id get
+            {'error': ...} instead
+        """
+        if not self.is_trained:
+            raise RuntimeError("Model not trained. Call train() first.")
+        
+        index = [(self.artifact_index.get(a), self.artifact_index.get(b)) for a, b in pairs]
+        results: List[Dict] = [{'error': f"Unknown artifact in pair ({a}, {b})"} for a, b in pairs]
+        valid = [i for i, (idx1, idx2) in enumerate(index) if idx1 is not None and idx2 is not None]
+        if not valid:
+            return results
+        
+        rows1 = np.array([index[i][0] for i in valid])
+        rows2 = np.array([index[i][1] for i in valid])
+        embeddings = self.artifact_embeddings
+        scores = np.einsum('ij,ij->i', embeddings[rows1], embeddings[rows2])
+        for i, score in zip(valid, scores.tolist()):
+            results[i] = self._comparison(index[i][0], index[i][1], score)
+        return results
+    
+    def _comparison(self, idx1: int, idx2: int, similarity_score: float) -> Dict:
+        """Comparison of artifact rows *idx1* and *idx2* given their similarity"""
+        artifact1 = self.artifacts[idx1]
+        artifact2 = self.artifacts[idx2]
+        masks1 = self._masks_at(idx1)
+        masks2 = self._masks_at(idx2)
         
         # Determine relationship type based on similarity
         if similarity_score >= 0.8:
@@ -282,8 +1009,9 @@ class ArtifactComparisonModel:
             relationship_type = "distinct"
         
         # Extract detailed similarities and differences
-        similarities = self._extract_similarities(artifact1, artifact2, similarity_score)
-        differences = self._extract_differences(artifact1, artifact2)
+        similarities = self._extract_similarities(artifact1, artifact2, similarity_score,
+                                                  masks1, masks2)
+        differences = self._extract_differences(artifact1, artifact2, masks1, masks2)
         
         # Generate comparison narrative
         comparison_text = self._generate_comparison_text(
@@ -299,24 +1027,30 @@ class ArtifactComparisonModel:
             'differences': differences,
             'comparison': comparison_text,
             'same_cluster': (self.clusters is not None and 
-                           self.clusters[self.artifact_index[artifact1_id]] == 
-                           self.clusters[self.artifact_index[artifact2_id]])
+                           self.clusters[idx1] == self.clusters[idx2])
         }
     
-    def _extract_similarities(self, a1: Dict, a2: Dict, score: float) -> List[str]:
-        """Extract meaningful similarities between two artifacts"""
+    def _extract_similarities(self, a1: Dict, a2: Dict, score: float,
+                              m1: Optional[RuleMasks] = None,
+                              m2: Optional[RuleMasks] = None) -> List[str]:
+        """
+        Extract meaningful similarities between two artifacts.
+        Keyword rules are bitwise tests on the artifacts' rule masks.
+        """
+        m1 = m1 or _rule_masks(a1)
+        m2 = m2 or _rule_masks(a2)
         similarities = []
         
         # Category similarity
         if a1.get('category') == a2.get('category'):
             similarities.append(f"Both are {a1['category']}s, serving similar ceremonial or functional purposes")
-        elif self._categories_related(a1.get('category', ''), a2.get('category', '')):
+        elif self._category_masks_related(m1.category, m2.category):
             similarities.append(f"Related artifact types: {a1['category']} and {a2['category']}")
         
         # Origin similarity
         if a1.get('origin') == a2.get('origin'):
             similarities.append(f"Both originate from {a1['origin']}, sharing cultural heritage")
-        elif self._origins_related(a1.get('origin', ''), a2.get('origin', '')):
+        elif m1.origin and m2.origin:
             region1 = self._extract_region(a1.get('origin', ''))
             region2 = self._extract_region(a2.get('origin', ''))
             if region1 and region2:
@@ -329,31 +1063,29 @@ class ArtifactComparisonModel:
                 similarities.append(f"Contemporary artifacts from overlapping time periods ({a1['era']} and {a2['era']})")
         
         # Material similarity
-        common_materials = self._find_common_materials(
-            a1.get('materials', ''), a2.get('materials', '')
-        )
+        common_materials = self._common_material_names(m1.materials, m2.materials)
         if common_materials:
             similarities.append(f"Share common materials: {', '.join(common_materials)}")
         
         # Functional similarity
         if score >= 0.5:
-            func_similarity = self._analyze_function_similarity(
-                a1.get('function', ''), a2.get('function', '')
-            )
+            func_similarity = self._function_mask_similarity(m1.function, m2.function)
             if func_similarity:
                 similarities.append(func_similarity)
         
         # Symbolic similarity
-        symbolic_themes = self._find_common_themes(
-            a1.get('symbolism', ''), a2.get('symbolism', '')
-        )
+        symbolic_themes = self._common_theme_names(m1.symbolism, m2.symbolism)
         if symbolic_themes:
             similarities.append(f"Share symbolic themes: {', '.join(symbolic_themes)}")
         
         return similarities if similarities else ["These artifacts represent distinct cultural traditions"]
     
-    def _extract_differences(self, a1: Dict, a2: Dict) -> List[str]:
+    def _extract_differences(self, a1: Dict, a2: Dict,
+                             m1: Optional[RuleMasks] = None,
+                             m2: Optional[RuleMasks] = None) -> List[str]:
         """Extract meaningful differences between two artifacts"""
+        m1 = m1 or _rule_masks(a1)
+        m2 = m2 or _rule_masks(a2)
         differences = []
         
         # Origin difference
@@ -370,9 +1102,7 @@ class ArtifactComparisonModel:
                 differences.append(f"Different historical periods: {a1.get('era', 'Unknown')} vs {a2.get('era', 'Unknown')}")
         
         # Material differences
-        unique_materials = self._find_unique_materials(
-            a1.get('materials', ''), a2.get('materials', '')
-        )
+        unique_materials = self._unique_material_names(m1.materials, m2.materials)
         if unique_materials:
             differences.append(f"Different primary materials used in construction")
         
@@ -436,37 +1166,32 @@ class ArtifactComparisonModel:
         
         return "\n".join(sections)
     
-    # Helper methods for comparison analysis
-    def _categories_related(self, cat1: str, cat2: str) -> bool:
-        """Check if categories are related"""
-        cat1_lower = cat1.lower()
-        cat2_lower = cat2.lower()
-        
-        related_groups = [
-            ['sword', 'weapon', 'blade', 'dagger'],
-            ['mask', 'headdress', 'crown', 'ceremonial'],
-            ['drum', 'musical', 'instrument', 'bell'],
-            ['statue', 'sculpture', 'figure', 'idol'],
-            ['jewelry', 'ornament', 'pendant', 'necklace'],
-            ['vessel', 'pot', 'container', 'bowl']
-        ]
-        
-        for group in related_groups:
-            if any(term in cat1_lower for term in group) and any(term in cat2_lower for term in group):
-                return True
-        return False
+    # Helper methods for comparison analysis (bitwise rules on RuleMasks)
+    @staticmethod
+    def _category_masks_related(mask1: int, mask2: int) -> bool:
+        """Both categories mention a term from the same related group"""
+        return any(mask1 & group and mask2 & group for group in _CATEGORY_GROUP_MASKS)
     
-    def _origins_related(self, origin1: str, origin2: str) -> bool:
-        """Check if origins are from related regions"""
-        asian_countries = ['sri lanka', 'india', 'china', 'japan', 'korea', 'thailand', 'indonesia', 'nepal', 'tibet']
-        
-        origin1_lower = origin1.lower()
-        origin2_lower = origin2.lower()
-        
-        is_asian1 = any(country in origin1_lower for country in asian_countries)
-        is_asian2 = any(country in origin2_lower for country in asian_countries)
-        
-        return is_asian1 and is_asian2
+    @staticmethod
+    def _common_material_names(mask1: int, mask2: int) -> List[str]:
+        return _MATERIAL_MATCHER.names(mask1 & mask2 & _COMMON_MATERIALS_MASK)
+    
+    @staticmethod
+    def _unique_material_names(mask1: int, mask2: int) -> List[str]:
+        unique_bits = (mask1 ^ mask2) & _UNIQUE_MATERIALS_MASK
+        return [f"{m} (first artifact)" if mask1 & _MATERIAL_MATCHER.bits([m]) else f"{m} (second artifact)"
+                for m in _MATERIAL_MATCHER.names(unique_bits)]
+    
+    @staticmethod
+    def _function_mask_similarity(mask1: int, mask2: int) -> Optional[str]:
+        for group, message in _FUNCTION_GROUP_MASKS:
+            if mask1 & group and mask2 & group:
+                return message
+        return None
+    
+    @staticmethod
+    def _common_theme_names(mask1: int, mask2: int) -> List[str]:
+        return [theme for theme, group in _THEME_MASKS if mask1 & group and mask2 & group]
     
     def _extract_region(self, origin: str) -> str:
         """Extract main region from origin string"""
@@ -481,95 +1206,22 @@ class ArtifactComparisonModel:
         return origin.split('—')[0].strip() if '—' in origin else origin.split(',')[0].strip()
     
     def _eras_overlap(self, era1: str, era2: str) -> bool:
-        """Check if two eras overlap"""
-        import re
-        
-        def extract_years(era):
-            numbers = re.findall(r'\d+', era)
-            if len(numbers) >= 2:
-                return (int(numbers[0]), int(numbers[-1]))
-            elif len(numbers) == 1:
-                num = int(numbers[0])
-                return (num - 100, num + 100)
-            return None
-        
-        years1 = extract_years(era1)
-        years2 = extract_years(era2)
-        
-        if years1 and years2:
-            return not (years1[1] < years2[0] or years2[1] < years1[0])
-        return False
-    
-    def _find_common_materials(self, mat1: str, mat2: str) -> List[str]:
-        """Find common materials between two artifacts"""
-        materials = ['gold', 'silver', 'bronze', 'brass', 'copper', 'iron', 'steel',
-                    'wood', 'ivory', 'jade', 'stone', 'clay', 'ceramic', 'silk',
-                    'leather', 'lacquer', 'enamel', 'gemstone', 'pearl']
-        
-        mat1_lower = mat1.lower()
-        mat2_lower = mat2.lower()
-        
-        return [m for m in materials if m in mat1_lower and m in mat2_lower]
-    
-    def _find_unique_materials(self, mat1: str, mat2: str) -> List[str]:
-        """Find materials unique to each artifact"""
-        common = self._find_common_materials(mat1, mat2)
-        materials = ['gold', 'silver', 'bronze', 'brass', 'copper', 'iron', 'steel',
-                    'wood', 'ivory', 'jade', 'stone', 'clay', 'ceramic']
-        
-        mat1_lower = mat1.lower()
-        mat2_lower = mat2.lower()
-        
-        unique = []
-        for m in materials:
-            if m not in common:
-                if m in mat1_lower:
-                    unique.append(f"{m} (first artifact)")
-                elif m in mat2_lower:
-                    unique.append(f"{m} (second artifact)")
-        return unique
-    
-    def _analyze_function_similarity(self, func1: str, func2: str) -> Optional[str]:
-        """Analyze functional similarity between artifacts"""
-        ceremonial_terms = ['ceremony', 'ritual', 'religious', 'sacred', 'worship', 'temple']
-        royal_terms = ['royal', 'king', 'queen', 'palace', 'court', 'noble']
-        military_terms = ['war', 'battle', 'military', 'warrior', 'combat', 'weapon']
-        
-        func1_lower = func1.lower()
-        func2_lower = func2.lower()
-        
-        if any(t in func1_lower for t in ceremonial_terms) and any(t in func2_lower for t in ceremonial_terms):
-            return "Both serve ceremonial or religious purposes"
-        if any(t in func1_lower for t in royal_terms) and any(t in func2_lower for t in royal_terms):
-            return "Both associated with royal or noble contexts"
-        if any(t in func1_lower for t in military_terms) and any(t in func2_lower for t in military_terms):
-            return "Both have military or warrior associations"
-        return None
-    
-    def _find_common_themes(self, sym1: str, sym2: str) -> List[str]:
-        """Find common symbolic themes"""
-        themes = {
-            'power': ['power', 'authority', 'strength', 'dominance'],
-            'spirituality': ['spiritual', 'divine', 'sacred', 'holy', 'religious'],
-            'protection': ['protection', 'guard', 'ward', 'shield', 'amulet'],
-            'prosperity': ['prosperity', 'wealth', 'fortune', 'abundance'],
-            'wisdom': ['wisdom', 'knowledge', 'enlightenment', 'learning']
-        }
-        
-        sym1_lower = sym1.lower()
-        sym2_lower = sym2.lower()
-        
-        common = []
-        for theme, keywords in themes.items():
-            if any(k in sym1_lower for k in keywords) and any(k in sym2_lower for k in keywords):
-                common.append(theme)
-        
-        return common
+        """Check if two eras overlap (eras are parsed once at load time)"""
+        if self.era_index is None:
+            return intervals_overlap(parse_era(era1), parse_era(era2))
+        return self.era_index.eras_overlap(era1, era2)
 
 
 # Training script - run this to train the model
-def train_model():
-    """Train the artifact comparison model using the dataset"""
+def train_model(encode_workers: Optional[int] = None, ann_lists: Optional[int] = None):
+    """
+    Train the artifact comparison model using the dataset
+    
+    Args:
+        encode_workers: CPU encoder processes (default: ENCODE_WORKERS env var, or 1)
+        ann_lists: Inverted lists for the approximate search index (default:
+                   ANN_LISTS env var; unset = exact search)
+    """
     import pandas as pd
     
     print("Loading artifact dataset...")
@@ -606,7 +1258,11 @@ def train_model():
     
     # Create and train the model
     model = ArtifactComparisonModel(model_name='all-MiniLM-L6-v2')
-    model.train(artifacts, n_clusters=5)
+    if encode_workers is None:
+        encode_workers = int(os.getenv('ENCODE_WORKERS', '1'))
+    if ann_lists is None and os.getenv('ANN_LISTS'):
+        ann_lists = int(os.getenv('ANN_LISTS'))
+    model.train(artifacts, n_clusters=5, encode_workers=encode_workers, ann_lists=ann_lists)
     
     # Test the model
     print("\n--- Testing Model ---")
@@ -0,0 +1,135 @@
+"""
+Artifact Record Store - Compact on-disk artifact metadata with lazy access
+Records are stored one compact JSON object per line, with a byte-offset index,
+so processes memory-map the file and decode only the artifacts they touch
+"""
+
+import json
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+
+RECORDS_FILE = "artifact_records.jsonl"
+OFFSETS_FILE = "artifact_records.offsets.npy"
+
+# Names the model version directory currently in use (see model_version_dir)
+CURRENT_VERSION_FILE = "CURRENT"
+
+# Decoded records kept per store (bounds memory for large catalogs)
+RECORD_CACHE_SIZE = 1024
+
+
+def write_artifact_records(directory: str, artifacts: Iterable[Dict]) -> int:
+    """
+    Write artifacts as JSON lines plus their offset index
+
+    Files are written to temporary names and renamed into place, so a crash
+    never leaves a half-written store. Write into a fresh directory rather
+    than over files another process has mapped (see model_version_dir).
+
+    Returns:
+        Number of records written
+    """
+    records_path = os.path.join(directory, RECORDS_FILE)
+    offsets_path = os.path.join(directory, OFFSETS_FILE)
+    offsets = [0]
+    with open(records_path + '.tmp', 'wb') as f:
+        for artifact in artifacts:
+            line = json.dumps(artifact, ensure_ascii=False, separators=(',', ':'), default=str)
+            f.write(line.encode('utf-8') + b'\n')
+            offsets.append(f.tell())
+    with open(offsets_path + '.tmp', 'wb') as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+    os.replace(records_path + '.tmp', records_path)
+    os.replace(offsets_path + '.tmp', offsets_path)
+    return len(offsets) - 1
+
+
+def model_version_dir(root: str) -> str:
+    """
+    Directory holding the current model version under *root*
+
+    Each save writes a new version subdirectory and then switches
+    CURRENT_VERSION_FILE to it, so files a running process has memory-mapped
+    are never replaced. Models saved before versioning live in *root* itself.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_VERSION_FILE), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except OSError:
+        return root
+    path = os.path.join(root, name)
+    return path if name and os.path.isdir(path) else root
+
+
+class ArtifactStore:
+    """
+    Read-only, list-like view over a record file written by
+    write_artifact_records(). Records are decoded on first access and kept
+    in a small LRU cache; treat them as read-only (copy before modifying).
+    """
+
+    def __init__(self, directory: str):
+        """
+        Memory-map the record file in *directory*
+
+        Args:
+            directory: Directory containing RECORDS_FILE and OFFSETS_FILE
+        """
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode='r')
+        self._file = open(os.path.join(directory, RECORDS_FILE), 'rb')
+        self._data = None
+        if self.offsets[-1] > 0:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._cache: 'OrderedDict[int, Dict]' = OrderedDict()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """Check if a record store has been written to *directory*"""
+        return (os.path.exists(os.path.join(directory, RECORDS_FILE)) and
+                os.path.exists(os.path.join(directory, OFFSETS_FILE)))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('artifact record index out of range')
+
+        record = self._cache.get(i)
+        if record is not None:
+            self._cache.move_to_end(i)
+            return record
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        record = json.loads(self._data[start:end].decode('utf-8'))
+        self._cache[i] = record
+        if len(self._cache) > RECORD_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return record
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self) -> None:
+        """Release the memory map and file handle"""
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+
+
+def read_artifacts(directory: str) -> List[Dict]:
+    """Load every artifact record from *directory* into a list"""
+    store = ArtifactStore(directory)
+    try:
+        return list(store)
+    finally:
+        store.close()
@@ -0,0 +1,120 @@
+"""
+Benchmark the approximate (IVF) similar-artifact search against exact search.
+
+Reports recall@k and per-query latency for a range of probe counts, and for
+the compact (int8/float16, PCA-reduced) first pass with full-precision
+re-ranking, on the trained model's embeddings (--trained) or
+on a synthetic clustered catalog sized like a partner museum collection.
+
+    python benchmark_ann.py --size 200000 --dim 384 --k 10
+    python benchmark_ann.py --trained
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ann_index import IVFIndex, ANN_TARGET_RECALL
+from artifact_store import model_version_dir
+from compact_embeddings import CompactEmbeddings, RERANK_FACTOR, RERANK_MIN
+
+
+def synthetic_embeddings(size: int, dim: int, n_topics: int = 500, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random topic centres (like real embeddings)"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, n_topics, size)] + \
+        1.5 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def trained_embeddings() -> np.ndarray:
+    """Embeddings saved by ArtifactComparisonModel.train()"""
+    vectors = np.load(os.path.join(model_version_dir('trained_model'), 'artifact_embeddings.npy'))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_top_k(embeddings: np.ndarray, row: int, k: int) -> np.ndarray:
+    scores = embeddings @ embeddings[row]
+    scores[row] = -np.inf
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='synthetic catalog size')
+    parser.add_argument('--dim', type=int, default=384, help='embedding dimension')
+    parser.add_argument('--k', type=int, default=10, help='neighbours per query')
+    parser.add_argument('--queries', type=int, default=200, help='queries to time')
+    parser.add_argument('--lists', type=int, default=None, help='inverted lists (default ~sqrt(N))')
+    parser.add_argument('--pca', type=int, default=None, help='PCA dims for the compact rows (default: d/8, d/4, d/2)')
+    parser.add_argument('--trained', action='store_true', help='use trained_model/ embeddings')
+    args = parser.parse_args()
+
+    embeddings = trained_embeddings() if args.trained else synthetic_embeddings(args.size, args.dim)
+    n = len(embeddings)
+    k = min(args.k, n - 1)
+    print(f"Catalog: {n} x {embeddings.shape[1]} embeddings, k={k}")
+
+    start = time.time()
+    index = IVFIndex.build(embeddings, n_lists=args.lists)
+    print(f"Built {index.n_lists} inverted lists in {time.time() - start:.2f}s")
+    recall = index.calibrate(embeddings, k=k)
+    print(f"Calibrated default: {index.n_probe} probes for recall@{k} {recall:.3f} "
+          f"(target {ANN_TARGET_RECALL})\n")
+
+    rng = np.random.default_rng(1)
+    queries = rng.choice(n, size=min(args.queries, n), replace=False)
+
+    start = time.perf_counter()
+    truth = [exact_top_k(embeddings, q, k) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{'probes':>8} {'recall@' + str(k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>8} {1.0:>10.3f} {exact_ms:>10.3f} {1.0:>7.1f}x")
+
+    probes = [p for p in (1, 2, 4, 8, 16, 32, 64) if p <= index.n_lists]
+    for n_probe in probes:
+        hits = 0
+        start = time.perf_counter()
+        results = [index.search(embeddings, embeddings[q], k, n_probe=n_probe, exclude=q)[0]
+                   for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        for found, expected in zip(results, truth):
+            hits += len(np.intersect1d(found, expected))
+        recall = hits / (k * len(queries))
+        print(f"{n_probe:>8} {recall:>10.3f} {ms:>10.3f} {exact_ms / ms:>7.1f}x")
+
+    print(f"\n{'storage':>14} {'MB':>8} {'saved':>6} {'recall@' + str(k):>10} {'ms/query':>10}")
+    print(f"{'float32':>14} {embeddings.nbytes / 2 ** 20:>8.1f} {'0%':>6} {1.0:>10.3f} {exact_ms:>10.3f}")
+    keep = max(k * RERANK_FACTOR, RERANK_MIN)
+    dim = embeddings.shape[1]
+    # Only PCA-reduced codes make a first pass (see CompactEmbeddings.first_pass)
+    pca_options = [args.pca] if args.pca else [dim // 8, dim // 4, dim // 2]
+    for pca_dims in pca_options:
+        for storage in ('float16', 'int8'):
+            compact = CompactEmbeddings.build(embeddings, storage, pca_dims)
+            label = f"{storage}/pca{pca_dims}"
+            if not compact.first_pass:
+                print(f"{label:>14} {'(not a first pass: queries scan float32)':>38}")
+                continue
+            hits = 0
+            start = time.perf_counter()
+            results = []
+            for q in queries:
+                approx = compact.scores(embeddings[q])
+                approx[q] = -np.inf
+                shortlist = np.argpartition(-approx, keep - 1)[:keep]
+                full = embeddings[shortlist] @ embeddings[q]
+                results.append(shortlist[np.argsort(-full)[:k]])
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            for found, expected in zip(results, truth):
+                hits += len(np.intersect1d(found, expected))
+            saved = 100 * (1 - compact.nbytes / embeddings.nbytes)
+            print(f"{label:>14} {compact.nbytes / 2 ** 20:>8.1f} {saved:>5.0f}% "
+                  f"{hits / (k * len(queries)):>10.3f} {ms:>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Compact Embeddings - Quantized / dimension-reduced first-pass search vectors
+Scores a query against a small int8 or float16 (optionally PCA-reduced) copy of
+the embedding matrix; callers re-rank the best candidates at full precision
+"""
+
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+STORAGE_MODES = ('float32', 'float16', 'int8')
+
+# First-pass candidates re-ranked at full precision: max(top_k * factor, min)
+RERANK_FACTOR = 10
+RERANK_MIN = 100
+
+CODES_FILE = "artifact_search_codes.npy"
+PARAMS_FILE = "artifact_search_params.npz"
+
+# Rows decoded to float32 at a time while scoring (bounds temporary memory)
+_SCORE_CHUNK = 4096
+
+
+class CompactEmbeddings:
+    """
+    First-pass search representation of unit-normalised embeddings.
+
+    Optionally projects onto the top principal directions (uncentred, so
+    inner products are preserved) and stores the result as float16 or as
+    int8 codes with one scale per row.
+
+    numpy has no fast float16 or int8 matrix products, so codes are widened
+    to float32 to be scored: PCA-reduced float16 codes once when loaded,
+    int8 codes chunk by chunk on every query. Widening full-width codes
+    costs more than scanning the float32 matrix itself, so without PCA
+    both are storage formats only (see first_pass).
+    """
+
+    def __init__(self, codes: np.ndarray, storage: str,
+                 scales: Optional[np.ndarray] = None,
+                 projection: Optional[np.ndarray] = None):
+        self.codes = codes
+        self.storage = storage
+        self.scales = scales
+        self.projection = projection
+        # Scoring copy of the codes; only float16 codes get a separate one
+        self._search_codes = codes
+        if storage == 'float16' and projection is not None:
+            self._search_codes = np.asarray(codes, dtype=np.float32)
+
+    @property
+    def first_pass(self) -> bool:
+        """
+        Whether scoring these vectors is cheaper than scanning the full
+        float32 matrix: only PCA-reduced ones are (full-width float16 and
+        int8 codes only save disk)
+        """
+        return self.projection is not None
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, storage: str = 'int8',
+              pca_dims: Optional[int] = None) -> 'CompactEmbeddings':
+        """
+        Build the compact form of *embeddings*
+
+        Args:
+            embeddings: (N, d) unit-normalised float32 vectors
+            storage: 'float32', 'float16' or 'int8'
+            pca_dims: Keep only this many principal directions (None = all)
+        """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"storage must be one of {', '.join(STORAGE_MODES)}")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        projection = None
+        if pca_dims and pca_dims < embeddings.shape[1]:
+            # Top eigenvectors of E^T E: the best rank-k subspace for inner products
+            _, vectors = np.linalg.eigh(embeddings.T.astype(np.float64) @ embeddings)
+            projection = np.ascontiguousarray(vectors[:, ::-1][:, :pca_dims], dtype=np.float32)
+            embeddings = embeddings @ projection
+
+        scales = None
+        if storage == 'int8':
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        else:
+            codes = embeddings.astype(storage)
+        return cls(codes, storage, scales, projection)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the compact representation while searching"""
+        total = self._search_codes.nbytes
+        for extra in (self.scales, self.projection):
+            if extra is not None:
+                total += extra.nbytes
+        return total
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate inner products of *query* (a full-precision unit vector)
+        with every row, or only with *rows*
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if self.projection is not None:
+            query = query @ self.projection
+        codes = self._search_codes if rows is None else self._search_codes[rows]
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_CHUNK):
+            chunk = codes[start:start + _SCORE_CHUNK].astype(np.float32, copy=False)
+            out[start:start + _SCORE_CHUNK] = chunk @ query
+        if self.scales is not None:
+            out *= self.scales if rows is None else self.scales[rows]
+        return out
+
+    def save(self, directory: str) -> None:
+        """
+        Save codes (.npy) and quantisation/projection parameters (.npz)
+
+        The codes are renamed into place once fully written; save into a
+        fresh model version directory, since running services may have the
+        previous codes memory-mapped.
+        """
+        codes_path = os.path.join(directory, CODES_FILE)
+        with open(codes_path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.codes))
+        os.replace(codes_path + '.tmp', codes_path)
+        params: Dict[str, np.ndarray] = {'storage': np.array(self.storage)}
+        if self.scales is not None:
+            params['scales'] = self.scales
+        if self.projection is not None:
+            params['projection'] = self.projection
+        np.savez(os.path.join(directory, PARAMS_FILE), **params)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['CompactEmbeddings']:
+        """Load a compact form saved with save(); None if there is none"""
+        codes_path = os.path.join(directory, CODES_FILE)
+        params_path = os.path.join(directory, PARAMS_FILE)
+        if not (os.path.exists(codes_path) and os.path.exists(params_path)):
+            return None
+        with np.load(params_path) as params:
+            return cls(np.load(codes_path, mmap_mode='r'), str(params['storage']),
+                       params['scales'] if 'scales' in params else None,
+                       params['projection'] if 'projection' in params else None)
+
+    @staticmethod
+    def remove(directory: str) -> None:
+        """Delete saved compact files from *directory*, if any"""
+        for name in (CODES_FILE, PARAMS_FILE):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,7 +1,19 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 import re
+from typing import NamedTuple
 
 # Minimum combined score required to appear in results (0–1 scale).
 # Set very low — we rely on sorting so the best matches always rank first,
@@ -18,6 +30,30 @@ FIELD_WEIGHTS = {
     'notes':     0.08,
 }
 
+# Bump whenever the index layout or scoring inputs change so stale
+# on-disk snapshots are rebuilt instead of loaded.
+INDEX_SNAPSHOT_VERSION = 1
+
+# Incremental edits are projected through the fitted vocabularies; once the
+# share of changed rows or of unseen TF-IDF terms passes this fraction a
+# background refit rebuilds the index and swaps it in.
+REFIT_DRIFT_THRESHOLD = 0.15
+
+# Memory budget for cached per-field similarity vectors (float32, one
+# catalog x fields array per query artifact), so re-weighted requests for
+# the same artifact skip the sparse product.  Least recently used entries
+# are evicted past this many bytes; the newest entry is always kept.
+FIELD_SIMILARITY_CACHE_BYTES = 64 * 2 ** 20
+
+# Query x artifact pairs scored per sparse product in batch calls; the
+# dense intermediates hold about 13 float64 values per pair (~110 MB at
+# this budget), so the number of queries per chunk shrinks as the catalog grows.
+BATCH_SCORE_CELLS = 2 ** 20
+
+# Share of the hybrid score taken by the embedding (semantic) similarity;
+# the rest is the lexical FIELD_WEIGHTS score.
+HYBRID_SEMANTIC_WEIGHT = 0.5
+
 _STOP_WORDS = frozenset([
     'a', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'but', 'by',
     'for', 'from', 'has', 'have', 'in', 'is', 'it', 'its', 'of', 'on',
@@ -43,23 +79,145 @@ def _tokenize(text: str) -> set:
     return {w for w in words if w not in _STOP_WORDS}
 
 
-def _jaccard(set1: set, set2: set) -> float:
-    """Jaccard similarity between two token sets."""
-    if not set1 or not set2:
-        return 0.0
-    union = set1 | set2
-    inter = set1 & set2
-    return len(inter) / len(union)
+def _token_incidence(token_ids, width: int) -> sparse.csr_matrix:
+    """Binary document x token matrix from per-document token-id tuples."""
+    indptr = np.zeros(len(token_ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(t) for t in token_ids])
+    indices = np.fromiter((t for ids in token_ids for t in ids),
+                          dtype=np.int64, count=int(indptr[-1]))
+    data = np.ones(len(indices), dtype=np.float64)
+    return sparse.csr_matrix((data, indices, indptr),
+                             shape=(len(token_ids), max(width, 1)))
 
 
-class ComparisonEngine:
-    def __init__(self, artifacts):
+def _make_vectorizer(vocabulary=None) -> TfidfVectorizer:
+    """Per-field TF-IDF vectorizer (shared by fitting and snapshot reload)."""
+    return TfidfVectorizer(
+        ngram_range=(1, 2),
+        max_features=500,
+        sublinear_tf=True,
+        stop_words='english',
+        min_df=1,
+        max_df=0.85,  # ignore terms in >85% of docs (too common to discriminate)
+        vocabulary=vocabulary,
+    )
+
+
+# Leading qualifiers stripped from origin regions ("South India" -> "india")
+_REGION_QUALIFIERS = frozenset([
+    'north', 'south', 'east', 'west', 'central', 'ancient',
+    'northern', 'southern', 'eastern', 'western',
+])
+
+# Facets that find_similar(filters=...) accepts
+FILTER_FACETS = ('category', 'origin', 'materials', 'is_sri_lankan')
+
+
+def _origin_regions(origin: str) -> set:
+    """Normalised region keys for an origin string.
+
+    "Sri Lanka — Kandyan Kingdom" -> {"sri lanka"},
+    "China & SE Asia" -> {"china & se asia", "china", "se asia"},
+    "West/Central Africa" -> {"west/central africa", "central africa", "africa"}.
+    """
+    head = re.split(r'[—(,]', str(origin).lower(), maxsplit=1)[0].strip()
+    if not head or head == 'nan':
+        return set()
+    regions = {head}
+    for part in re.split(r'\s*[&/]\s*|\s+and\s+', head):
+        words = part.split()
+        regions.add(part)
+        while words and words[0] in _REGION_QUALIFIERS:
+            words = words[1:]
+        if words:
+            regions.add(' '.join(words))
+    regions.discard('')
+    return {r for r in regions if r not in _REGION_QUALIFIERS}
+
+
+def _bitmap_rows(bitmap: int, n: int) -> np.ndarray:
+    """Sorted row indices of the set bits of an int bitmap over *n* rows."""
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little')[:n])
+
+
+def _splice_rows(mat, start: int, stop: int, rows=None) -> sparse.csr_matrix:
+    """Copy of CSR *mat* with rows [start, stop) replaced by *rows* (or removed).
+
+    Works on the CSR arrays directly: three slices and an indptr shift.
+    """
+    if rows is None:
+        rows = sparse.csr_matrix((0, mat.shape[1]), dtype=mat.dtype)
+    rows = sparse.csr_matrix(rows)
+    lo, hi = int(mat.indptr[start]), int(mat.indptr[stop])
+    data = np.concatenate([mat.data[:lo], rows.data.astype(mat.dtype, copy=False), mat.data[hi:]])
+    indices = np.concatenate([mat.indices[:lo], rows.indices, mat.indices[hi:]])
+    indptr = np.concatenate([mat.indptr[:start + 1], lo + rows.indptr[1:],
+                             mat.indptr[stop + 1:] - hi + lo + rows.nnz])
+    return sparse.csr_matrix((data, indices, indptr),
+                             shape=(mat.shape[0] - (stop - start) + rows.shape[0], mat.shape[1]))
+
+
+def _artifacts_hash(artifacts) -> str:
+    """Stable hash of every artifact field that feeds the similarity index."""
+    rows = [[str(a.get('id', ''))] + [str(a.get(f, '')) for f in FIELD_WEIGHTS]
+            for a in artifacts]
+    payload = json.dumps([INDEX_SNAPSHOT_VERSION, rows], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _splice_values(arr, start: int, stop: int, values=()) -> np.ndarray:
+    """Copy of 1-D *arr* with [start, stop) replaced by *values*."""
+    return np.concatenate([arr[:start], np.asarray(values, dtype=arr.dtype), arr[stop:]])
+
+
+class _ArtifactFeatures(NamedTuple):
+    """Per-artifact features precomputed once at index build time."""
+    tokens: dict   # field -> sorted tuple of token ids (per-field vocabulary)
+    group: int     # index into _CATEGORY_KEYWORDS, -1 when no group matches
+
+
+class _IndexState:
+    """One version of the fitted similarity index and the queries over it.
+
+    A state is never modified once published: edits build a new state with
+    ``spliced`` (sharing every unchanged array) and the engine swaps it in,
+    so queries run without a lock and never see a half-applied edit.  The
+    token vocabularies are the one exception; they only ever grow, and old
+    states never look up the ids added after them.
+    """
+
+    def __init__(self, artifacts, snapshot_dir=None):
         self.artifacts = artifacts
         self.artifact_dict = {a['id']: a for a in artifacts}
-        _fields = list(FIELD_WEIGHTS.keys())
         self._vectorizers: dict = {}
         self._field_matrices: dict = {}
-        self._build_similarity_index()
+
+        # keyword -> most-specific (lowest-index) group containing it
+        self._group_names = list(self._CATEGORY_KEYWORDS)
+        self._keyword_lookup = {}
+        for i, kws in enumerate(self._CATEGORY_KEYWORDS.values()):
+            for k in kws:
+                self._keyword_lookup.setdefault(k, i)
+        self._field_weights = np.array(list(FIELD_WEIGHTS.values()))
+        self._index = {}
+        for i, a in enumerate(self.artifacts):
+            self._index.setdefault(a['id'], i)
+
+        self._sim_cache: OrderedDict = OrderedDict()  # query idx -> (n, fields) float32
+        self._sim_cache_bytes = 0
+        self._cache_lock = threading.Lock()
+
+        self.loaded_from_snapshot = False
+        if snapshot_dir:
+            self.loaded_from_snapshot = self._load_snapshot(snapshot_dir)
+        if not self.loaded_from_snapshot:
+            self._build_similarity_index()
+            self._build_score_matrix()
+            if snapshot_dir:
+                self._save_snapshot(snapshot_dir)
 
     # ------------------------------------------------------------------
     # Index building
@@ -74,44 +232,418 @@ class ComparisonEngine:
             if non_empty >= 2:
                 # Build extended stop-word list for long text fields
                 extra_stops = list(_STOP_WORDS) if field in ('function', 'symbolism', 'notes') else []
-                vec = TfidfVectorizer(
-                    ngram_range=(1, 2),
-                    max_features=500,
-                    sublinear_tf=True,
-                    stop_words='english',
-                    min_df=1,
-                    max_df=0.85,  # ignore terms in >85% of docs (too common to discriminate)
-                )
+                vec = _make_vectorizer()
                 try:
-                    matrix = vec.fit_transform(texts)
+                    # L2-normalise once so cosine is a plain dot product
+                    matrix = normalize(vec.fit_transform(texts), norm='l2').tocsr()
                     self._vectorizers[field] = vec
                     self._field_matrices[field] = matrix
                 except Exception:
                     pass  # fall back to Jaccard for this field
 
+        self._build_feature_table()
+
+    def _build_feature_table(self):
+        """Tokenise every field once and resolve each artifact's keyword group.
+
+        Tokens are integer-coded against a per-field vocabulary and stored as
+        sorted id tuples (the rows of the Jaccard incidence blocks); the
+        keyword group is resolved to an integer once.
+        """
+        self._token_vocab = {field: {} for field in FIELD_WEIGHTS}
+        self._token_names = {field: [] for field in FIELD_WEIGHTS}
+        self._features = [self._artifact_features(a) for a in self.artifacts]
+
+    def _artifact_features(self, artifact) -> _ArtifactFeatures:
+        """Feature-table row for one artifact, growing the token vocabularies."""
+        tokens = {}
+        for field in FIELD_WEIGHTS:
+            vocab = self._token_vocab[field]
+            names = self._token_names[field]
+            ids = []
+            for tok in _tokenize(str(artifact.get(field, ''))):
+                if tok not in vocab:
+                    vocab[tok] = len(names)
+                    names.append(tok)
+                ids.append(vocab[tok])
+            ids.sort()
+            tokens[field] = tuple(ids)
+        # Keyword groups are matched on category AND name tokens so that
+        # e.g. A009 name "Grinding Stone" matches C009 category "Grinding Stone"
+        group_text = (str(artifact.get('category', '')).lower() + ' '
+                      + str(artifact.get('name', '')).lower())
+        return _ArtifactFeatures(tokens, self._keyword_group(_tokenize(group_text)))
+
+    def _decode_tokens(self, field: str, ids) -> list:
+        """Token strings for *field* token ids."""
+        names = self._token_names[field]
+        return [names[i] for i in ids]
+
+    def _build_score_matrix(self):
+        """Stack every per-field block into one sparse matrix for batch scoring.
+
+        Each block is either a normalised TF-IDF matrix (cosine) or a binary
+        token-incidence matrix (Jaccard).  Multiplying the stacked matrix by a
+        block-diagonal query matrix yields every per-field dot product for the
+        whole catalog in a single sparse product.
+        """
+        self._n_indexed = len(self.artifacts)
+
+        # Materials are always Jaccard (short comma lists); category needs
+        # both Jaccard and cosine; any field without TF-IDF falls back to Jaccard.
+        jaccard_fields = ['category', 'materials'] + [
+            f for f in FIELD_WEIGHTS
+            if f not in self._field_matrices and f not in ('category', 'materials')
+        ]
+        cosine_fields = [f for f in FIELD_WEIGHTS
+                         if f in self._field_matrices and f != 'materials']
+
+        blocks = []
+        self._blocks: dict = {}
+        self._token_counts: dict = {}
+        for field in jaccard_fields:
+            inc = _token_incidence([f.tokens[field] for f in self._features],
+                                   len(self._token_names[field]))
+            self._token_counts[field] = np.diff(inc.indptr).astype(np.float64)
+            self._blocks[('jaccard', field)] = len(blocks)
+            blocks.append(inc)
+        for field in cosine_fields:
+            self._blocks[('cosine', field)] = len(blocks)
+            blocks.append(self._field_matrices[field])
+
+        self._score_matrix = sparse.hstack(blocks, format='csr')
+        self._column_block = np.concatenate([
+            np.full(b.shape[1], k, dtype=np.int64) for k, b in enumerate(blocks)
+        ])
+
+        # Most-specific keyword group per artifact (-1 = no known group)
+        self._category_groups = np.array([f.group for f in self._features],
+                                         dtype=np.int64)
+        self._build_facet_index()
+
+    def _build_facet_index(self):
+        """Inverted bitmap indexes (bit i = index row i) for filtered search.
+
+        Facets: category keyword group, origin region, material token and
+        is_sri_lankan.  Filters AND across facets and OR within one.
+        """
+        facets = {facet: {} for facet in FILTER_FACETS}
+        for i, (a, feat) in enumerate(zip(self.artifacts, self._features)):
+            bit = 1 << i
+            for facet, key in self._facet_keys(a, feat):
+                facets[facet][key] = facets[facet].get(key, 0) | bit
+        self._facets = facets
+        self._all_rows = (1 << self._n_indexed) - 1
+
+    def _facet_keys(self, artifact, feat):
+        """(facet, key) pairs an artifact's row is indexed under."""
+        if feat.group >= 0:
+            yield 'category', self._group_names[feat.group]
+        for region in _origin_regions(artifact.get('origin', '')):
+            yield 'origin', region
+        for tok in self._decode_tokens('materials', feat.tokens['materials']):
+            yield 'materials', tok
+        yield 'is_sri_lankan', bool(artifact.get('is_sri_lankan'))
+
+    def _filter_rows(self, filters) -> np.ndarray:
+        """Index rows matching *filters*, or None when no filter is set.
+
+        *filters* maps a facet in FILTER_FACETS to a value or list of values
+        (e.g. ``{'origin': 'japan', 'materials': ['bronze', 'brass'],
+        'is_sri_lankan': False}``).
+
+        Raises:
+            ValueError: for unknown facets
+        """
+        if not filters:
+            return None
+        unknown = set(filters) - set(FILTER_FACETS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        mask = self._all_rows
+        for facet, values in filters.items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            index = self._facets[facet]
+            bits = 0
+            for value in values:
+                key = str(value).strip().lower()
+                if facet == 'is_sri_lankan':
+                    key = key in ('true', '1', 'yes')
+                bits |= index.get(key, 0)
+            mask &= bits
+        return _bitmap_rows(mask, self._n_indexed)
+
     # ------------------------------------------------------------------
-    # Per-field cosine similarity
+    # On-disk snapshots
     # ------------------------------------------------------------------
 
-    def _field_cosine(self, idx1: int, idx2: int, field: str) -> float:
-        """Return cosine similarity for *field* between two artifact indices."""
-        if field not in self._field_matrices:
-            # Jaccard fallback
-            a1 = self.artifacts[idx1]
-            a2 = self.artifacts[idx2]
-            return _jaccard(_tokenize(str(a1.get(field, ''))),
-                            _tokenize(str(a2.get(field, ''))))
-        mat = self._field_matrices[field]
-        v1 = mat[idx1]
-        v2 = mat[idx2]
-        denom = (np.linalg.norm(v1.toarray()) * np.linalg.norm(v2.toarray()))
-        if denom == 0:
-            return 0.0
-        return float(np.dot(v1.toarray(), v2.toarray().T).flat[0] / denom)
+    @staticmethod
+    def _snapshot_path(snapshot_dir: str, data_hash: str) -> str:
+        return os.path.join(snapshot_dir,
+                            f"comparison_index_v{INDEX_SNAPSHOT_VERSION}_{data_hash[:16]}")
+
+    @staticmethod
+    def _snapshot_version(name: str):
+        """INDEX_SNAPSHOT_VERSION a snapshot directory was written with, or None."""
+        match = re.match(r'comparison_index_v(\d+)_', name)
+        return int(match.group(1)) if match else None
+
+    def _save_snapshot(self, snapshot_dir: str) -> None:
+        """Write the fitted index as .npy arrays + JSON metadata.
+
+        The snapshot is written to a temporary directory and renamed into
+        place, so concurrently starting workers never see a partial one.
+        Snapshots written by older INDEX_SNAPSHOT_VERSIONs are removed
+        afterwards; those of other data (e.g. an edited catalog) are kept.
+        """
+        data_hash = _artifacts_hash(self.artifacts)
+        path = self._snapshot_path(snapshot_dir, data_hash)
+        tmp = None
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            tmp = tempfile.mkdtemp(dir=snapshot_dir, prefix='.tmp_')
+
+            def save_csr(name, mat):
+                for part in ('data', 'indices', 'indptr'):
+                    np.save(os.path.join(tmp, f"{name}.{part}.npy"), getattr(mat, part))
+
+            for field, mat in self._field_matrices.items():
+                save_csr(f"tfidf.{field}", mat)
+                np.save(os.path.join(tmp, f"idf.{field}.npy"), self._vectorizers[field].idf_)
+            save_csr('score', self._score_matrix)
+            np.save(os.path.join(tmp, 'column_block.npy'), self._column_block)
+            np.save(os.path.join(tmp, 'category_groups.npy'), self._category_groups)
+            for field in FIELD_WEIGHTS:
+                ids = [f.tokens[field] for f in self._features]
+                save_csr(f"tokens.{field}", _token_incidence(ids, len(self._token_names[field])))
+
+            meta = {
+                'version': INDEX_SNAPSHOT_VERSION,
+                'data_hash': data_hash,
+                'n_indexed': self._n_indexed,
+                'shapes': {f: list(m.shape) for f, m in self._field_matrices.items()},
+                'score_shape': list(self._score_matrix.shape),
+                'vocabularies': {f: v.get_feature_names_out().tolist()
+                                 for f, v in self._vectorizers.items()},
+                'token_names': self._token_names,
+                'blocks': [[kind, field, k] for (kind, field), k in self._blocks.items()],
+            }
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            if not os.path.exists(path):
+                os.replace(tmp, path)
+            for name in os.listdir(snapshot_dir):
+                version = self._snapshot_version(name)
+                if version is not None and version != INDEX_SNAPSHOT_VERSION:
+                    shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+            print(f"✓ Comparison index snapshot saved to {path}")
+        except Exception as e:
+            print(f"⚠ Could not save comparison index snapshot: {e}")
+        finally:
+            # Still there if another worker saved first or a write/rename failed
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def _load_snapshot(self, snapshot_dir: str) -> bool:
+        """Memory-map a snapshot matching the current artifact data.
+
+        Returns False (and leaves the engine untouched) when no snapshot
+        exists for this data hash or it cannot be read, so the caller
+        falls back to a full rebuild.
+        """
+        data_hash = _artifacts_hash(self.artifacts)
+        path = self._snapshot_path(snapshot_dir, data_hash)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('version') != INDEX_SNAPSHOT_VERSION
+                    or meta.get('data_hash') != data_hash
+                    or meta.get('n_indexed') != len(self.artifacts)):
+                return False
+
+            def load(name):
+                return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+
+            def load_csr(name, shape):
+                return sparse.csr_matrix(
+                    (load(f"{name}.data"), load(f"{name}.indices"), load(f"{name}.indptr")),
+                    shape=tuple(shape), copy=False,
+                )
+
+            vectorizers = {}
+            field_matrices = {}
+            for field, vocab in meta['vocabularies'].items():
+                vec = _make_vectorizer(vocabulary=vocab)
+                vec.idf_ = np.asarray(load(f"idf.{field}"))
+                vectorizers[field] = vec
+                field_matrices[field] = load_csr(f"tfidf.{field}", meta['shapes'][field])
+
+            n = meta['n_indexed']
+            token_names = {f: list(names) for f, names in meta['token_names'].items()}
+            tokens = {f: load_csr(f"tokens.{f}", (n, max(len(token_names[f]), 1)))
+                      for f in FIELD_WEIGHTS}
+            groups = np.asarray(load('category_groups'))
+            features = []
+            for i in range(n):
+                toks = {}
+                for field, mat in tokens.items():
+                    toks[field] = tuple(int(t) for t in mat.indices[mat.indptr[i]:mat.indptr[i + 1]])
+                features.append(_ArtifactFeatures(toks, int(groups[i])))
+
+            blocks = {(kind, field): k for kind, field, k in meta['blocks']}
+            self._token_counts = {
+                field: np.diff(tokens[field].indptr).astype(np.float64)
+                for kind, field in blocks if kind == 'jaccard'
+            }
+            self._vectorizers = vectorizers
+            self._field_matrices = field_matrices
+            self._token_names = token_names
+            self._token_vocab = {f: {t: i for i, t in enumerate(names)}
+                                 for f, names in token_names.items()}
+            self._features = features
+            self._blocks = blocks
+            self._score_matrix = load_csr('score', meta['score_shape'])
+            self._column_block = load('column_block')
+            self._category_groups = groups
+            self._n_indexed = n
+            self._build_facet_index()
+            print(f"✓ Comparison index loaded from snapshot {path}")
+            return True
+        except Exception as e:
+            print(f"⚠ Could not load comparison index snapshot, rebuilding: {e}")
+            return False
 
     # ------------------------------------------------------------------
-    # Category similarity — uses both TF-IDF cosine AND Jaccard on tokens,
-    # then boosts pairs that share the most meaningful keyword
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def spliced(self, start: int, stop: int, artifact) -> '_IndexState':
+        """New state with rows [start, stop) replaced by *artifact*'s row (or dropped).
+
+        The artifact is projected through the fitted vocabularies and only
+        the edited rows are rebuilt: matrix rows are spliced, per-row arrays
+        patched and the facet bitmaps adjusted bit-wise, instead of
+        re-deriving every incidence block and facet from the feature table.
+        """
+        new = copy.copy(self)
+        new._sim_cache = OrderedDict()
+        new._sim_cache_bytes = 0
+        new._cache_lock = threading.Lock()
+
+        feat = self._artifact_features(artifact) if artifact is not None else None
+        new_rows = [artifact] if artifact is not None else []
+        new.artifacts = list(self.artifacts)
+        new.artifacts[start:stop] = new_rows
+        new._features = list(self._features)
+        new._features[start:stop] = [feat] if feat is not None else []
+        new._n_indexed = len(new.artifacts)
+
+        tfidf_rows = {}
+        new._field_matrices = {}
+        for field, mat in self._field_matrices.items():
+            row = None
+            if artifact is not None:
+                row = normalize(self._vectorizers[field].transform(
+                    [str(artifact.get(field, ''))]), norm='l2')
+            tfidf_rows[field] = row
+            new._field_matrices[field] = _splice_rows(mat, start, stop, row)
+
+        new._splice_score_matrix(start, stop, feat, tfidf_rows)
+        new._category_groups = _splice_values(
+            self._category_groups, start, stop, [feat.group] if feat is not None else [])
+        new._token_counts = {
+            field: _splice_values(counts, start, stop,
+                                  [len(feat.tokens[field])] if feat is not None else [])
+            for field, counts in self._token_counts.items()
+        }
+        new._splice_facets(self, start, stop, feat)
+
+        if len(new_rows) == stop - start:
+            # Same rows, same ids: only the edited records change
+            new.artifact_dict = dict(self.artifact_dict)
+            for old, a in zip(self.artifacts[start:stop], new_rows):
+                if self.artifact_dict.get(a['id']) is old:
+                    new.artifact_dict[a['id']] = a
+        elif start == self._n_indexed:
+            # Appended rows keep every existing row number
+            new.artifact_dict = dict(self.artifact_dict)
+            new._index = dict(self._index)
+            for i, a in enumerate(new_rows, start):
+                new.artifact_dict[a['id']] = a
+                new._index.setdefault(a['id'], i)
+        else:
+            new.artifact_dict = {a['id']: a for a in new.artifacts}
+            new._index = {}
+            for i, a in enumerate(new.artifacts):
+                new._index.setdefault(a['id'], i)
+        return new
+
+    def _splice_score_matrix(self, start: int, stop: int, feat, tfidf_rows):
+        """Splice the edited row into the stacked score matrix.
+
+        Tokens first seen in the edit widen their Jaccard block; existing
+        entries are moved to the new column layout by shifting their indices.
+        """
+        order = sorted(self._blocks, key=self._blocks.get)
+        old_widths = np.bincount(self._column_block, minlength=len(order))
+        widths = np.array([
+            max(len(self._token_names[field]), 1) if kind == 'jaccard' else old_widths[k]
+            for k, (kind, field) in enumerate(order)
+        ], dtype=np.int64)
+
+        mat = self._score_matrix
+        if (widths != old_widths).any():
+            shift = (np.concatenate([[0], np.cumsum(widths)[:-1]])
+                     - np.concatenate([[0], np.cumsum(old_widths)[:-1]]))
+            indices = mat.indices + shift[self._column_block[mat.indices]]
+            mat = sparse.csr_matrix((mat.data, indices, mat.indptr),
+                                    shape=(mat.shape[0], int(widths.sum())))
+            self._column_block = np.repeat(np.arange(len(order), dtype=np.int64), widths)
+
+        row = None
+        if feat is not None:
+            row = sparse.hstack([
+                _token_incidence([feat.tokens[field]], int(widths[k])) if kind == 'jaccard'
+                else tfidf_rows[field]
+                for k, (kind, field) in enumerate(order)
+            ], format='csr')
+        self._score_matrix = _splice_rows(mat, start, stop, row)
+
+    def _splice_facets(self, old: '_IndexState', start: int, stop: int, feat):
+        """Facet bitmaps of *old* with rows [start, stop) replaced by *feat*'s row."""
+        facets = {facet: dict(index) for facet, index in old._facets.items()}
+        for i in range(start, stop):
+            bit = 1 << i
+            for facet, key in old._facet_keys(old.artifacts[i], old._features[i]):
+                bits = facets[facet].get(key, 0) & ~bit
+                if bits:
+                    facets[facet][key] = bits
+                else:
+                    facets[facet].pop(key, None)
+
+        added = 1 if feat is not None else 0
+        if added != stop - start and stop < old._n_indexed:
+            # Rows after the edit move up or down by the change in row count
+            low = (1 << start) - 1
+            for index in facets.values():
+                for key, bits in index.items():
+                    index[key] = (bits & low) | ((bits >> stop) << (start + added))
+
+        if feat is not None:
+            bit = 1 << start
+            for facet, key in self._facet_keys(self.artifacts[start], feat):
+                facets[facet][key] = facets[facet].get(key, 0) | bit
+        self._facets = facets
+        self._all_rows = (1 << self._n_indexed) - 1
+
+    # ------------------------------------------------------------------
+    # Category keyword groups — category similarity uses both TF-IDF cosine
+    # AND Jaccard on tokens, then boosts pairs in the same keyword group
     # ------------------------------------------------------------------
 
     _CATEGORY_KEYWORDS = {
@@ -137,128 +669,224 @@ class ComparisonEngine:
         'social_tool':    ['betel', 'cutter', 'nut', 'buyo'],  # betel cutters are unique
     }
 
-    def _category_similarity(self, idx1: int, idx2: int) -> float:
-        a1 = self.artifacts[idx1]
-        a2 = self.artifacts[idx2]
-        c1 = str(a1.get('category', '')).lower()
-        c2 = str(a2.get('category', '')).lower()
-        # Include the artifact name in keyword matching so that e.g.
-        # A009 name "Grinding Stone" can match C009 category "Grinding Stone"
-        n1 = c1 + ' ' + str(a1.get('name', '')).lower()
-        n2 = c2 + ' ' + str(a2.get('name', '')).lower()
-
-        # Collect the most-specific keyword group each artifact belongs to
-        # (groups are ordered most-specific first in _CATEGORY_KEYWORDS).
-        # Use TOKEN-level matching to avoid substring false-positives
-        # (e.g., 'diya' must not match inside 'Wangediya').
-        toks1 = _tokenize(n1)
-        toks2 = _tokenize(n2)
-        grp1 = next((g for g, kws in self._CATEGORY_KEYWORDS.items()
-                     if any(k in toks1 for k in kws)), None)
-        grp2 = next((g for g, kws in self._CATEGORY_KEYWORDS.items()
-                     if any(k in toks2 for k in kws)), None)
-
-        if grp1 is not None and grp2 is not None:
-            if grp1 == grp2:
-                # Same semantic type → strong bonus
-                tok_jac = _jaccard(_tokenize(c1), _tokenize(c2))
-                return min(1.0, 0.65 + 0.35 * tok_jac)
-            else:
-                # Different semantic types → very low category similarity
-                # (override even identical-string categories like "Domestic Tool")
-                return 0.05
-
-        # One or both have no known group — fall back to Jaccard + TF-IDF
-        tok1 = _tokenize(c1)
-        tok2 = _tokenize(c2)
-        jac = _jaccard(tok1, tok2)
-        cos = self._field_cosine(idx1, idx2, 'category')
-        return min(1.0, 0.5 * jac + 0.5 * cos)
+    def _keyword_group(self, tokens: set) -> int:
+        """Index of the first keyword group matching *tokens*, or -1."""
+        lookup = self._keyword_lookup
+        return min((lookup[t] for t in tokens if t in lookup), default=-1)
 
     # ------------------------------------------------------------------
-    # Combined score
+    # Vectorised scoring against the whole catalog
     # ------------------------------------------------------------------
 
-    def _combined_score(self, idx1: int, idx2: int) -> float:
-        cat_w  = FIELD_WEIGHTS['category']
-        name_w = FIELD_WEIGHTS['name']
-        mat_w  = FIELD_WEIGHTS['materials']
-        func_w = FIELD_WEIGHTS['function']
-        sym_w  = FIELD_WEIGHTS['symbolism']
-        nts_w  = FIELD_WEIGHTS['notes']
-
-        cat_sim  = self._category_similarity(idx1, idx2)
-        name_sim = self._field_cosine(idx1, idx2, 'name')
-
-        # Materials: Jaccard on tokens is more reliable for short comma lists
-        a1 = self.artifacts[idx1]
-        a2 = self.artifacts[idx2]
-        mat_sim = _jaccard(
-            _tokenize(str(a1.get('materials', ''))),
-            _tokenize(str(a2.get('materials', '')))
+    def _field_similarities(self, query_idxs, target_idxs=None) -> np.ndarray:
+        """Per-field similarity of each query against every indexed artifact.
+
+        Returns an array of shape ``(len(query_idxs), n, len(FIELD_WEIGHTS))``
+        whose last axis follows ``FIELD_WEIGHTS`` order, so the combined score
+        is ``sims @ weights``.  When *target_idxs* is given, only those artifacts are scored (n is
+        then ``len(target_idxs)``).
+        """
+        query_idxs = np.asarray(query_idxs, dtype=np.int64)
+        n_queries = len(query_idxs)
+        n_blocks = len(self._blocks)
+        if target_idxs is None:
+            target_idxs = slice(None)
+            catalog = self._score_matrix
+        else:
+            target_idxs = np.asarray(target_idxs, dtype=np.int64)
+            catalog = self._score_matrix[target_idxs]
+        n_targets = catalog.shape[0]
+
+        # Block-diagonal query matrix: column q*B + b holds query q's block b
+        rows = self._score_matrix[query_idxs].tocoo()
+        q_cols = rows.row * n_blocks + self._column_block[rows.col]
+        query = sparse.csr_matrix(
+            (rows.data, (rows.col, q_cols)),
+            shape=(self._score_matrix.shape[1], n_queries * n_blocks),
+        )
+        dots = (catalog @ query).toarray()
+        dots = dots.reshape(n_targets, n_queries, n_blocks).transpose(1, 0, 2)
+
+        def block(kind, field):
+            vals = dots[:, :, self._blocks[(kind, field)]]
+            if kind == 'cosine':
+                return vals
+            counts = self._token_counts[field]
+            union = counts[target_idxs][None, :] + counts[query_idxs][:, None] - vals
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(union > 0, vals / union, 0.0)
+
+        def field_sim(field):
+            if ('cosine', field) in self._blocks:
+                return block('cosine', field)
+            return block('jaccard', field)
+
+        sims = np.empty((n_queries, n_targets, len(FIELD_WEIGHTS)))
+        for k, field in enumerate(FIELD_WEIGHTS):
+            if field == 'category':
+                sims[:, :, k] = self._category_vector(
+                    query_idxs, target_idxs,
+                    block('jaccard', 'category'), field_sim('category'))
+            elif field == 'materials':
+                sims[:, :, k] = block('jaccard', 'materials')
+            else:
+                sims[:, :, k] = field_sim(field)
+        return sims
+
+    def _category_vector(self, query_idxs, target_idxs, jac, cos) -> np.ndarray:
+        """Category similarity of query rows against target rows.
+
+        Keyword groups (ordered most-specific first in _CATEGORY_KEYWORDS) are
+        resolved at build time with token-level matching, avoiding substring
+        false positives (e.g. 'diya' inside 'Wangediya').  Same group: strong
+        bonus; different known groups: 0.05, even for identical strings like
+        "Domestic Tool"; otherwise the mean of token Jaccard and TF-IDF cosine.
+        """
+        grp = self._category_groups[target_idxs][None, :]
+        q_grp = self._category_groups[query_idxs][:, None]
+        both = (q_grp >= 0) & (grp >= 0)
+        same = both & (q_grp == grp)
+        return np.where(
+            same, np.minimum(1.0, 0.65 + 0.35 * jac),
+            np.where(both, 0.05, np.minimum(1.0, 0.5 * jac + 0.5 * cos)),
         )
 
-        func_sim = self._field_cosine(idx1, idx2, 'function')
-        sym_sim  = self._field_cosine(idx1, idx2, 'symbolism')
-        nts_sim  = self._field_cosine(idx1, idx2, 'notes')
+    def _score_vectors(self, query_idxs, weights=None, target_idxs=None) -> np.ndarray:
+        """Combined weighted score of each query against every indexed artifact."""
+        if weights is None:
+            weights = self._field_weights
+        return self._field_similarities(query_idxs, target_idxs) @ weights
 
-        score = (cat_w  * cat_sim
-               + name_w * name_sim
-               + mat_w  * mat_sim
-               + func_w * func_sim
-               + sym_w  * sym_sim
-               + nts_w  * nts_sim)
+    def _cached_field_similarities(self, idx: int) -> np.ndarray:
+        """Per-field similarity rows for one query, via the bounded LRU cache."""
+        with self._cache_lock:
+            sims = self._sim_cache.get(idx)
+            if sims is not None:
+                self._sim_cache.move_to_end(idx)
+                return sims
+        # Scored outside the lock; concurrent misses just compute it twice.
+        # Stored (and returned) as float32 so hits and misses score alike
+        sims = self._field_similarities([idx])[0].astype(np.float32)
+        with self._cache_lock:
+            if idx not in self._sim_cache:
+                self._sim_cache[idx] = sims
+                self._sim_cache_bytes += sims.nbytes
+            while self._sim_cache_bytes > FIELD_SIMILARITY_CACHE_BYTES and len(self._sim_cache) > 1:
+                _, evicted = self._sim_cache.popitem(last=False)
+                self._sim_cache_bytes -= evicted.nbytes
+        return sims
 
-        return float(score)
+    def _top_k(self, scores: np.ndarray, exclude, k: int) -> np.ndarray:
+        """Indices of the *k* best scores (descending), skipping *exclude*."""
+        scores = scores.copy()
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = min(k, len(scores) - (exclude is not None))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        cand = np.argpartition(-scores, k - 1)[:k]
+        # Stable ordering: score desc, then catalog order (matches list.sort)
+        return cand[np.lexsort((cand, -scores[cand]))]
 
     # ------------------------------------------------------------------
-    # Public API
+    # Queries (see the ComparisonEngine methods of the same name)
     # ------------------------------------------------------------------
 
-    def find_similar(self, artifact_id, num_results=5):
-        """Find similar artifacts to the given artifact.
+    def find_similar(self, artifact_id, num_results, weight_vec, filters=None):
+        artifact_idx = self._index.get(artifact_id)
+        if artifact_idx is None:
+            return []
 
-        Always returns up to *num_results* entries, sorted by score descending,
-        so the Similar-Artifacts section is always populated.  Scores reflect
-        true weighted similarity — a 15% score honestly means "somewhat related"
-        while a 60% score means "very closely related".
-        """
-        if artifact_id not in self.artifact_dict:
+        targets = self._filter_rows(filters)
+        if targets is not None:
+            # Same float32 precision as the cached rows, so a cache hit
+            # never reorders the result
+            sims = self._sim_cache.get(artifact_idx)
+            if sims is not None:
+                sims = sims[targets]
+            else:
+                sims = self._field_similarities([artifact_idx], targets)[0].astype(np.float32)
+            scores = sims @ weight_vec
+            return self._similar_results(artifact_idx, scores, num_results, targets)
+
+        # One sparse product scores the query against the whole catalog.
+        # Best-first top N: entries above MIN_SIMILARITY_THRESHOLD always sort
+        # ahead of those below it, so the old floor-then-pad pass reduces to
+        # a plain top-N selection.
+        scores = self._cached_field_similarities(artifact_idx) @ weight_vec
+        return self._similar_results(artifact_idx, scores, num_results)
+
+    def find_similar_batch(self, artifact_ids, num_results, weight_vec, filters=None):
+        targets = self._filter_rows(filters)
+        results = {aid: [] for aid in artifact_ids}
+        known = [(aid, self._index[aid]) for aid in results if aid in self._index]
+        n_targets = self._n_indexed if targets is None else len(targets)
+        chunk_size = max(1, BATCH_SCORE_CELLS // max(n_targets, 1))
+        for start in range(0, len(known), chunk_size):
+            chunk = known[start:start + chunk_size]
+            scores = self._score_vectors([idx for _, idx in chunk], weight_vec,
+                                         target_idxs=targets)
+            for (aid, idx), row in zip(chunk, scores):
+                results[aid] = self._similar_results(idx, row, num_results, targets)
+        return results
+
+    def find_similar_hybrid(self, artifact_id, candidates, num_results, weight_vec,
+                            semantic_weight):
+        artifact_idx = self._index.get(artifact_id)
+        if artifact_idx is None:
+            return []
+        semantic = {}
+        for aid, score in candidates.items():
+            idx = self._index.get(aid)
+            if idx is not None and idx != artifact_idx:
+                semantic[idx] = min(max(float(score), 0.0), 1.0)
+        if not semantic:
             return []
 
-        artifact_idx = next(
-            i for i, a in enumerate(self.artifacts) if a['id'] == artifact_id
-        )
-        artifact = self.artifact_dict[artifact_id]
-
-        # Compute combined score for every other artifact
-        all_scores = []
-        for idx in range(len(self.artifacts)):
-            if idx == artifact_idx:
-                continue
-            score = self._combined_score(artifact_idx, idx)
-            all_scores.append((idx, score))
-
-        # Sort best-first; always take top N (floor-filtered only to exclude
-        # truly zero-score entries so completely unrelated items don't show)
-        all_scores.sort(key=lambda x: x[1], reverse=True)
-        top = [(idx, s) for idx, s in all_scores if s >= MIN_SIMILARITY_THRESHOLD][:num_results]
-
-        # If still short (very unusual), pad with next best regardless of floor
-        if len(top) < num_results:
-            shown_idxs = {idx for idx, _ in top}
-            for idx, s in all_scores:
-                if idx not in shown_idxs:
-                    top.append((idx, s))
-                if len(top) >= num_results:
-                    break
+        targets = np.array(sorted(semantic), dtype=np.int64)
+        lexical = self._score_vectors([artifact_idx], weight_vec, target_idxs=targets)[0]
+        sem = np.array([semantic[i] for i in targets.tolist()])
+        fused = semantic_weight * sem + (1 - semantic_weight) * lexical
+
+        results = self._similar_results(artifact_idx, fused, num_results, targets)
+        parts = {int(i): (s, l) for i, s, l in zip(targets, sem, lexical)}
+        for result in results:
+            s, l = parts[self._index[result['id']]]
+            result['semantic_score'] = round(float(s), 4)
+            result['lexical_score'] = round(float(l), 4)
+        return results
+
+    def similarity_matrix(self, artifact_ids, weight_vec):
+        ids = list(dict.fromkeys(artifact_ids))
+        missing = [aid for aid in ids if aid not in self._index]
+        ids = [aid for aid in ids if aid in self._index]
+        idxs = [self._index[aid] for aid in ids]
+        if not idxs:
+            return ids, np.zeros((0, 0), dtype=np.float32), missing
+        matrix = self._score_vectors(idxs, weight_vec, target_idxs=idxs)
+        return ids, matrix.astype(np.float32), missing
+
+    def _similar_results(self, artifact_idx, scores, num_results, targets=None):
+        """Result dicts for the top *num_results* entries of a score row.
+
+        When *targets* is given, *scores* covers only those (sorted) rows.
+        """
+        artifact = self.artifacts[artifact_idx]
+        if targets is None:
+            top = self._top_k(scores, artifact_idx, num_results)
+            ranked = [(int(i), float(scores[i])) for i in top]
+        else:
+            pos = int(np.searchsorted(targets, artifact_idx))
+            exclude = pos if pos < len(targets) and targets[pos] == artifact_idx else None
+            top = self._top_k(scores, exclude, num_results)
+            ranked = [(int(targets[i]), float(scores[i])) for i in top]
 
         results = []
-        for idx, score in top:
+        for idx, score in ranked:
             similar_artifact = self.artifacts[idx].copy()
             similar_artifact['similarity_score'] = round(score, 4)
             similar_artifact['comparison_points'] = self._extract_comparison_points(
-                artifact, similar_artifact
+                artifact, similar_artifact, artifact_idx, idx
             )
             results.append(similar_artifact)
 
@@ -268,8 +896,12 @@ class ComparisonEngine:
     # Comparison points
     # ------------------------------------------------------------------
 
-    def _extract_comparison_points(self, artifact1, artifact2):
-        """Extract key comparison points between two artifacts."""
+    def _extract_comparison_points(self, artifact1, artifact2, idx1=None, idx2=None):
+        """Extract key comparison points between two artifacts.
+
+        When the catalog indices are given, materials come from the
+        precomputed feature table instead of being re-tokenised.
+        """
         points = []
 
         # Category comparison
@@ -281,9 +913,16 @@ class ComparisonEngine:
         })
 
         # Material comparison
-        materials1 = _tokenize(str(artifact1.get('materials', '')))
-        materials2 = _tokenize(str(artifact2.get('materials', '')))
-        common_materials = sorted(materials1 & materials2)
+        if idx1 is not None and idx2 is not None:
+            common_materials = sorted(self._decode_tokens(
+                'materials',
+                set(self._features[idx1].tokens['materials'])
+                & set(self._features[idx2].tokens['materials']),
+            ))
+        else:
+            materials1 = _tokenize(str(artifact1.get('materials', '')))
+            materials2 = _tokenize(str(artifact2.get('materials', '')))
+            common_materials = sorted(materials1 & materials2)
         if common_materials:
             points.append({
                 'type': 'materials',
@@ -308,3 +947,226 @@ class ComparisonEngine:
 
         return points
 
+
+class ComparisonEngine:
+    def __init__(self, artifacts, snapshot_dir=None):
+        """
+        Args:
+            artifacts: List of artifact dictionaries (not modified; edits
+                       publish a new list, see ``artifacts``)
+            snapshot_dir: Optional directory for persisted index snapshots.
+                          When set, a snapshot matching the artifact data is
+                          memory-mapped instead of refitting the index, and a
+                          fresh build is written back for the next start
+                          (background refits after edits are not saved).
+        """
+        self._field_weights = np.array(list(FIELD_WEIGHTS.values()))
+
+        # Serialises edits and refit swaps; queries read self._state once
+        # and never take it
+        self._lock = threading.RLock()
+        self._generation = 0        # bumped on every incremental edit
+        self._changed_rows = 0      # edits since the last full fit
+        self._unseen_terms: set = set()
+        self._refit_thread = None
+        # Called (with the new artifact list) after every edit, e.g. to
+        # refresh other indexes over the catalog
+        self.on_edit = None
+
+        self._state = _IndexState(artifacts, snapshot_dir)
+        self.loaded_from_snapshot = self._state.loaded_from_snapshot
+
+    @property
+    def artifacts(self) -> list:
+        """The catalog as of the latest edit (treat as read-only)."""
+        return self._state.artifacts
+
+    @property
+    def artifact_dict(self) -> dict:
+        """Artifact ID -> artifact, as of the latest edit."""
+        return self._state.artifact_dict
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def add_artifact(self, artifact):
+        """Add a new artifact and make it searchable immediately.
+
+        The artifact is projected through the existing vocabularies; a
+        background refit is scheduled once vocabulary drift is high enough.
+        """
+        with self._lock:
+            state = self._state
+            if artifact['id'] in state._index:
+                raise ValueError(f"Artifact {artifact['id']} already exists")
+            idx = state._n_indexed
+            self._publish(state.spliced(idx, idx, artifact), artifact)
+
+    def update_artifact(self, artifact_id, changes):
+        """Apply *changes* (a dict of fields) to an artifact and re-index it.
+
+        Returns the updated artifact dictionary.
+        """
+        with self._lock:
+            state = self._state
+            idx = state._index.get(artifact_id)
+            if idx is None:
+                raise KeyError(artifact_id)
+            artifact = {**state.artifacts[idx], **changes, 'id': artifact_id}
+            self._publish(state.spliced(idx, idx + 1, artifact), artifact)
+            return artifact
+
+    def remove_artifact(self, artifact_id):
+        """Remove an artifact from the catalog and the similarity index."""
+        with self._lock:
+            state = self._state
+            idx = state._index.get(artifact_id)
+            if idx is None:
+                raise KeyError(artifact_id)
+            self._publish(state.spliced(idx, idx + 1, None), None)
+
+    def _publish(self, state, artifact):
+        """Swap in an edited state, track vocabulary drift and notify on_edit."""
+        self._state = state
+        self._generation += 1
+        self._changed_rows += 1
+        if artifact is not None:
+            for field, vec in state._vectorizers.items():
+                terms = vec.build_analyzer()(str(artifact.get(field, '')))
+                self._unseen_terms.update(
+                    (field, t) for t in terms if t not in vec.vocabulary_)
+        if self.vocabulary_drift() >= REFIT_DRIFT_THRESHOLD:
+            self._schedule_refit()
+        if self.on_edit:
+            self.on_edit(state.artifacts)
+
+    def vocabulary_drift(self) -> float:
+        """Fraction of changed rows or unseen terms since the last full fit."""
+        with self._lock:
+            state = self._state
+            vocab_size = sum(len(v.vocabulary_) for v in state._vectorizers.values())
+            row_drift = self._changed_rows / max(state._n_indexed, 1)
+            term_drift = len(self._unseen_terms) / max(vocab_size, 1)
+            return max(row_drift, term_drift)
+
+    def _schedule_refit(self):
+        if self._refit_thread is not None and self._refit_thread.is_alive():
+            return  # the running refit re-checks the generation when done
+        self._refit_thread = threading.Thread(target=self._refit, daemon=True)
+        self._refit_thread.start()
+
+    def _refit(self):
+        """Rebuild the index off-lock and atomically swap it in."""
+        while True:
+            with self._lock:
+                generation = self._generation
+                artifacts = list(self._state.artifacts)
+            try:
+                # Not snapshotted: the edited catalog is not what the next
+                # start loads, so its snapshot would never be read
+                fresh = _IndexState(artifacts)
+            except Exception as e:
+                print(f"⚠ Comparison index refit failed: {e}")
+                return
+            with self._lock:
+                if generation != self._generation:
+                    continue  # edited while refitting — rebuild from the latest data
+                self._state = fresh
+                self._changed_rows = 0
+                self._unseen_terms = set()
+                print(f"✓ Comparison index refitted with {fresh._n_indexed} artifacts")
+                return
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def resolve_weights(self, weights=None) -> np.ndarray:
+        """Field weight vector (FIELD_WEIGHTS order) with per-request overrides.
+
+        *weights* maps field names to non-negative weights; fields not given
+        keep their FIELD_WEIGHTS default.  The result is rescaled to sum to 1
+        so scores stay on the usual 0–1 scale.
+
+        Raises:
+            ValueError: for unknown fields, negative weights or an all-zero result
+        """
+        if not weights:
+            return self._field_weights
+        unknown = set(weights) - set(FIELD_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown weight field(s): {', '.join(sorted(unknown))}")
+        vec = np.array([float(weights.get(f, w)) for f, w in FIELD_WEIGHTS.items()])
+        if (vec < 0).any() or not np.isfinite(vec).all():
+            raise ValueError("Field weights must be non-negative numbers")
+        total = vec.sum()
+        if total <= 0:
+            raise ValueError("At least one field weight must be positive")
+        return vec / total
+
+    def find_similar(self, artifact_id, num_results=5, weights=None, filters=None):
+        """Find similar artifacts to the given artifact.
+
+        Always returns up to *num_results* entries, sorted by score descending,
+        so the Similar-Artifacts section is always populated.  Scores reflect
+        true weighted similarity — a 15% score honestly means "somewhat related"
+        while a 60% score means "very closely related".
+
+        *weights* optionally overrides FIELD_WEIGHTS for this request (see
+        ``resolve_weights``); re-weighting reuses the cached per-field vectors.
+        *filters* restricts candidates by facet (see ``_filter_rows``); the
+        facet bitmaps are applied before scoring, so selective filters score
+        fewer rows.
+        """
+        weight_vec = self.resolve_weights(weights)
+        return self._state.find_similar(artifact_id, num_results, weight_vec, filters)
+
+    def find_similar_batch(self, artifact_ids, num_results=5, weights=None, filters=None):
+        """Top similar artifacts for many query artifacts at once.
+
+        All queries are scored together as one queries x catalog sparse
+        product (chunked to BATCH_SCORE_CELLS pairs) instead of one
+        ``find_similar`` call each.
+
+        Returns:
+            Dict mapping each requested ID to its ``find_similar`` result
+            (an empty list for unknown IDs)
+        """
+        weight_vec = self.resolve_weights(weights)
+        return self._state.find_similar_batch(artifact_ids, num_results, weight_vec, filters)
+
+    def find_similar_hybrid(self, artifact_id, candidates, num_results=5, weights=None,
+                            semantic_weight=HYBRID_SEMANTIC_WEIGHT):
+        """Re-rank embedding-retrieved candidates with the lexical score.
+
+        *candidates* maps artifact IDs to their semantic (embedding cosine)
+        similarity with *artifact_id*, typically a few hundred from the
+        trained model's nearest-neighbour search.  Only those rows are run
+        through the weighted field scoring, so the cost does not grow with
+        the catalog.  The fused score is
+        ``semantic_weight * semantic + (1 - semantic_weight) * lexical``.
+
+        Returns:
+            ``find_similar``-style results, each also carrying
+            ``semantic_score`` and ``lexical_score``
+        """
+        if not 0.0 <= float(semantic_weight) <= 1.0:
+            raise ValueError("semantic_weight must be between 0 and 1")
+        weight_vec = self.resolve_weights(weights)
+        return self._state.find_similar_hybrid(artifact_id, candidates, num_results,
+                                               weight_vec, semantic_weight)
+
+    def similarity_matrix(self, artifact_ids, weights=None):
+        """Pairwise weighted similarity matrix for a set of artifacts.
+
+        Only the selected rows are scored, so the cost depends on the set
+        size rather than the catalog size.
+
+        Returns:
+            Tuple ``(ids, matrix, missing)``: the known IDs in request order
+            (duplicates dropped), a float32 ``len(ids) x len(ids)`` matrix, and
+            the requested IDs that are not in the index
+        """
+        weight_vec = self.resolve_weights(weights)
+        return self._state.similarity_matrix(artifact_ids, weight_vec)
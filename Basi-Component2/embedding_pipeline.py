@@ -0,0 +1,109 @@
+"""
+Embedding Pipeline - Length-bucketed, optionally multi-process text encoding
+Texts are sorted by length and cut into buckets so each batch pads to a
+similar length, then streamed through one or more CPU encoder processes
+"""
+
+import os
+import time
+import multiprocessing
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Texts per bucket handed to an encoder (one task per bucket)
+BUCKET_SIZE = 256
+
+# Sentence-transformer batch size inside a bucket
+ENCODE_BATCH_SIZE = 64
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """Load one CPU encoder per pool process"""
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device='cpu')
+
+
+def _encode_bucket(task: Tuple[int, List[str]]) -> Tuple[int, np.ndarray]:
+    bucket_id, texts = task
+    embeddings = _worker_model.encode(texts, batch_size=ENCODE_BATCH_SIZE,
+                                      show_progress_bar=False, convert_to_numpy=True)
+    return bucket_id, embeddings.astype(np.float32, copy=False)
+
+
+def _buckets(texts: List[str], order: np.ndarray) -> Iterator[Tuple[int, List[str]]]:
+    for bucket_id, start in enumerate(range(0, len(order), BUCKET_SIZE)):
+        yield bucket_id, [texts[i] for i in order[start:start + BUCKET_SIZE]]
+
+
+class _Progress:
+    """Prints encoded count and throughput at most every PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.start = time.time()
+        self.last = self.start
+
+    def update(self, n: int) -> None:
+        self.done += n
+        now = time.time()
+        if now - self.last >= PROGRESS_INTERVAL or self.done == self.total:
+            self.last = now
+            rate = self.done / max(now - self.start, 1e-9)
+            print(f"  Encoded {self.done}/{self.total} artifacts ({rate:.1f} artifacts/sec)")
+
+
+def encode_texts(texts: List[str], model=None, model_name: Optional[str] = None,
+                 workers: int = 1) -> np.ndarray:
+    """
+    Encode texts in length-sorted buckets
+
+    Args:
+        texts: Texts to encode
+        model: Loaded SentenceTransformer, used when workers <= 1
+        model_name: Model to load in each worker process when workers > 1
+        workers: Number of encoder processes (threads are split between them).
+                 Worker processes are spawned, which re-imports the caller's
+                 __main__ module: only use workers > 1 from a script whose
+                 top level is guarded by ``if __name__ == '__main__'``
+
+    Returns:
+        (len(texts), d) float32 embeddings in the order of *texts*
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    order = np.argsort([len(t) for t in texts], kind='stable')
+    bucket_starts = list(range(0, len(order), BUCKET_SIZE))
+    results: List[Optional[np.ndarray]] = [None] * len(bucket_starts)
+    progress = _Progress(len(texts))
+
+    if workers <= 1:
+        for bucket_id, bucket in _buckets(texts, order):
+            results[bucket_id] = model.encode(bucket, batch_size=ENCODE_BATCH_SIZE,
+                                              show_progress_bar=False, convert_to_numpy=True)
+            progress.update(len(bucket))
+    else:
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        # Spawn, never fork: the caller usually has torch (and its OpenMP
+        # thread pools) loaded already, and forked children can deadlock
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(model_name, threads)) as pool:
+            for bucket_id, embeddings in pool.imap_unordered(_encode_bucket, _buckets(texts, order)):
+                results[bucket_id] = embeddings
+                progress.update(len(embeddings))
+
+    sorted_embeddings = np.concatenate(results).astype(np.float32, copy=False)
+    embeddings = np.empty_like(sorted_embeddings)
+    embeddings[order] = sorted_embeddings
+    return embeddings
@@ -0,0 +1,191 @@
+"""
+Era Interval Index
+Parses free-text era strings into year intervals and answers range/overlap queries
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Approximate year ranges for period names used in the dataset
+# (negative years are BCE)
+NAMED_PERIODS = {
+    'prehistoric': (-10000, -3000),
+    'ancient':     (-3000, 500),
+    'roman':       (-27, 476),
+    'medieval':    (500, 1500),
+    'heian':       (794, 1185),
+    'kamakura':    (1185, 1333),
+    'muromachi':   (1336, 1573),
+    'edo':         (1603, 1868),
+    'qing':        (1644, 1912),
+    'colonial':    (1505, 1948),
+    'present':     None,  # resolved to the current year when parsing
+}
+
+# A lone year ("c. 1750") is widened by this many years either side
+SINGLE_YEAR_TOLERANCE = 100
+
+_BCE = re.compile(r'\b(bce|bc)\b')
+_CE = re.compile(r'\b(ce|ad)\b')
+_ORDINAL = re.compile(r'(\d+)\s*(?:st|nd|rd|th)\b')
+_DECADES = re.compile(r'\b(\d+?)(0+)s\b')
+_NUMBER = re.compile(r'\d+')
+
+
+def _parse_part(text: str, bce: bool) -> Optional[Tuple[int, int]]:
+    """Year range for one side of an era range ("17th century", "500 BCE")."""
+    match = _ORDINAL.search(text)
+    if match:
+        n = int(match.group(1))
+        if bce:
+            return (-n * 100, -(n - 1) * 100 - 1)
+        return ((n - 1) * 100, n * 100 - 1)
+
+    match = _DECADES.search(text)
+    if match:
+        start = int(match.group(1) + match.group(2))
+        span = 10 ** len(match.group(2))
+        return (-start - span + 1, -start) if bce else (start, start + span - 1)
+
+    match = _NUMBER.search(text)
+    if match:
+        year = -int(match.group(0)) if bce else int(match.group(0))
+        return (year, year)
+
+    for name, span in NAMED_PERIODS.items():
+        if re.search(rf'\b{name}\b', text):
+            if span is None:
+                year = datetime.now().year
+                return (year, year)
+            return span
+    return None
+
+
+def parse_era(era: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse an era string into an inclusive (start_year, end_year) interval.
+
+    Negative years are BCE and "present" is the current year, e.g.
+    "17th–18th century" -> (1600, 1799), "1500–500 BCE" -> (-1500, -500),
+    "Kamakura–Edo period" -> (1185, 1868).
+
+    Returns:
+        The interval, or None when no year or known period is found
+    """
+    text = str(era or '').lower().strip()
+    if not text or text == 'nan':
+        return None
+
+    parts = [p.strip() for p in re.split(r'\s*[–—-]\s*|\s+to\s+', text) if p.strip()]
+    if not parts:
+        return None
+    first, last = parts[0], parts[-1]
+
+    # "1500–500 BCE": an unmarked start inherits the end's BCE marker
+    last_bce = bool(_BCE.search(last))
+    first_bce = bool(_BCE.search(first)) or (last_bce and not _CE.search(first)
+                                             and len(parts) > 1)
+    start = _parse_part(first, first_bce)
+    end = _parse_part(last, last_bce) if len(parts) > 1 else start
+    if start is None and end is None:
+        return None
+    start = start or end
+    end = end or start
+
+    if len(parts) == 1 and start == end and not _ORDINAL.search(first) \
+            and not _DECADES.search(first) and _NUMBER.search(first):
+        year = start[0]
+        return (year - SINGLE_YEAR_TOLERANCE, year + SINGLE_YEAR_TOLERANCE)
+
+    lo, hi = start[0], end[1]
+    return (lo, hi) if lo <= hi else (end[0], start[1])
+
+
+def intervals_overlap(a: Optional[Tuple[int, int]], b: Optional[Tuple[int, int]]) -> bool:
+    """True when both intervals are known and intersect."""
+    if a is None or b is None:
+        return False
+    return not (a[1] < b[0] or b[1] < a[0])
+
+
+class EraIntervalIndex:
+    """
+    Static interval tree over artifact eras.
+
+    Intervals are sorted by start year and laid out as an implicit balanced
+    binary tree, each node carrying the maximum end year of its subtree, so
+    range queries prune whole subtrees and run in O(log N + k).
+    """
+
+    def __init__(self, artifacts: List[Dict]):
+        """
+        Parse every artifact's era once and build the tree
+
+        Args:
+            artifacts: List of artifact dictionaries, or any indexable
+                       catalog (an ArtifactStore is kept as is, so its
+                       records are not all decoded into memory)
+        """
+        self.artifacts = artifacts if hasattr(artifacts, '__getitem__') else list(artifacts)
+        self._by_era: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.intervals: Dict[str, Tuple[int, int]] = {}
+        entries = []
+        for i, artifact in enumerate(self.artifacts):
+            interval = self.interval_for(artifact.get('era', ''))
+            if interval is not None:
+                self.intervals[artifact['id']] = interval
+                entries.append((interval[0], interval[1], i))
+        entries.sort()
+        self._starts = [e[0] for e in entries]
+        self._ends = [e[1] for e in entries]
+        self._rows = [e[2] for e in entries]
+        self._max_end = list(self._ends)
+        self._fill_max_end(0, len(entries))
+
+    def _fill_max_end(self, lo: int, hi: int) -> int:
+        """Store the subtree max end at each node's midpoint; return it."""
+        if lo >= hi:
+            return -10 ** 9
+        mid = (lo + hi) // 2
+        best = max(self._ends[mid],
+                   self._fill_max_end(lo, mid),
+                   self._fill_max_end(mid + 1, hi))
+        self._max_end[mid] = best
+        return best
+
+    def interval_for(self, era: str) -> Optional[Tuple[int, int]]:
+        """Parsed interval for an era string (memoised, O(1) after first use)."""
+        key = str(era or '')
+        if key not in self._by_era:
+            self._by_era[key] = parse_era(key)
+        return self._by_era[key]
+
+    def eras_overlap(self, era1: str, era2: str) -> bool:
+        """Whether two era strings describe overlapping periods."""
+        return intervals_overlap(self.interval_for(era1), self.interval_for(era2))
+
+    def overlapping(self, start: Optional[int] = None, end: Optional[int] = None) -> List[Dict]:
+        """
+        Artifacts whose era overlaps [start, end] (open-ended when None)
+
+        Returns:
+            Matching artifacts ordered by era start year
+        """
+        lo = -10 ** 9 if start is None else start
+        hi = 10 ** 9 if end is None else end
+        found = []
+        stack = [(0, len(self._starts))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if self._max_end[mid] < lo:
+                continue  # nothing in this subtree ends late enough
+            if self._starts[mid] <= hi:
+                if self._ends[mid] >= lo:
+                    found.append(mid)
+                stack.append((mid + 1, b))
+            stack.append((a, mid))
+        return [self.artifacts[self._rows[i]] for i in sorted(found)]
@@ -0,0 +1,78 @@
+"""
+Keyword Automaton - Aho-Corasick multi-pattern matcher producing bitmasks
+One pass over a text finds every keyword it contains (as a substring, the
+same as ``keyword in text.lower()``) and returns them as a bitmask
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword list.
+
+    Keyword ``i`` (in the order given) is bit ``1 << i`` of the masks
+    returned by mask(); duplicates share the first keyword's bit.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._bits: Dict[str, int] = {}
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if keyword not in self._bits:
+                self._bits[keyword] = 1 << len(self.keywords)
+                self.keywords.append(keyword)
+
+        # Trie: per-state transitions and output masks; state 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[int] = [0]
+        for keyword, bit in self._bits.items():
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(0)
+                state = nxt
+            self._out[state] |= bit
+
+        # Failure links (breadth-first); outputs inherit their fallback's
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def mask(self, text: str) -> int:
+        """Bitmask of the keywords occurring in *text* (case-insensitive)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = 0
+        for ch in str(text or '').lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found |= out[state]
+        return found
+
+    def bits(self, keywords: Iterable[str]) -> int:
+        """Mask with the bits of *keywords* set"""
+        mask = 0
+        for keyword in keywords:
+            mask |= self._bits[keyword.lower()]
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        """Keywords whose bits are set in *mask*, in keyword order"""
+        return [k for i, k in enumerate(self.keywords) if mask >> i & 1]
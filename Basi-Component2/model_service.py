@@ -1,87 +1,164 @@
 """
 Model Service - Runs the trained model in a separate process to avoid DLL conflicts
-This service provides model inference via JSON input/output through stdin/stdout
+This service provides model inference via length-prefixed binary frames
+(see service_protocol.py) over stdin/stdout
 """
 
 import sys
-import json
 import os
 
+import numpy as np
+
+from service_protocol import ProtocolError, read_frame, write_frame
+
 # Ensure output is unbuffered
 sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
 
+def _ranking(results):
+    """
+    Ranked artifacts as their ids plus score arrays; the client already
+    holds the records, so they are not sent back over the pipe
+    """
+    ranking = {
+        "ids": [r["id"] for r in results],
+        "scores": np.array([r["similarity_score"] for r in results], dtype=np.float64)
+    }
+    if results and "same_cluster" in results[0]:
+        ranking["same_cluster"] = np.array([bool(r["same_cluster"]) for r in results])
+    if results and "field_scores" in results[0]:
+        fields = list(results[0]["field_scores"])
+        ranking["fields"] = fields
+        ranking["field_scores"] = np.array(
+            [[r["field_scores"][f] for f in fields] for r in results], dtype=np.float64)
+    return ranking
+
+
+def _comparison(result, artifact1_id, artifact2_id):
+    """Refer to the compared artifacts by id instead of echoing both records"""
+    if "error" in result:
+        return result
+    del result["artifact1"], result["artifact2"]
+    result["artifact1_id"] = artifact1_id
+    result["artifact2_id"] = artifact2_id
+    result["same_cluster"] = bool(result["same_cluster"])
+    result["source"] = "trained_model"
+    return result
+
+
+def handle_request(model, action, request):
+    """Run one request against the loaded model and return its result"""
+    if action == "compare":
+        artifact1_id = request.get("artifact1_id")
+        artifact2_id = request.get("artifact2_id")
+        result = model.compare_artifacts(artifact1_id, artifact2_id)
+        return _comparison(result, artifact1_id, artifact2_id)
+        
+    elif action == "compare_many":
+        pairs = [tuple(pair) for pair in request.get("pairs", [])]
+        results = model.compare_many(pairs)
+        return [_comparison(result, a, b) for result, (a, b) in zip(results, pairs)]
+        
+    elif action == "similar":
+        artifact_id = request.get("artifact_id")
+        top_k = request.get("top_k", 5)
+        field_weights = request.get("field_weights")
+        if field_weights:
+            return _ranking(model.find_similar_by_fields(artifact_id, field_weights, top_k))
+        return _ranking(model.find_similar(artifact_id, top_k, n_probe=request.get("n_probe")))
+        
+    elif action == "similar_many":
+        artifact_ids = request.get("artifact_ids", [])
+        top_k = request.get("top_k", 5)
+        n_probe = request.get("n_probe")
+        return [_ranking(results) for results in
+                model.find_similar_many(artifact_ids, top_k, n_probe=n_probe)]
+        
+    elif action == "search":
+        query = request.get("query", "")
+        top_k = request.get("top_k", 10)
+        return _ranking(model.search(query, top_k, n_probe=request.get("n_probe")))
+        
+    elif action == "ping":
+        return {"status": "ok"}
+        
+    elif action == "status":
+        return {
+            "model_trained": model.is_trained,
+            "artifact_count": len(model.artifacts),
+            "model_name": model.model_name
+        }
+        
+    raise ValueError(f"Unknown action: {action}")
+
+
 def main():
     """Process comparison requests from stdin"""
+    # Frames go to a private copy of stdout; fd 1 itself is pointed at stderr
+    # so loading messages and library output cannot corrupt the framing
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+    
     try:
         # Change to script directory
         script_dir = os.path.dirname(os.path.abspath(__file__))
         os.chdir(script_dir)
         
+        # Pool workers get a share of the CPU threads (see ModelServicePool)
+        threads = os.getenv("MODEL_SERVICE_THREADS")
+        if threads:
+            import torch
+            torch.set_num_threads(int(threads))
+        
         from artifact_model import ArtifactComparisonModel
         
         # Load the model once
         model = ArtifactComparisonModel()
         
         if not model.is_trained:
-            print(json.dumps({"error": "Model not trained"}))
-            sys.stdout.flush()
+            write_frame(channel, {"error": "Model not trained"})
             return
         
         # Signal ready
-        print(json.dumps({"status": "ready", "artifacts": len(model.artifacts)}))
-        sys.stdout.flush()
+        write_frame(channel, {"status": "ready", "artifacts": len(model.artifacts)})
         
-        # Process requests from stdin
-        for line in sys.stdin:
+        # Process requests from stdin. A request carrying an "id" gets its
+        # answer wrapped as {"id": ..., "result": ...} or {"id": ..., "error": ...}
+        # so clients can pipeline requests and match responses; requests
+        # without one get the bare result.
+        while True:
+            request_id = None
             try:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                request = json.loads(line)
+                request = read_frame(requests)
+                if request is None:
+                    break
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be an object")
+                request_id = request.get("id")
                 action = request.get("action")
                 
-                if action == "compare":
-                    artifact1_id = request.get("artifact1_id")
-                    artifact2_id = request.get("artifact2_id")
-                    result = model.compare_artifacts(artifact1_id, artifact2_id)
-                    result["source"] = "trained_model"
-                    print(json.dumps(result, default=str))
-                    sys.stdout.flush()
-                    
-                elif action == "similar":
-                    artifact_id = request.get("artifact_id")
-                    top_k = request.get("top_k", 5)
-                    result = model.find_similar(artifact_id, top_k)
-                    print(json.dumps(result, default=str))
-                    sys.stdout.flush()
-                    
-                elif action == "status":
-                    print(json.dumps({
-                        "model_trained": model.is_trained,
-                        "artifact_count": len(model.artifacts),
-                        "model_name": model.model_name
-                    }))
-                    sys.stdout.flush()
-                    
-                elif action == "quit":
+                if action == "quit":
                     break
+                
+                result = handle_request(model, action, request)
+                if request_id is not None:
+                    result = {"id": request_id, "result": result}
+                write_frame(channel, result)
                     
-                else:
-                    print(json.dumps({"error": f"Unknown action: {action}"}))
-                    sys.stdout.flush()
-                    
-            except json.JSONDecodeError as e:
-                print(json.dumps({"error": f"Invalid JSON: {e}"}))
-                sys.stdout.flush()
+            except ProtocolError as e:
+                # The byte stream can no longer be trusted; stop so the
+                # client notices and restarts the service
+                write_frame(channel, {"error": f"Invalid frame: {e}"})
+                break
             except Exception as e:
-                print(json.dumps({"error": str(e)}))
-                sys.stdout.flush()
+                error = {"error": str(e)}
+                if request_id is not None:
+                    error["id"] = request_id
+                write_frame(channel, error)
                 
     except Exception as e:
-        print(json.dumps({"error": f"Service startup failed: {e}"}))
-        sys.stdout.flush()
+        write_frame(channel, {"error": f"Service startup failed: {e}"})
 
 
 if __name__ == "__main__":
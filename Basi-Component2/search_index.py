@@ -0,0 +1,175 @@
+"""
+Artifact Search Index
+Server-side BM25 full-text search and name autocomplete over the artifact catalog
+"""
+
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# Fields indexed for full-text search (same fields ComparisonEngine scores),
+# with BM25F-style weights: a term in the name counts three times as much
+# as the same term in the notes.
+SEARCH_FIELDS = {
+    'name':      3.0,
+    'category':  2.0,
+    'materials': 1.5,
+    'function':  1.0,
+    'symbolism': 1.0,
+    'notes':     1.0,
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Artifacts remembered per trie node (bounds autocomplete memory)
+MAX_SUGGESTIONS = 20
+
+
+def _stem(word: str) -> str:
+    """Very light plural folding so 'masks' matches 'mask'."""
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _terms(text: str) -> List[str]:
+    """Lowercase, stop-word-filtered, plural-folded terms (with repeats)."""
+    words = re.findall(r'\b[a-z0-9]{2,}\b', str(text).lower())
+    return [_stem(w) for w in words if w not in ENGLISH_STOP_WORDS]
+
+
+class ArtifactSearchIndex:
+    """BM25 inverted index plus a prefix trie over artifact names"""
+
+    def __init__(self, artifacts: List[Dict]):
+        """
+        Build the search index
+
+        Args:
+            artifacts: List of artifact dictionaries
+        """
+        self.artifacts = list(artifacts)
+        self._postings: Dict[str, tuple] = {}
+        self._trie: dict = {}
+        self._build_inverted_index()
+        self._build_trie()
+
+    def _build_inverted_index(self):
+        """Precompute the BM25 contribution of every (term, artifact) posting.
+
+        Query-time scoring is then a sum of per-term impact arrays.
+        """
+        n = len(self.artifacts)
+        term_freqs = []
+        lengths = np.zeros(n)
+        for i, artifact in enumerate(self.artifacts):
+            tf: Dict[str, float] = {}
+            for field, weight in SEARCH_FIELDS.items():
+                value = artifact.get(field, '')
+                if not value or value == 'nan':
+                    continue
+                for term in _terms(value):
+                    tf[term] = tf.get(term, 0.0) + weight
+                    lengths[i] += weight
+            term_freqs.append(tf)
+
+        avg_len = lengths.mean() if n and lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_len)
+
+        docs: Dict[str, list] = {}
+        for i, tf in enumerate(term_freqs):
+            for term, freq in tf.items():
+                docs.setdefault(term, []).append((i, freq))
+
+        for term, entries in docs.items():
+            ids = np.array([i for i, _ in entries], dtype=np.int64)
+            freqs = np.array([f for _, f in entries])
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            impact = idf * freqs * (BM25_K1 + 1) / (freqs + norm[ids])
+            self._postings[term] = (ids, impact)
+
+    def _build_trie(self):
+        """Character trie over every word-start suffix of each name.
+
+        "Japanese Katana" is reachable from both "japanese ka" and "kat".
+        Each node keeps up to MAX_SUGGESTIONS artifact indices in name order.
+        """
+        order = sorted(range(len(self.artifacts)),
+                       key=lambda i: str(self.artifacts[i].get('name', '')).lower())
+        for i in order:
+            name = str(self.artifacts[i].get('name', '')).lower()
+            for match in re.finditer(r'\b\w', name):
+                node = self._trie
+                for ch in name[match.start():]:
+                    node = node.setdefault(ch, {})
+                    hits = node.setdefault('', [])
+                    if len(hits) < MAX_SUGGESTIONS and i not in hits:
+                        hits.append(i)
+
+    def search(self, query: str, page: int = 1, per_page: int = 20) -> Dict:
+        """
+        Rank artifacts for a free-text query with BM25
+
+        Args:
+            query: Search text
+            page: 1-based page number
+            per_page: Results per page
+
+        Returns:
+            Dictionary with total hit count, paging info and the page's
+            artifacts (each with a 'search_score')
+        """
+        page = max(1, int(page))
+        per_page = max(1, int(per_page))
+        scores = np.zeros(len(self.artifacts))
+        matched = np.zeros(len(self.artifacts), dtype=bool)
+        for term in set(_terms(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, impact = posting
+            scores[ids] += impact
+            matched[ids] = True
+
+        hits = np.flatnonzero(matched)
+        # Best-first, ties in catalog order
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        start = (page - 1) * per_page
+        results = []
+        for i in hits[start:start + per_page]:
+            artifact = self.artifacts[i].copy()
+            artifact['search_score'] = round(float(scores[i]), 4)
+            results.append(artifact)
+
+        return {
+            'query': query,
+            'total': int(len(hits)),
+            'page': page,
+            'per_page': per_page,
+            'pages': math.ceil(len(hits) / per_page),
+            'results': results,
+        }
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        Suggest artifact names starting with (a word starting with) *prefix*
+
+        Returns:
+            List of {'id', 'name'} dictionaries in name order
+        """
+        prefix = re.sub(r'\s+', ' ', str(prefix).lower()).strip()
+        if not prefix:
+            return []
+        node: Optional[dict] = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return [
+            {'id': self.artifacts[i]['id'], 'name': self.artifacts[i].get('name', '')}
+            for i in node.get('', [])[:max(0, int(limit))]
+        ]
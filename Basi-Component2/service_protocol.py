@@ -0,0 +1,184 @@
+"""
+Model Service Protocol - Length-prefixed binary frames over pipes
+Each message is one frame: a length prefix, a header (msgpack when installed,
+otherwise compact JSON) and the raw bytes of any numpy arrays it carries, so
+numeric results cross the pipe without being converted to text
+"""
+
+import json
+import os
+import select
+import struct
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Frame: >I payload length, then payload = >BI (codec, header length) | header | array bytes
+_LENGTH = struct.Struct('>I')
+_HEADER = struct.Struct('>BI')
+
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+
+# Largest payload accepted (guards against reading garbage as a length)
+MAX_FRAME_SIZE = 256 * 2 ** 20
+
+# Bytes requested per os.read() while assembling frames
+_READ_CHUNK = 65536
+
+# select() works on pipes everywhere except Windows; there reads block and
+# deadlines are enforced by the caller waiting on the response instead
+_CAN_SELECT = os.name != 'nt'
+
+
+class ProtocolError(Exception):
+    """Raised when a frame cannot be decoded"""
+
+
+def _flatten(obj: Any, buffers: List[bytes], offset: List[int]) -> Any:
+    """Replace numpy arrays with placeholders, collecting their bytes"""
+    if isinstance(obj, np.ndarray):
+        data = np.ascontiguousarray(obj).tobytes()
+        placeholder = {'__ndarray__': offset[0], 'dtype': obj.dtype.str, 'shape': list(obj.shape)}
+        buffers.append(data)
+        offset[0] += len(data)
+        return placeholder
+    if isinstance(obj, dict):
+        return {str(k): _flatten(v, buffers, offset) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_flatten(v, buffers, offset) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _restore(obj: Any, data: memoryview) -> Any:
+    """Inverse of _flatten: rebuild arrays as read-only views of *data*"""
+    if isinstance(obj, dict):
+        if '__ndarray__' in obj:
+            dtype = np.dtype(obj['dtype'])
+            shape = tuple(obj['shape'])
+            count = int(np.prod(shape)) if shape else 1
+            return np.frombuffer(data, dtype=dtype, count=count,
+                                 offset=obj['__ndarray__']).reshape(shape)
+        return {k: _restore(v, data) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_restore(v, data) for v in obj]
+    return obj
+
+
+def encode_frame(message: Any) -> bytes:
+    """Serialise *message* (dicts/lists/scalars/numpy arrays) as one frame"""
+    buffers: List[bytes] = []
+    header = _flatten(message, buffers, [0])
+    if msgpack is not None:
+        codec, header_bytes = CODEC_MSGPACK, msgpack.packb(header, default=str)
+    else:
+        codec = CODEC_JSON
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':'),
+                                  default=str).encode('utf-8')
+    payload_size = _HEADER.size + len(header_bytes) + sum(len(b) for b in buffers)
+    return b''.join([_LENGTH.pack(payload_size), _HEADER.pack(codec, len(header_bytes)),
+                     header_bytes, *buffers])
+
+
+def decode_payload(payload: bytes) -> Any:
+    """Decode a frame payload (everything after the length prefix)"""
+    if len(payload) < _HEADER.size:
+        raise ProtocolError("Truncated frame")
+    codec, header_size = _HEADER.unpack_from(payload)
+    view = memoryview(payload)
+    header_bytes = view[_HEADER.size:_HEADER.size + header_size]
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ProtocolError("Frame is msgpack-encoded but msgpack is not installed")
+        header = msgpack.unpackb(header_bytes)
+    elif codec == CODEC_JSON:
+        header = json.loads(bytes(header_bytes).decode('utf-8'))
+    else:
+        raise ProtocolError(f"Unknown frame codec: {codec}")
+    return _restore(header, view[_HEADER.size + header_size:])
+
+
+def write_frame(stream, message: Any) -> None:
+    """Write one frame to a binary stream and flush it"""
+    stream.write(encode_frame(message))
+    stream.flush()
+
+
+def _check_size(size: int) -> int:
+    if size > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {size} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    return size
+
+
+def read_frame(stream) -> Optional[Any]:
+    """Blocking read of one frame from a binary stream; None at end of stream"""
+    prefix = stream.read(_LENGTH.size)
+    if len(prefix) < _LENGTH.size:
+        return None
+    size = _check_size(_LENGTH.unpack(prefix)[0])
+    payload = stream.read(size)
+    if len(payload) < size:
+        return None
+    return decode_payload(payload)
+
+
+class FrameReader:
+    """
+    Assembles frames from a pipe file descriptor.
+
+    read() can wait with select() until a deadline, but only where pipes can
+    be polled; on Windows it blocks until data arrives. Callers that need a
+    deadline everywhere read on their own thread and wait on the result
+    (ModelServiceClient does this for every frame, including the ready one).
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self._buffer = bytearray()
+
+    def _next_frame(self) -> Optional[bytes]:
+        if len(self._buffer) < _LENGTH.size:
+            return None
+        size = _check_size(_LENGTH.unpack_from(self._buffer)[0])
+        end = _LENGTH.size + size
+        if len(self._buffer) < end:
+            return None
+        payload = bytes(self._buffer[_LENGTH.size:end])
+        del self._buffer[:end]
+        return payload
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Next message from the pipe
+
+        Args:
+            timeout: Seconds to wait for a complete frame (None = no limit;
+                     ignored where select() cannot poll pipes)
+
+        Returns:
+            The decoded message, or None once the other end has closed the pipe
+
+        Raises:
+            TimeoutError: if no complete frame arrived before the deadline
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            payload = self._next_frame()
+            if payload is not None:
+                return decode_payload(payload)
+            if deadline is not None and _CAN_SELECT:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                    raise TimeoutError("No complete frame before the deadline")
+            chunk = os.read(self.fd, _READ_CHUNK)
+            if not chunk:
+                return None
+            self._buffer += chunk
@@ -0,0 +1,135 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ann_index import IVFIndex
+from compact_embeddings import CompactEmbeddings
+
+
+def clustered_embeddings(n=2000, dims=64, clusters=20, seed=0):
+    """Unit vectors scattered around a few random centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dims))
+    rows = centres[rng.integers(clusters, size=n)] + 0.35 * rng.normal(size=(n, dims))
+    rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows.astype(np.float32)
+
+
+def exact_top_k(embeddings, query, k, exclude=None):
+    """The original brute-force scan: score every row, stable sort"""
+    scores = embeddings @ query
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    return np.argsort(-scores, kind='stable')[:k]
+
+
+def test_ivf_full_probe_is_exact():
+    embeddings = clustered_embeddings()
+    index = IVFIndex.build(embeddings, n_lists=16)
+    assert sorted(index.list_ids.tolist()) == list(range(len(embeddings)))
+    for row in range(0, len(embeddings), 97):
+        ids, scores = index.search(embeddings, embeddings[row], 10,
+                                   n_probe=index.n_lists, exclude=row)
+        expected = exact_top_k(embeddings, embeddings[row], 10, exclude=row)
+        assert set(ids.tolist()) == set(expected.tolist())
+        assert np.allclose(scores, embeddings[ids] @ embeddings[row])
+        assert (np.diff(scores) <= 0).all()
+    assert index.recall(embeddings, index.n_lists) == 1.0
+
+
+def test_ivf_calibrate_reaches_target():
+    embeddings = clustered_embeddings()
+    index = IVFIndex.build(embeddings, n_lists=32)
+    recall = index.calibrate(embeddings, target=0.9)
+    assert recall >= 0.9 or index.n_probe == index.n_lists
+    assert index.recall(embeddings, index.n_probe) == recall
+    if index.n_probe > 1:
+        # The chosen probe count is the fewest that reaches the target
+        assert index.recall(embeddings, index.n_probe // 2) < 0.9
+
+
+def test_ivf_save_load_round_trip():
+    embeddings = clustered_embeddings(n=500)
+    index = IVFIndex.build(embeddings, n_lists=8, n_probe=3)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'ann.npz')
+        index.save(path)
+        loaded = IVFIndex.load(path)
+        assert loaded.n_probe == 3
+        assert np.array_equal(loaded.offsets, index.offsets)
+        assert np.array_equal(loaded.list_ids, index.list_ids)
+        query = embeddings[7]
+        assert np.array_equal(loaded.search(embeddings, query, 5)[0],
+                              index.search(embeddings, query, 5)[0])
+        assert IVFIndex.load(os.path.join(directory, 'missing.npz')) is None
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def reranked_recall(compact, embeddings, k=10, shortlist=100, step=101):
+    """recall@k of a compact first pass + exact rerank of its shortlist"""
+    hits = total = 0
+    for row in range(0, len(embeddings), step):
+        query = embeddings[row]
+        first = np.argsort(-compact.scores(query), kind='stable')[:shortlist]
+        found = first[np.argsort(-(embeddings[first] @ query), kind='stable')][:k]
+        hits += len(np.intersect1d(found, exact_top_k(embeddings, query, k)))
+        total += k
+    return hits / total
+
+
+def test_compact_scores_track_exact():
+    embeddings = clustered_embeddings()
+    query = embeddings[3]
+    exact = embeddings @ query
+    for storage, pca_dims, tolerance in (('float32', None, 1e-5), ('float16', 32, 0.05),
+                                         ('int8', None, 0.05), ('int8', 32, 0.1)):
+        compact = CompactEmbeddings.build(embeddings, storage, pca_dims)
+        # Widening full-width codes costs more than the float32 scan they replace
+        assert compact.first_pass == (pca_dims is not None)
+        scores = compact.scores(query)
+        assert scores.dtype == np.float32
+        assert np.abs(scores - exact).max() < tolerance, storage
+        rows = np.array([5, 1, 900])
+        assert np.allclose(compact.scores(query, rows), scores[rows])
+        assert reranked_recall(compact, embeddings) >= 0.95, (storage, pca_dims)
+
+
+def test_float16_storage():
+    embeddings = clustered_embeddings(n=500)
+    full = CompactEmbeddings.build(embeddings, 'float16')
+    assert not full.first_pass
+    assert full.nbytes == embeddings.nbytes // 2
+    assert not CompactEmbeddings.build(embeddings, 'int8').first_pass
+
+    reduced = CompactEmbeddings.build(embeddings, 'float16', pca_dims=16)
+    assert reduced.first_pass
+    assert reduced.codes.dtype == np.float16
+    query = embeddings[0]
+    widened = (embeddings @ reduced.projection).astype(np.float16).astype(np.float32)
+    assert np.allclose(reduced.scores(query), widened @ (query @ reduced.projection), atol=1e-5)
+
+    directory = tempfile.mkdtemp()
+    try:
+        reduced.save(directory)
+        loaded = CompactEmbeddings.load(directory)
+        assert loaded.storage == 'float16' and loaded.first_pass
+        assert np.array_equal(loaded.scores(query), reduced.scores(query))
+        CompactEmbeddings.remove(directory)
+        assert CompactEmbeddings.load(directory) is None
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,231 @@
+import atexit
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+# Add this directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import ai_explainer_v2
+
+
+class OfflineExplainer:
+    """Stands in for AIExplainer so importing the app starts no model service or T5"""
+
+    use_openai = False
+
+    def __init__(self):
+        self.model_service = None
+
+
+def import_app():
+    """Import app.py in a scratch directory holding only the dataset, so the
+    snapshots and explanation cache it writes stay out of the repository"""
+    work_dir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, work_dir, True)
+    shutil.copy(os.path.join(BASE_DIR, 'Dataset 2 component 2 - Comparison.xlsx'), work_dir)
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        with mock.patch.object(ai_explainer_v2, 'AIExplainer', OfflineExplainer):
+            import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+
+app = import_app()
+client = app.app.test_client()
+IDS = [a['id'] for a in app.artifacts]
+
+
+def test_artifacts_by_era_range():
+    ids = [a['id'] for a in client.get('/api/artifacts?from=-600&to=-500').get_json()]
+    expected = [a['id'] for a in app.era_index.overlapping(-600, -500)]
+    assert ids == expected and 'C004' in ids and 'A001' not in ids
+    assert len(client.get('/api/artifacts?from=1800').get_json()) < len(IDS)
+    assert len(client.get('/api/artifacts').get_json()) == len(IDS)
+    assert client.get('/api/artifacts?from=ancient').status_code == 400
+
+
+def test_search_routes_page_and_cap():
+    body = client.get('/api/search?q=temple+wood&page=2&per_page=500').get_json()
+    assert body['page'] == 2 and body['per_page'] == 100
+    assert body['results'] == []
+    full = client.get('/api/search?q=temple+wood&per_page=2').get_json()
+    assert full['pages'] == -(-full['total'] // 2) and len(full['results']) == 2
+    assert [s['name'] for s in client.get('/api/search/autocomplete?q=japanese+t').get_json()] \
+        == ['Japanese Taiko Drum']
+    assert len(client.get('/api/search/autocomplete?q=a&limit=500').get_json()) <= 20
+
+
+def test_batch_similar_matches_single_queries():
+    response = client.post('/api/artifacts/similar/batch', json={
+        'artifact_ids': IDS[:3] + ['NOPE'], 'limit': 4,
+        'filters': {'is_sri_lankan': False}})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['NOPE'] == []
+    for artifact_id in IDS[:3]:
+        single = client.get(f'/api/artifacts/{artifact_id}/similar?limit=4&is_sri_lankan=false')
+        assert [r['id'] for r in body[artifact_id]] == [r['id'] for r in single.get_json()]
+
+
+def test_batch_similar_validation_and_caps():
+    url = '/api/artifacts/similar/batch'
+    for body in ({}, {'artifact_ids': []}, {'artifact_ids': 'A001'},
+                 {'artifact_ids': IDS[:1] * (app.MAX_BATCH_ARTIFACTS + 1)},
+                 {'artifact_ids': IDS[:1], 'weights': [1]},
+                 {'artifact_ids': IDS[:1], 'filters': 'japan'},
+                 {'artifact_ids': IDS[:1], 'weights': {'colour': 1}},
+                 {'artifact_ids': IDS[:1], 'filters': {'era': 'modern'}},
+                 {'artifact_ids': IDS[:1], 'limit': 'many'}):
+        response = client.post(url, json=body)
+        assert response.status_code == 400, body
+        assert 'error' in response.get_json()
+
+    with mock.patch.object(app, 'MAX_BATCH_RESULTS', 3):
+        response = client.post(url, json={'artifact_ids': IDS[:2], 'limit': 1000})
+    assert response.status_code == 200
+    assert all(len(results) == 3 for results in response.get_json().values())
+
+
+def test_similarity_matrix_json_and_binary():
+    url = '/api/artifacts/similarity-matrix'
+    ids = IDS[:4]
+    body = client.post(url, json={'artifact_ids': ids + [ids[0], 'NOPE']}).get_json()
+    assert body['artifact_ids'] == ids
+    assert body['missing'] == ['NOPE']
+    matrix = np.array(body['matrix'])
+    assert matrix.shape == (4, 4)
+    assert np.allclose(matrix, matrix.T, atol=1e-4)
+    # Off-diagonal cells are the find_similar scores of the same pair
+    for i, artifact_id in enumerate(ids):
+        scores = {r['id']: r['similarity_score']
+                  for r in app.comparison_engine.find_similar(artifact_id, len(IDS))}
+        for j, other in enumerate(ids):
+            if i != j:
+                assert abs(matrix[i, j] - scores[other]) <= 1e-4
+
+    response = client.post(url, json={'artifact_ids': ids + ['NOPE'], 'format': 'float32'})
+    assert response.status_code == 200
+    assert response.headers['X-Artifact-Ids'] == ','.join(ids)
+    assert response.headers['X-Matrix-Shape'] == '4,4'
+    assert response.headers['X-Missing-Artifact-Ids'] == 'NOPE'
+    binary = np.frombuffer(response.data, dtype='<f4').reshape(4, 4)
+    assert np.allclose(binary, matrix, atol=1e-4)
+
+    weighted = client.post(url, json={'artifact_ids': ids,
+                                      'weights': {'materials': 1}}).get_json()
+    assert weighted['matrix'] != body['matrix']
+
+
+def test_similarity_matrix_validation_and_cap():
+    url = '/api/artifacts/similarity-matrix'
+    for body in ({}, {'artifact_ids': []}, {'artifact_ids': 'A001'},
+                 {'artifact_ids': IDS[:1] * (app.MAX_MATRIX_ARTIFACTS + 1)},
+                 {'artifact_ids': IDS[:2], 'weights': 'materials:1'},
+                 {'artifact_ids': IDS[:2], 'weights': {'materials': -1}}):
+        response = client.post(url, json=body)
+        assert response.status_code == 400, body
+        assert 'error' in response.get_json()
+    body = client.post(url, json={'artifact_ids': ['NOPE']}).get_json()
+    assert body == {'artifact_ids': [], 'matrix': [], 'missing': ['NOPE']}
+
+
+class FakeModelService:
+    """Answers find_similar with fixed semantic scores and records each call"""
+
+    is_ready = True
+
+    def __init__(self, response=None):
+        self.calls = []
+        self.response = response
+
+    def find_similar(self, artifact_id, top_k=5, n_probe=None, field_weights=None):
+        self.calls.append({'artifact_id': artifact_id, 'top_k': top_k, 'n_probe': n_probe,
+                           'field_weights': field_weights})
+        if self.response is not None:
+            return self.response
+        return [{'id': aid, 'similarity_score': 1.0 - i / 10}
+                for i, aid in enumerate(IDS[1:8])]
+
+
+def test_hybrid_similar_fuses_service_candidates():
+    url = f'/api/artifacts/{IDS[0]}/similar/hybrid'
+    service = FakeModelService()
+    with mock.patch.object(app.ai_explainer, 'model_service', service, create=True):
+        body = client.get(url + '?limit=3&candidates=5000&n_probe=4'
+                                '&field_weights=symbolism:1&weights=materials:0.6').get_json()
+        assert service.calls == [{'artifact_id': IDS[0], 'top_k': app.MAX_HYBRID_CANDIDATES,
+                                  'n_probe': 4, 'field_weights': {'symbolism': 1.0}}]
+        candidates = {aid: 1.0 - i / 10 for i, aid in enumerate(IDS[1:8])}
+        expected = app.comparison_engine.find_similar_hybrid(
+            IDS[0], candidates, 3, weights={'materials': 0.6})
+        assert [r['id'] for r in body] == [r['id'] for r in expected]
+        assert all('semantic_score' in r and r['id'] in candidates for r in body)
+
+        assert client.get(url + '?semantic_weight=2').status_code == 400
+        assert client.get(url + '?weights=materials').status_code == 400
+
+        service.response = {'error': 'Unknown semantic field(s): colour'}
+        response = client.get(url + '?field_weights=colour:1')
+        assert response.status_code == 400 and 'colour' in response.get_json()['error']
+        # Without field weights a failed lookup falls back to lexical ranking
+        fallback = client.get(url + '?limit=3').get_json()
+        assert fallback == client.get(f'/api/artifacts/{IDS[0]}/similar?limit=3').get_json()
+
+    with mock.patch.object(app.ai_explainer, 'model_service', None, create=True):
+        body = client.get(url + '?limit=3').get_json()
+        assert body == client.get(f'/api/artifacts/{IDS[0]}/similar?limit=3').get_json()
+        assert all('semantic_score' not in r for r in body)
+
+
+def test_train_runs_in_a_child_process():
+    from artifact_model import ArtifactComparisonModel
+    from artifact_store import CURRENT_VERSION_FILE
+    model_dir = tempfile.mkdtemp()
+    version = os.path.join(model_dir, 'model_test')
+    os.makedirs(version)
+    with open(os.path.join(model_dir, CURRENT_VERSION_FILE), 'w') as f:
+        f.write('model_test')
+    with open(os.path.join(version, ArtifactComparisonModel.METADATA_FILE), 'w') as f:
+        json.dump({'model_name': 'stub-model', 'artifact_index': {'A001': 0, 'C001': 1}}, f)
+
+    stopped = []
+    previous = app.ai_explainer
+    previous.stop_model_service = lambda: stopped.append(True)
+    try:
+        with mock.patch.object(ArtifactComparisonModel, 'MODEL_DIR', model_dir), \
+                mock.patch.object(ai_explainer_v2, 'AIExplainer', OfflineExplainer), \
+                mock.patch.object(app.subprocess, 'run') as run:
+            run.return_value = subprocess.CompletedProcess([], 0)
+            body = client.post('/api/model/train').get_json()
+            assert body['success'] and body['artifact_count'] == 2
+            assert body['model_name'] == 'stub-model'
+            args, kwargs = run.call_args
+            assert args[0] == [sys.executable, os.path.join(BASE_DIR, 'artifact_model.py')]
+            assert kwargs['cwd'] == BASE_DIR
+            # The old service is stopped first and a fresh explainer loads the model
+            assert stopped == [True] and app.ai_explainer is not previous
+
+            run.return_value = subprocess.CompletedProcess([], 1)
+            response = client.post('/api/model/train')
+            assert response.status_code == 500
+            assert 'code 1' in response.get_json()['error']
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
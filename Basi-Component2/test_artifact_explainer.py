@@ -1,10 +1,8 @@
-import json
 from artifact_ai_explainer import ArtifactAIExplainer
+from artifact_store import model_version_dir, read_artifacts
 
 # Load all artifacts from your dataset
-with open('trained_model/artifact_metadata.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
-    artifacts = data['artifacts']
+artifacts = read_artifacts(model_version_dir('trained_model'))
 
 explainer = ArtifactAIExplainer()
 
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import artifact_model
+from artifact_model import ArtifactComparisonModel
+from artifact_store import CURRENT_VERSION_FILE, model_version_dir
+from test_comparison_engine import load_artifacts
+
+
+class StubEncoder:
+    """Stands in for SentenceTransformer: each text maps to a fixed random
+    vector seeded by its hash, and every encoded text is recorded"""
+
+    encoded = []
+
+    def __init__(self, model_name, device=None):
+        self.model_name = model_name
+
+    def encode(self, texts, **kwargs):
+        StubEncoder.encoded.extend(texts)
+        return np.stack([
+            np.random.default_rng(int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16))
+            .standard_normal(16) for t in texts
+        ]).astype(np.float32)
+
+
+@contextmanager
+def scratch_model_dir():
+    """A temporary MODEL_DIR, with the stub encoder in place of the real one"""
+    directory = tempfile.mkdtemp()
+    StubEncoder.encoded = []
+    try:
+        with mock.patch.object(ArtifactComparisonModel, 'MODEL_DIR', directory), \
+                mock.patch.object(artifact_model, 'SentenceTransformer', StubEncoder):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def versions(directory):
+    return sorted(name for name in os.listdir(directory)
+                  if name.startswith(ArtifactComparisonModel.VERSION_PREFIX))
+
+
+def file_identities(directory):
+    """(inode, mtime) of every file, to tell whether any was rewritten"""
+    return {name: (os.stat(os.path.join(directory, name)).st_ino,
+                   os.stat(os.path.join(directory, name)).st_mtime_ns)
+            for name in os.listdir(directory)}
+
+
+def test_save_never_touches_a_mapped_version():
+    with scratch_model_dir() as directory:
+        artifacts = load_artifacts()
+        ArtifactComparisonModel().train(artifacts, n_clusters=3)
+        first = model_version_dir(directory)
+        assert first != directory
+        before = file_identities(first)
+
+        # A running service maps the first version...
+        reader = ArtifactComparisonModel()
+        assert isinstance(reader.artifact_embeddings, np.memmap)
+        embeddings = np.array(reader.artifact_embeddings)
+        fields = np.array(reader.field_embeddings)
+
+        # ...while another model (itself mapping it) retrains twice
+        edited = [dict(a) for a in artifacts]
+        edited[0]['notes'] = 'Restored in 2024'
+        writer = ArtifactComparisonModel()
+        writer.train(edited, n_clusters=3)
+        second = model_version_dir(directory)
+        assert second not in (first, directory)
+        assert file_identities(first) == before
+        assert np.array_equal(reader.artifact_embeddings, embeddings)
+        assert np.array_equal(reader.field_embeddings, fields)
+        assert reader.artifacts[0]['notes'] == artifacts[0]['notes']
+        assert versions(directory) == sorted(os.path.basename(d) for d in (first, second))
+
+        writer.train(artifacts, n_clusters=3)
+        third = model_version_dir(directory)
+        # The version that was current before this save is kept, older ones go
+        assert versions(directory) == sorted(os.path.basename(d) for d in (second, third))
+
+        loaded = ArtifactComparisonModel()
+        assert loaded.is_trained and len(loaded.artifacts) == len(artifacts)
+        assert np.array_equal(loaded.artifact_embeddings, embeddings)
+
+
+def test_unversioned_model_loads_and_is_replaced():
+    with scratch_model_dir() as directory:
+        artifacts = load_artifacts()
+        ArtifactComparisonModel().train(artifacts, n_clusters=3)
+        # Lay the files out the way models were saved before versioning
+        version = model_version_dir(directory)
+        for name in os.listdir(version):
+            shutil.move(os.path.join(version, name), directory)
+        os.rmdir(version)
+        os.remove(os.path.join(directory, CURRENT_VERSION_FILE))
+        assert model_version_dir(directory) == directory
+
+        model = ArtifactComparisonModel()
+        assert model.is_trained and len(model.artifacts) == len(artifacts)
+        model.train(artifacts, n_clusters=3)
+        assert model_version_dir(directory) != directory
+        # Kept for services mapping it until the save after this one
+        assert os.path.exists(os.path.join(directory, ArtifactComparisonModel.EMBEDDINGS_FILE))
+        model.train(artifacts, n_clusters=3)
+        assert not os.path.exists(os.path.join(directory, ArtifactComparisonModel.EMBEDDINGS_FILE))
+        assert set(os.listdir(directory)) == {CURRENT_VERSION_FILE, *versions(directory)}
+
+
+def test_retraining_reuses_embeddings_by_content_hash():
+    artifacts = load_artifacts()
+    with scratch_model_dir():
+        model = ArtifactComparisonModel()
+        model.train(artifacts, n_clusters=3)
+        n_fields = len(artifact_model.SEMANTIC_FIELDS)
+        assert len(StubEncoder.encoded) == len(artifacts) * (1 + n_fields)
+        by_id = {a['id']: np.array(model.artifact_embeddings[i]) for i, a in enumerate(artifacts)}
+        fields = {a['id']: np.array(model.field_embeddings[i]) for i, a in enumerate(artifacts)}
+
+        # One changed field: that artifact's text and that field are re-encoded
+        edited = [dict(a) for a in artifacts]
+        edited[4]['notes'] = 'Repainted for the 1950 perahera'
+        StubEncoder.encoded = []
+        model = ArtifactComparisonModel()
+        model.train(edited, n_clusters=3)
+        assert StubEncoder.encoded == [model._create_artifact_text(edited[4]),
+                                       model._field_text(edited[4], 'notes')]
+        for i, a in enumerate(edited):
+            if i != 4:
+                assert np.array_equal(model.artifact_embeddings[i], by_id[a['id']])
+                assert np.array_equal(model.field_embeddings[i], fields[a['id']])
+        assert not np.array_equal(model.artifact_embeddings[4], by_id[edited[4]['id']])
+
+        # Reordered and shrunk: every row is reused, following its content
+        shuffled = edited[::-1][:-3]
+        StubEncoder.encoded = []
+        model.train(shuffled, n_clusters=3)
+        assert StubEncoder.encoded == []
+        for i, a in enumerate(shuffled):
+            if a['id'] != edited[4]['id']:
+                assert np.array_equal(model.artifact_embeddings[i], by_id[a['id']])
+        assert model.text_hashes == [model._text_hash(model._create_artifact_text(a))
+                                     for a in shuffled]
+
+        StubEncoder.encoded = []
+        model.train(shuffled, n_clusters=3, reuse_embeddings=False)
+        assert len(StubEncoder.encoded) == len(shuffled) * (1 + n_fields)
+
+
+def stub_unit_vector(text):
+    """The stub encoder's normalised vector for *text* (zeros for empty text)"""
+    if not text:
+        return np.zeros(16)
+    vector = StubEncoder(None).encode([text])[0].astype(np.float64)
+    return vector / np.linalg.norm(vector)
+
+
+def test_field_weighted_ranking_matches_brute_force():
+    artifacts = load_artifacts()
+    fields = artifact_model.SEMANTIC_FIELDS
+    with scratch_model_dir(), \
+            mock.patch.object(ArtifactComparisonModel, 'FIELD_TOP_K', 6):
+        model = ArtifactComparisonModel()
+        model.train(artifacts, n_clusters=3)
+        vectors = {(a['id'], f): stub_unit_vector(model._field_text(a, f))
+                   for a in artifacts for f in fields}
+
+        def expected(query, weights):
+            w = model.resolve_field_weights(weights)
+            scores = {a['id']: sum(w[j] * vectors[(a['id'], f)] @ vectors[(query, f)]
+                                   for j, f in enumerate(fields))
+                      for a in artifacts if a['id'] != query}
+            return sorted(scores.items(), key=lambda item: -item[1])
+
+        for weights in (None, {'symbolism': 1}, {'materials': 3, 'function': 1}):
+            for artifact in artifacts[:6]:
+                ranked = expected(artifact['id'], weights)
+                # The neighbour lists (6 per field here) are guaranteed to
+                # hold the exact top 5 only when a single field is weighted
+                for exact in (True, False) if weights and len(weights) == 1 else (True,):
+                    found = model.find_similar_by_fields(artifact['id'], weights, top_k=5,
+                                                         exact=exact)
+                    assert [r['id'] for r in found] == [aid for aid, _ in ranked[:5]]
+                    for r, (_, score) in zip(found, ranked):
+                        assert abs(r['similarity_score'] - score) < 1e-5
+                        for f in fields:
+                            assert abs(r['field_scores'][f] - vectors[(r['id'], f)]
+                                       @ vectors[(artifact['id'], f)]) < 1e-5
+
+        assert model.find_similar_by_fields('NOPE') == []
+        for bad in ({'colour': 1}, {'notes': -1}, {'notes': 0}):
+            try:
+                model.find_similar_by_fields(artifacts[0]['id'], bad)
+                assert False, bad
+            except ValueError:
+                pass
+
+
+def test_full_width_compact_vectors_are_not_a_first_pass():
+    artifacts = load_artifacts()
+    with scratch_model_dir():
+        model = ArtifactComparisonModel()
+        query = 'carved wooden ritual mask'
+        for storage in ('float16', 'int8'):
+            model.train(artifacts, n_clusters=3, storage=storage)
+            assert not model.compact.first_pass
+            report = model.compact_report()
+            assert not report['first_pass'] and report['memory_saved_pct'] == 0
+            assert report['recall'] == 1.0
+        exact = model.search(query, top_k=5)
+
+        model.train(artifacts, n_clusters=3, storage='int8', pca_dims=8)
+        assert model.compact.first_pass
+        report = model.compact_report()
+        assert report['first_pass'] and report['memory_saved_pct'] > 0
+        # The shortlist covers this small catalog, so the re-ranked result is exact
+        assert [r['id'] for r in model.search(query, top_k=5)] == [r['id'] for r in exact]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
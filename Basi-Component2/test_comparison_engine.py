@@ -0,0 +1,474 @@
+import copy
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import comparison_engine
+from comparison_engine import (ComparisonEngine, FIELD_WEIGHTS, MIN_SIMILARITY_THRESHOLD,
+                               _IndexState, _tokenize)
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'Dataset 2 component 2 - Comparison.xlsx')
+
+
+def load_artifacts():
+    """Same records as app.load_artifacts(), without the image mapping"""
+    df = pd.read_excel(DATASET)
+    artifacts = []
+    for _, row in df.iterrows():
+        artifact_id = str(row['Artifact ID'])
+        artifacts.append({
+            'id': artifact_id,
+            'name': str(row['Name']),
+            'category': str(row['Category / Type']),
+            'origin': str(row['Origin']),
+            'era': str(row['Era / Historical Time Range']),
+            'dimensions': str(row['Dimensions / Typical Size']),
+            'materials': str(row['Materials Used']),
+            'function': str(row['Function / Use (expanded)']),
+            'symbolism': str(row['Symbolism / Cultural Meaning (expanded)']),
+            'location': str(row['Region / Museum / Location']),
+            'notes': str(row['Notes / Special Features (expanded)']),
+            'is_sri_lankan': artifact_id.startswith('A'),
+        })
+    return artifacts
+
+
+class PairwiseReference:
+    """
+    The original one-pair-at-a-time scorer: every pair re-tokenises its
+    fields and takes a dense cosine per field
+    """
+
+    def __init__(self, artifacts):
+        self.artifacts = artifacts
+        self.matrices = {}
+        for field in FIELD_WEIGHTS:
+            texts = [str(a.get(field, '')) for a in artifacts]
+            if sum(1 for t in texts if t.strip()) >= 2:
+                vec = TfidfVectorizer(ngram_range=(1, 2), max_features=500, sublinear_tf=True,
+                                      stop_words='english', min_df=1, max_df=0.85)
+                try:
+                    self.matrices[field] = vec.fit_transform(texts)
+                except ValueError:
+                    pass
+
+    @staticmethod
+    def jaccard(set1, set2):
+        if not set1 or not set2:
+            return 0.0
+        return len(set1 & set2) / len(set1 | set2)
+
+    def field_cosine(self, i, j, field):
+        if field not in self.matrices:
+            return self.jaccard(_tokenize(str(self.artifacts[i].get(field, ''))),
+                                _tokenize(str(self.artifacts[j].get(field, ''))))
+        v1 = self.matrices[field][i].toarray()
+        v2 = self.matrices[field][j].toarray()
+        denom = np.linalg.norm(v1) * np.linalg.norm(v2)
+        if denom == 0:
+            return 0.0
+        return float(np.dot(v1, v2.T).flat[0] / denom)
+
+    def category(self, i, j):
+        a1, a2 = self.artifacts[i], self.artifacts[j]
+        c1 = str(a1.get('category', '')).lower()
+        c2 = str(a2.get('category', '')).lower()
+        toks1 = _tokenize(c1 + ' ' + str(a1.get('name', '')).lower())
+        toks2 = _tokenize(c2 + ' ' + str(a2.get('name', '')).lower())
+        groups = _IndexState._CATEGORY_KEYWORDS
+        grp1 = next((g for g, kws in groups.items() if any(k in toks1 for k in kws)), None)
+        grp2 = next((g for g, kws in groups.items() if any(k in toks2 for k in kws)), None)
+        jac = self.jaccard(_tokenize(c1), _tokenize(c2))
+        if grp1 is not None and grp2 is not None:
+            return min(1.0, 0.65 + 0.35 * jac) if grp1 == grp2 else 0.05
+        return min(1.0, 0.5 * jac + 0.5 * self.field_cosine(i, j, 'category'))
+
+    def field_scores(self, i, j):
+        a1, a2 = self.artifacts[i], self.artifacts[j]
+        scores = {}
+        for field in FIELD_WEIGHTS:
+            if field == 'category':
+                scores[field] = self.category(i, j)
+            elif field == 'materials':
+                scores[field] = self.jaccard(_tokenize(str(a1.get('materials', ''))),
+                                             _tokenize(str(a2.get('materials', ''))))
+            else:
+                scores[field] = self.field_cosine(i, j, field)
+        return scores
+
+    def score(self, i, j, weights=FIELD_WEIGHTS):
+        scores = self.field_scores(i, j)
+        return sum(weights[f] * scores[f] for f in FIELD_WEIGHTS)
+
+    def find_similar(self, artifact_id, num_results=5, weights=FIELD_WEIGHTS, rows=None):
+        idx = next(i for i, a in enumerate(self.artifacts) if a['id'] == artifact_id)
+        rows = range(len(self.artifacts)) if rows is None else rows
+        ranked = [(j, self.score(idx, j, weights)) for j in rows if j != idx]
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        top = [(j, s) for j, s in ranked if s >= MIN_SIMILARITY_THRESHOLD][:num_results]
+        for j, s in ranked:
+            if len(top) >= num_results:
+                break
+            if (j, s) not in top:
+                top.append((j, s))
+        return [(self.artifacts[j]['id'], round(s, 4)) for j, s in top]
+
+
+def ranking(results):
+    return [(r['id'], r['similarity_score']) for r in results]
+
+
+def assert_same_ranking(found, expected):
+    """Same ids and scores; ids may only swap where the scores tie"""
+    assert [s for _, s in found] == [s for _, s in expected], (found, expected)
+    for score in {s for _, s in expected}:
+        assert ({i for i, s in found if s == score}
+                == {i for i, s in expected if s == score}), (found, expected)
+
+
+def test_field_scores_match_pairwise():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    reference = PairwiseReference(artifacts)
+    n = len(artifacts)
+    sims = engine._state._field_similarities(list(range(n)))
+    for i in range(n):
+        for j in range(n):
+            expected = reference.field_scores(i, j)
+            for k, field in enumerate(FIELD_WEIGHTS):
+                assert abs(sims[i, j, k] - expected[field]) < 1e-9, (i, j, field)
+
+
+def test_find_similar_matches_pairwise():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    reference = PairwiseReference(artifacts)
+    for artifact in artifacts:
+        assert_same_ranking(ranking(engine.find_similar(artifact['id'], 6)),
+                            reference.find_similar(artifact['id'], 6))
+
+
+def test_reweighted_search_matches_pairwise():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    reference = PairwiseReference(artifacts)
+
+    overrides = {'materials': 0.6, 'notes': 0}
+    weights = dict(zip(FIELD_WEIGHTS, engine.resolve_weights(overrides)))
+    for artifact in artifacts[:10]:
+        assert_same_ranking(ranking(engine.find_similar(artifact['id'], 6, weights=overrides)),
+                            reference.find_similar(artifact['id'], 6, weights))
+        # Served from the cached per-field vector this time
+        assert_same_ranking(ranking(engine.find_similar(artifact['id'], 6)),
+                            reference.find_similar(artifact['id'], 6))
+
+    for bad in ({'colour': 1}, {'materials': -1}, dict.fromkeys(FIELD_WEIGHTS, 0)):
+        try:
+            engine.find_similar(artifacts[0]['id'], 6, weights=bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_field_similarity_cache_stays_under_budget():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    expected = {a['id']: ranking(engine.find_similar(a['id'], 6)) for a in artifacts[:8]}
+    row_bytes = len(artifacts) * len(FIELD_WEIGHTS) * 4
+
+    state = ComparisonEngine(artifacts)._state
+    with mock.patch.object(comparison_engine, 'FIELD_SIMILARITY_CACHE_BYTES', 3 * row_bytes):
+        for artifact in artifacts[:8] + artifacts[:2]:
+            weight_vec = state._field_weights
+            assert (ranking(state.find_similar(artifact['id'], 6, weight_vec))
+                    == expected[artifact['id']])
+            assert state._sim_cache_bytes <= 3 * row_bytes
+    assert len(state._sim_cache) == 3
+    assert state._sim_cache_bytes == sum(v.nbytes for v in state._sim_cache.values())
+    assert all(v.dtype == np.float32 for v in state._sim_cache.values())
+    # Least recently used first: the last three queries, oldest first
+    assert list(state._sim_cache) == [7, 0, 1]
+
+    # A budget below one entry still keeps the newest
+    with mock.patch.object(comparison_engine, 'FIELD_SIMILARITY_CACHE_BYTES', 1):
+        state.find_similar(artifacts[5]['id'], 6, state._field_weights)
+    assert list(state._sim_cache) == [5]
+
+
+def test_batch_matches_single_queries_in_bounded_chunks():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    ids = [a['id'] for a in artifacts] + ['NOPE']
+    filters = {'is_sri_lankan': False}
+    n_targets = sum(1 for a in artifacts if not a['is_sri_lankan'])
+
+    chunks = []
+    score_vectors = _IndexState._score_vectors
+
+    def recording(state, query_idxs, *args, **kwargs):
+        chunks.append(len(query_idxs))
+        return score_vectors(state, query_idxs, *args, **kwargs)
+
+    with mock.patch.object(comparison_engine, 'BATCH_SCORE_CELLS', 5 * n_targets), \
+            mock.patch.object(_IndexState, '_score_vectors', recording):
+        batch = engine.find_similar_batch(ids, 6, filters=filters)
+    assert chunks and max(chunks) == 5 and sum(chunks) == len(artifacts)
+    assert batch['NOPE'] == []
+    for artifact in artifacts:
+        assert (ranking(batch[artifact['id']])
+                == ranking(engine.find_similar(artifact['id'], 6, filters=filters)))
+
+    # Unfiltered chunks are sized against the whole catalog
+    chunks.clear()
+    with mock.patch.object(comparison_engine, 'BATCH_SCORE_CELLS', 4 * len(artifacts) + 1), \
+            mock.patch.object(_IndexState, '_score_vectors', recording):
+        batch = engine.find_similar_batch(ids, 6)
+    assert max(chunks) == 4
+    for artifact in artifacts:
+        assert ranking(batch[artifact['id']]) == ranking(engine.find_similar(artifact['id'], 6))
+
+
+def test_filtered_search_matches_pairwise():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    reference = PairwiseReference(artifacts)
+
+    def brute_force(origin=None, material=None, sri_lankan=None):
+        return [i for i, a in enumerate(artifacts)
+                if (origin is None or origin in comparison_engine._origin_regions(a['origin']))
+                and (material is None or material in _tokenize(a['materials']))
+                and (sri_lankan is None or a['is_sri_lankan'] == sri_lankan)]
+
+    state = engine._state
+    assert list(state._filter_rows({'is_sri_lankan': False})) == brute_force(sri_lankan=False)
+    assert (list(state._filter_rows({'origin': 'japan', 'is_sri_lankan': 'false'}))
+            == brute_force(origin='japan', sri_lankan=False))
+    assert (list(state._filter_rows({'materials': ['bronze', 'brass']}))
+            == sorted(set(brute_force(material='bronze')) | set(brute_force(material='brass'))))
+    assert len(state._filter_rows({'origin': 'atlantis'})) == 0
+
+    rows = brute_force(sri_lankan=False)
+    for artifact in artifacts[:10]:
+        assert_same_ranking(
+            ranking(engine.find_similar(artifact['id'], 6, filters={'is_sri_lankan': False})),
+            reference.find_similar(artifact['id'], 6, rows=rows))
+    try:
+        engine.find_similar(artifacts[0]['id'], 6, filters={'era': 'modern'})
+        assert False
+    except ValueError:
+        pass
+
+
+def test_hybrid_ranking_matches_pairwise():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    reference = PairwiseReference(artifacts)
+    rng = np.random.default_rng(3)
+    weights = {'materials': 0.6}
+    weight_map = dict(zip(FIELD_WEIGHTS, engine.resolve_weights(weights)))
+
+    for idx in range(0, len(artifacts), 5):
+        query = artifacts[idx]['id']
+        rows = rng.choice(len(artifacts), size=12, replace=False)
+        # Embedding cosines may fall outside [0, 1]; the query itself and
+        # unknown ids can come back from the service too
+        candidates = {artifacts[j]['id']: float(rng.uniform(-0.2, 1.1)) for j in rows}
+        candidates[query] = 1.0
+        candidates['NOPE'] = 0.9
+        for semantic_weight in (0.0, 0.5, 1.0):
+            fused = []
+            for j in rows.tolist():
+                if j == idx:
+                    continue
+                semantic = min(max(candidates[artifacts[j]['id']], 0.0), 1.0)
+                score = (semantic_weight * semantic
+                         + (1 - semantic_weight) * reference.score(idx, j, weight_map))
+                fused.append((artifacts[j]['id'], round(score, 4)))
+            fused.sort(key=lambda item: -item[1])
+            found = engine.find_similar_hybrid(query, candidates, 5, weights=weights,
+                                               semantic_weight=semantic_weight)
+            assert_same_ranking(ranking(found), fused[:5])
+            for r in found:
+                semantic = min(max(candidates[r['id']], 0.0), 1.0)
+                assert abs(r['semantic_score'] - semantic) < 1e-4
+                assert abs(r['similarity_score'] - (semantic_weight * r['semantic_score']
+                           + (1 - semantic_weight) * r['lexical_score'])) < 1e-3
+
+    assert engine.find_similar_hybrid('NOPE', candidates) == []
+    assert engine.find_similar_hybrid(artifacts[0]['id'], {'NOPE': 1.0}) == []
+    try:
+        engine.find_similar_hybrid(artifacts[0]['id'], candidates, semantic_weight=1.5)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_snapshot_round_trip():
+    artifacts = load_artifacts()
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        built = ComparisonEngine(artifacts, snapshot_dir=snapshot_dir)
+        assert not built.loaded_from_snapshot
+        loaded = ComparisonEngine(artifacts, snapshot_dir=snapshot_dir)
+        assert loaded.loaded_from_snapshot
+        for artifact in artifacts:
+            assert (ranking(loaded.find_similar(artifact['id'], 6))
+                    == ranking(built.find_similar(artifact['id'], 6)))
+        assert not [name for name in os.listdir(snapshot_dir) if name.startswith('.tmp_')]
+
+        # Edits after a snapshot load splice the memory-mapped arrays
+        loaded.update_artifact(artifacts[0]['id'], {'materials': 'Bronze, gold leaf'})
+        built.update_artifact(artifacts[0]['id'], {'materials': 'Bronze, gold leaf'})
+        assert (ranking(loaded.find_similar(artifacts[0]['id'], 6))
+                == ranking(built.find_similar(artifacts[0]['id'], 6)))
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def test_failed_snapshot_save_leaves_no_temp_dir():
+    artifacts = load_artifacts()
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        with mock.patch.object(comparison_engine.os, 'replace', side_effect=OSError('disk full')):
+            engine = ComparisonEngine(artifacts, snapshot_dir=snapshot_dir)
+        assert engine.find_similar(artifacts[0]['id'], 3)
+        assert os.listdir(snapshot_dir) == []
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def rebuilt(state):
+    """The spliced state's features run through the full matrix/facet build"""
+    fresh = copy.copy(state)
+    fresh._build_score_matrix()
+    return fresh
+
+
+def assert_same_index(state, expected):
+    assert state._n_indexed == expected._n_indexed
+    assert (state._score_matrix != expected._score_matrix).nnz == 0
+    assert np.array_equal(state._column_block, expected._column_block)
+    assert np.array_equal(state._category_groups, expected._category_groups)
+    for field, counts in expected._token_counts.items():
+        assert np.array_equal(state._token_counts[field], counts)
+    assert state._facets == expected._facets
+    assert state._index == {a['id']: i for i, a in enumerate(state.artifacts)}
+    assert state.artifact_dict == {a['id']: a for a in state.artifacts}
+
+
+def test_incremental_edits_match_rebuild():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    edits = []
+    engine.on_edit = edits.append
+
+    first = engine._state
+    first_matrix = first._score_matrix.copy()
+    first_facets = copy.deepcopy(first._facets)
+    before = ranking(engine.find_similar(artifacts[1]['id'], 6))
+
+    engine.add_artifact({
+        'id': 'T001', 'name': 'Obsidian Ceremonial Dagger', 'category': 'Weapon / Dagger',
+        'origin': 'Central Mexico', 'era': '1400 CE', 'materials': 'Obsidian, wood, zircon',
+        'function': 'Sacrificial rites', 'symbolism': 'Sun worship', 'notes': 'Chipped blade',
+        'is_sri_lankan': False,
+    })
+    assert_same_index(engine._state, rebuilt(engine._state))
+    assert engine.find_similar('T001', 3)
+
+    engine.update_artifact(artifacts[3]['id'], {'materials': 'Quartzite, copper wire',
+                                                'category': 'Lantern'})
+    assert_same_index(engine._state, rebuilt(engine._state))
+
+    engine.remove_artifact(artifacts[2]['id'])
+    assert_same_index(engine._state, rebuilt(engine._state))
+    assert artifacts[2]['id'] not in engine.artifact_dict
+    assert all(r['id'] != artifacts[2]['id']
+               for r in engine.find_similar(artifacts[1]['id'], len(artifacts)))
+
+    # Copy-on-write: the caller's list and the first state are untouched
+    assert len(artifacts) == first._n_indexed
+    assert first.artifacts is artifacts
+    assert ranking(first.find_similar(artifacts[1]['id'], 6, engine.resolve_weights())) == before
+    assert (first._score_matrix != first_matrix).nnz == 0
+    assert first._facets == first_facets
+
+    assert len(edits) == 3
+    assert edits[-1] is engine.artifacts
+
+
+
+
+NEW_ARTIFACTS = [
+    {'id': f'T{i:03d}', 'name': f'Bronze Temple Bell {i}', 'category': 'Musical Instrument',
+     'origin': 'Nepal', 'era': '18th century', 'materials': 'Bronze, iron clapper',
+     'function': 'Rung at temple ceremonies', 'symbolism': 'Awakening',
+     'notes': f'Cast bell number {i}', 'is_sri_lankan': False}
+    for i in range(1, 13)
+]
+
+
+def test_refit_swaps_in_a_fresh_index():
+    artifacts = load_artifacts()
+    snapshot_dir = tempfile.mkdtemp()
+    try:
+        engine = ComparisonEngine(artifacts, snapshot_dir=snapshot_dir)
+        snapshots = sorted(os.listdir(snapshot_dir))
+        for artifact in NEW_ARTIFACTS:
+            engine.add_artifact(artifact)
+            if engine._refit_thread is not None:
+                break
+        assert engine._refit_thread is not None, "drift never triggered a refit"
+        engine._refit_thread.join(timeout=60)
+        assert not engine._refit_thread.is_alive()
+        assert engine.vocabulary_drift() == 0
+
+        # The swapped-in index is a plain full fit of the edited catalog
+        fresh = ComparisonEngine(engine.artifacts)
+        for artifact in engine.artifacts:
+            assert (ranking(engine.find_similar(artifact['id'], 6))
+                    == ranking(fresh.find_similar(artifact['id'], 6)))
+        # ...and the on-disk dataset's snapshot survives it
+        assert sorted(os.listdir(snapshot_dir)) == snapshots
+        assert ComparisonEngine(artifacts, snapshot_dir=snapshot_dir).loaded_from_snapshot
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+def test_refit_restarts_after_a_concurrent_edit():
+    artifacts = load_artifacts()
+    engine = ComparisonEngine(artifacts)
+    engine.add_artifact(NEW_ARTIFACTS[0])
+    build = comparison_engine._IndexState
+    calls = []
+
+    def edit_while_fitting(catalog, *args, **kwargs):
+        calls.append(len(catalog))
+        if len(calls) == 1:
+            engine.add_artifact(NEW_ARTIFACTS[1])
+        return build(catalog, *args, **kwargs)
+
+    with mock.patch.object(comparison_engine, 'REFIT_DRIFT_THRESHOLD', 10), \
+            mock.patch.object(comparison_engine, '_IndexState', side_effect=edit_while_fitting):
+        engine._refit()
+    assert calls == [len(artifacts) + 1, len(artifacts) + 2]
+    assert [a['id'] for a in engine.artifacts[-2:]] == ['T001', 'T002']
+    assert engine._state._n_indexed == len(artifacts) + 2
+    assert engine.find_similar('T002', 1)[0]['id'] == 'T001'
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,92 @@
+import os
+import sys
+from datetime import datetime
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from era_index import EraIntervalIndex, NAMED_PERIODS, SINGLE_YEAR_TOLERANCE, intervals_overlap, parse_era
+from test_comparison_engine import load_artifacts
+
+NOW = datetime.now().year
+
+# Every era string in the dataset with the interval it should read as
+DATASET_ERAS = {
+    '17th–18th century': (1600, 1799),
+    'Kamakura–Edo period': (1185, 1868),
+    '15th century – present': (1400, NOW),
+    'Ancient – present': (-3000, NOW),
+    '18th–19th century': (1700, 1899),
+    '1000 BCE – present': (-1000, NOW),
+    '1500–500 BCE': (-1500, -500),
+    '17th century – present': (1600, NOW),
+    '16th century – present': (1500, NOW),
+    '18th century – present': (1700, NOW),
+    '1500s – present': (1500, NOW),
+    'Prehistoric – present': (-10000, NOW),
+    '2000 BCE – present': (-2000, NOW),
+    '1st century BCE – 12th century CE': (-100, 1199),
+    '600–1200 CE': (600, 1200),
+    '4th century BCE – Roman era': (-400, 476),
+    'Heian period – present': (794, NOW),
+    '17th–19th century': (1600, 1899),
+    '16th–18th century': (1500, 1799),
+    '12th–18th century': (1100, 1799),
+    '14th c.–present': (1300, NOW),
+    'Qing period – present': (1644, NOW),
+}
+
+
+def test_parse_dataset_eras():
+    eras = {a['era'] for a in load_artifacts()}
+    assert eras == set(DATASET_ERAS)
+    for era, expected in DATASET_ERAS.items():
+        assert parse_era(era) == expected, era
+
+
+def test_parse_era_forms():
+    assert parse_era('c. 1750') == (1750 - SINGLE_YEAR_TOLERANCE, 1750 + SINGLE_YEAR_TOLERANCE)
+    assert parse_era('5th century BC') == (-500, -401)
+    assert parse_era('1990s') == (1990, 1999)
+    assert parse_era('300s BCE') == (-399, -300)
+    assert parse_era('1200 to 1400') == (1200, 1400)
+    assert parse_era('Edo period') == NAMED_PERIODS['edo']
+    assert parse_era('Medieval-present') == (500, NOW)
+    for unknown in ('', 'nan', None, 'Unknown', '–'):
+        assert parse_era(unknown) is None, unknown
+
+
+def test_overlap_reads_centuries_and_bce():
+    overlap = EraIntervalIndex([]).eras_overlap
+    # Centuries are spans of years, not the numbers 17 and 18
+    assert overlap('17th–18th century', '1000 BCE – present')
+    assert not overlap('16th–18th century', '1500–500 BCE')
+    assert overlap('1st century BCE – 12th century CE', '600–1200 CE')
+    assert not overlap('4th century BCE – Roman era', 'Heian period – present')
+    assert not overlap('Kamakura–Edo period', '1500–500 BCE')
+    assert overlap('Qing period – present', '17th–18th century')
+    assert not overlap('Unknown', 'Ancient – present')
+    assert not intervals_overlap(None, (0, 1))
+    assert intervals_overlap((0, 10), (10, 20)) and not intervals_overlap((0, 9), (10, 20))
+
+
+def test_overlapping_matches_brute_force():
+    artifacts = load_artifacts() + [{'id': 'U1', 'era': 'Unknown'}]
+    index = EraIntervalIndex(artifacts)
+    assert 'U1' not in index.intervals
+    queries = [(None, None), (None, -2000), (-500, 0), (476, 476), (1185, 1333),
+               (1800, None), (NOW + 1, None), (1300, 1200)]
+    for start, end in queries:
+        lo = -10 ** 9 if start is None else start
+        hi = 10 ** 9 if end is None else end
+        expected = sorted((a for a in artifacts if a['id'] in index.intervals
+                           and intervals_overlap(index.intervals[a['id']], (lo, hi))),
+                          key=lambda a: (index.intervals[a['id']], artifacts.index(a)))
+        assert index.overlapping(start, end) == expected, (start, end)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
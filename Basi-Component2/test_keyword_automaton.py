@@ -0,0 +1,106 @@
+import os
+import sys
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_automaton import KeywordMatcher
+from artifact_model import (ArtifactComparisonModel, ASIAN_COUNTRIES, CATEGORY_GROUPS,
+                            COMMON_MATERIALS, FUNCTION_GROUPS, SYMBOLIC_THEMES,
+                            UNIQUE_MATERIALS, _CATEGORY_MATCHER, _FUNCTION_MATCHER,
+                            _MATERIAL_MATCHER, _ORIGIN_MATCHER, _THEME_MATCHER)
+from test_comparison_engine import load_artifacts
+
+# Overlapping and nested keywords, where a naive automaton drops matches
+TRICKY_TEXTS = [
+    '', 'Gold', 'GOLDEN BRONZE', 'silversmith', 'warrior', 'war', 'sword-war',
+    'Sri Lankan', 'sri  lanka', 'Indian ink', 'Indonesia', 'spiritualholy', 'ironstone',
+    'stone clay ceramic', 'potpourri bowl', 'courtyard', 'kingdom queen', 'wardrobe',
+    'she', 'hers', 'ushers', 'abcd bcd cd d', 'aaaa',
+]
+
+
+def baseline_rules(a1, a2):
+    """The original keyword rules: one substring scan per keyword and pair"""
+    cat1, cat2 = a1['category'].lower(), a2['category'].lower()
+    origin1, origin2 = a1['origin'].lower(), a2['origin'].lower()
+    mat1, mat2 = a1['materials'].lower(), a2['materials'].lower()
+    func1, func2 = a1['function'].lower(), a2['function'].lower()
+    sym1, sym2 = a1['symbolism'].lower(), a2['symbolism'].lower()
+
+    common = [m for m in COMMON_MATERIALS if m in mat1 and m in mat2]
+    unique = []
+    for m in UNIQUE_MATERIALS:
+        if m not in common:
+            if m in mat1:
+                unique.append(f"{m} (first artifact)")
+            elif m in mat2:
+                unique.append(f"{m} (second artifact)")
+    function = None
+    for terms, message in FUNCTION_GROUPS:
+        if any(t in func1 for t in terms) and any(t in func2 for t in terms):
+            function = message
+            break
+    return {
+        'categories': any(any(t in cat1 for t in group) and any(t in cat2 for t in group)
+                          for group in CATEGORY_GROUPS),
+        'origins': (any(c in origin1 for c in ASIAN_COUNTRIES)
+                    and any(c in origin2 for c in ASIAN_COUNTRIES)),
+        'common_materials': common,
+        'unique_materials': unique,
+        'function': function,
+        'themes': [theme for theme, words in SYMBOLIC_THEMES.items()
+                   if any(k in sym1 for k in words) and any(k in sym2 for k in words)],
+    }
+
+
+def mask_rules(a1, a2):
+    model = ArtifactComparisonModel
+    mat1, mat2 = _MATERIAL_MATCHER.mask(a1['materials']), _MATERIAL_MATCHER.mask(a2['materials'])
+    return {
+        'categories': model._category_masks_related(_CATEGORY_MATCHER.mask(a1['category']),
+                                                    _CATEGORY_MATCHER.mask(a2['category'])),
+        'origins': (bool(_ORIGIN_MATCHER.mask(a1['origin']))
+                    and bool(_ORIGIN_MATCHER.mask(a2['origin']))),
+        'common_materials': model._common_material_names(mat1, mat2),
+        'unique_materials': model._unique_material_names(mat1, mat2),
+        'function': model._function_mask_similarity(_FUNCTION_MATCHER.mask(a1['function']),
+                                                    _FUNCTION_MATCHER.mask(a2['function'])),
+        'themes': model._common_theme_names(_THEME_MATCHER.mask(a1['symbolism']),
+                                            _THEME_MATCHER.mask(a2['symbolism'])),
+    }
+
+
+def test_mask_matches_substring_scan():
+    matchers = [_CATEGORY_MATCHER, _ORIGIN_MATCHER, _MATERIAL_MATCHER,
+                _FUNCTION_MATCHER, _THEME_MATCHER,
+                KeywordMatcher(['he', 'she', 'his', 'hers', 'us']),
+                KeywordMatcher(['abcd', 'bcd', 'cd', 'd', 'a', 'aa', 'aaa'])]
+    texts = list(TRICKY_TEXTS)
+    for artifact in load_artifacts():
+        texts.extend(str(v) for k, v in artifact.items() if k != 'is_sri_lankan')
+    for matcher in matchers:
+        for text in texts:
+            expected = [k for k in matcher.keywords if k in text.lower()]
+            assert matcher.names(matcher.mask(text)) == expected, (matcher.keywords, text)
+
+
+def test_duplicate_keywords_share_a_bit():
+    matcher = KeywordMatcher(['Gold', 'silver', 'gold'])
+    assert matcher.keywords == ['gold', 'silver']
+    assert matcher.bits(['GOLD']) == 1
+    assert matcher.names(matcher.mask('white gold')) == ['gold']
+
+
+def test_mask_rules_match_baseline_rules():
+    artifacts = load_artifacts()
+    for a1 in artifacts:
+        for a2 in artifacts:
+            assert mask_rules(a1, a2) == baseline_rules(a1, a2), (a1['id'], a2['id'])
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,292 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+# Add this directory to path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import ai_explainer_v2
+import service_protocol
+from ai_explainer_v2 import ModelServiceAPI, ModelServiceClient, ModelServicePool, ModelServiceSupervisor
+
+# Stands in for model_service.py: answers each request on its own thread
+# after the request's "delay", so responses come back out of order
+FAKE_SERVICE = '''
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, {base_dir!r})
+from service_protocol import read_frame, write_frame
+
+channel = sys.stdout.buffer
+lock = threading.Lock()
+
+
+def reply(message):
+    with lock:
+        write_frame(channel, message)
+
+
+def answer(request):
+    time.sleep(request.get("delay", 0))
+    if request.get("action") == "fail":
+        reply({{"id": request["id"], "error": "boom"}})
+    elif request.get("action") == "ping":
+        reply({{"id": request["id"], "result": {{"status": "ok"}}}})
+    else:
+        reply({{"id": request["id"], "result": {{"echo": request.get("value")}}}})
+
+
+startup = os.environ.get("FAKE_SERVICE_STARTUP", "ready")
+if startup == "hang":
+    time.sleep(60)
+elif startup == "error":
+    reply({{"error": "Model not trained"}})
+    sys.exit(1)
+reply({{"status": "ready", "artifacts": 3}})
+while True:
+    request = read_frame(sys.stdin.buffer)
+    if request is None:
+        break
+    if request.get("action") == "exit":
+        os._exit(1)
+    if request.get("action") == "busy":
+        # Holds up every request behind it, as model_service.py does
+        time.sleep(request.get("delay", 0))
+        reply({{"id": request["id"], "result": "done"}})
+        continue
+    if request.get("action") == "hang":
+        time.sleep(60)
+    if request.get("action") == "stray":
+        reply({{"id": -1, "result": "nobody asked"}})
+    threading.Thread(target=answer, args=(request,), daemon=True).start()
+'''
+
+
+@contextmanager
+def fake_service():
+    """Make ModelServiceClient start FAKE_SERVICE instead of model_service.py"""
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, 'model_service.py'), 'w') as f:
+        f.write(FAKE_SERVICE.format(base_dir=BASE_DIR))
+    try:
+        # The client starts model_service.py from the directory of its module
+        with mock.patch.object(ai_explainer_v2, '__file__',
+                               os.path.join(directory, 'ai_explainer_v2.py')):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_concurrent_requests_get_their_own_responses():
+    with fake_service():
+        client = ModelServiceClient()
+        try:
+            assert client.is_ready and client.artifact_count == 3
+            rng = random.Random(0)
+            delays = [rng.uniform(0, 0.2) for _ in range(40)]
+
+            def request(i):
+                return client._send_request({'action': 'echo', 'value': i, 'delay': delays[i]})
+
+            with ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(request, range(len(delays))))
+            assert results == [{'echo': i} for i in range(len(delays))]
+            assert client.outstanding == 0
+
+            # Pipelined from one thread: the slow first request does not hold up the rest
+            futures = [client.submit({'action': 'echo', 'value': i, 'delay': 0.3 if i == 0 else 0})
+                       for i in range(5)]
+            assert [f.result(timeout=5) for f in futures[1:]] == [{'echo': i} for i in range(1, 5)]
+            assert not futures[0].done()
+            assert futures[0].result(timeout=5) == {'echo': 0}
+
+            assert client._send_request({'action': 'fail'}) == {'error': 'boom'}
+            # Responses nobody is waiting for are dropped
+            assert client._send_request({'action': 'stray', 'value': 'x'}) == {'echo': 'x'}
+        finally:
+            client._cleanup()
+
+
+def test_timed_out_request_is_forgotten():
+    with fake_service():
+        client = ModelServiceClient()
+        try:
+            assert client._send_request({'action': 'echo', 'value': 1, 'delay': 0.5},
+                                        timeout=0.1) is None
+            assert client.outstanding == 0
+            time.sleep(0.6)  # the late answer arrives and is ignored
+            assert client._send_request({'action': 'echo', 'value': 2}) == {'echo': 2}
+        finally:
+            client._cleanup()
+
+
+def test_service_exit_fails_pending_requests():
+    with fake_service():
+        client = ModelServiceClient()
+        exited = threading.Event()
+        client.on_exit = exited.set
+        try:
+            pending = client.submit({'action': 'echo', 'value': 1, 'delay': 5})
+            client.submit({'action': 'exit'})
+            assert pending.result(timeout=5) is None
+            assert exited.wait(5) and not client.is_ready
+            assert client.submit({'action': 'echo'}) is None
+            assert client._send_request({'action': 'echo'}) is None
+        finally:
+            client._cleanup()
+
+
+def test_startup_deadline_holds_without_select():
+    # As on Windows, where the pipe cannot be polled: the ready frame is
+    # still awaited with a deadline rather than a blocking read
+    with fake_service(), \
+            mock.patch.object(service_protocol, '_CAN_SELECT', False), \
+            mock.patch.object(ModelServiceClient, 'STARTUP_TIMEOUT', 0.5):
+        for startup in ('hang', 'error'):
+            with mock.patch.dict(os.environ, {'FAKE_SERVICE_STARTUP': startup}):
+                start = time.monotonic()
+                client = ModelServiceClient()
+                assert time.monotonic() - start < 5, startup
+                assert not client.is_ready and client.process is None
+                assert client._send_request({'action': 'echo'}) is None
+                client._reader.join(5)
+                assert not client._reader.is_alive()
+
+        client = ModelServiceClient()
+        try:
+            assert client.is_ready
+            assert client._send_request({'action': 'echo', 'value': 1}) == {'echo': 1}
+        finally:
+            client._cleanup()
+
+
+def test_service_api_needs_submit_and_forget():
+    for api in (ModelServiceAPI, type('NoForget', (ModelServiceAPI,), {'submit': lambda self, r: None})):
+        try:
+            api()
+            assert False, api
+        except TypeError:
+            pass
+
+
+def test_pool_sends_to_the_least_busy_worker():
+    with fake_service():
+        pool = ModelServicePool(2)
+        try:
+            assert pool.is_ready and len(pool.ready_workers) == 2
+            first, second = pool.workers
+            slow = pool.submit({'action': 'echo', 'value': 0, 'delay': 0.5})
+            busy = first if first.outstanding else second
+            idle = second if busy is first else first
+            assert busy.outstanding == 1 and idle.outstanding == 0
+            quick = pool.submit({'action': 'echo', 'value': 1, 'delay': 0.2})
+            assert busy.outstanding == 1 and idle.outstanding == 1
+            assert quick.result(timeout=5) == {'echo': 1}
+            assert slow.result(timeout=5) == {'echo': 0} and pool.outstanding == 0
+
+            busy._cleanup()
+            assert pool.ready_workers == [idle]
+            assert pool._send_request({'action': 'echo', 'value': 2}) == {'echo': 2}
+        finally:
+            pool._cleanup()
+
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@contextmanager
+def supervised(workers=1, standby=False):
+    """A supervised pool of fake services with short health-check timings"""
+    with fake_service(), \
+            mock.patch.multiple(ModelServiceSupervisor, HEALTH_INTERVAL=0.2, PING_TIMEOUT=0.2,
+                                STALL_TIMEOUT=1.5, RESTART_BACKOFF_INITIAL=0.2,
+                                RESTART_BACKOFF_MAX=0.8):
+        pool = ModelServicePool(workers)
+        supervisor = ModelServiceSupervisor(pool, standby=standby)
+        try:
+            yield pool, supervisor
+        finally:
+            supervisor.stop()
+
+
+def test_busy_worker_is_not_restarted():
+    with supervised() as (pool, supervisor):
+        worker = pool.workers[0]
+        # Pings queue behind this request and time out several times over
+        assert pool._send_request({'action': 'busy', 'delay': 1.2}, timeout=5) == 'done'
+        time.sleep(0.5)
+        assert supervisor.restarts == 0 and pool.workers == [worker] and worker.is_ready
+
+
+def test_hung_and_exited_workers_are_restarted():
+    with supervised() as (pool, supervisor):
+        hung = pool.workers[0]
+        hung.submit({'action': 'hang'})
+        assert wait_for(lambda: supervisor.restarts == 1)
+        assert pool.workers[0] is not hung and hung.process is None
+        assert pool._send_request({'action': 'echo', 'value': 1}) == {'echo': 1}
+
+        pool.workers[0].submit({'action': 'exit'})
+        assert wait_for(lambda: supervisor.restarts == 2)
+        assert pool._send_request({'action': 'echo', 'value': 2}) == {'echo': 2}
+        assert supervisor.status()['ready_workers'] == 1
+
+
+def test_failed_restarts_back_off():
+    with supervised() as (pool, supervisor):
+        attempts = []
+        real_client = ModelServiceClient
+
+        def failing_client(threads=None):
+            attempts.append(time.monotonic())
+            with mock.patch.dict(os.environ, {'FAKE_SERVICE_STARTUP': 'error'}):
+                return real_client(threads)
+
+        with mock.patch.object(ai_explainer_v2, 'ModelServiceClient', failing_client):
+            pool.workers[0].submit({'action': 'exit'})
+            assert wait_for(lambda: supervisor.failed_restarts >= 4)
+            assert not pool.is_ready
+            assert supervisor._backoff == ModelServiceSupervisor.RESTART_BACKOFF_MAX
+            gaps = [b - a for a, b in zip(attempts, attempts[1:4])]
+            # Waits of 0.2, 0.4, 0.8 s (each attempt also spends time starting)
+            assert all(gap >= wait * 0.9 for gap, wait in zip(gaps, (0.2, 0.4, 0.8))), gaps
+
+        assert wait_for(lambda: supervisor.restarts == 1)
+        assert pool.is_ready
+        assert supervisor._backoff == ModelServiceSupervisor.RESTART_BACKOFF_INITIAL
+
+
+def test_standby_is_swapped_in():
+    with supervised(standby=True) as (pool, supervisor):
+        assert wait_for(lambda: supervisor.status()['standby'] == 'ready')
+        standby = supervisor.standby
+        pool.workers[0].submit({'action': 'exit'})
+        assert wait_for(lambda: supervisor.restarts == 1)
+        assert pool.workers == [standby]
+        assert wait_for(lambda: supervisor.status()['standby'] == 'ready')
+        assert supervisor.standby is not standby
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,116 @@
+import math
+import os
+import re
+import sys
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from search_index import ArtifactSearchIndex, BM25_B, BM25_K1, MAX_SUGGESTIONS, SEARCH_FIELDS, _terms
+from test_comparison_engine import load_artifacts
+
+
+def bm25_reference(artifacts, query):
+    """Textbook BM25 over the weighted field term counts, one document at a time"""
+    docs = []
+    for artifact in artifacts:
+        tf = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = artifact.get(field, '')
+            if value and value != 'nan':
+                for term in _terms(value):
+                    tf[term] = tf.get(term, 0.0) + weight
+        docs.append(tf)
+    lengths = [sum(tf.values()) for tf in docs]
+    avg_len = sum(lengths) / len(docs)
+    scores = {}
+    for i, tf in enumerate(docs):
+        score, matched = 0.0, False
+        for term in set(_terms(query)):
+            if term not in tf:
+                continue
+            df = sum(1 for d in docs if term in d)
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / avg_len)
+            score += idf * tf[term] * (BM25_K1 + 1) / (tf[term] + norm)
+            matched = True
+        if matched:
+            scores[artifacts[i]['id']] = score
+    return scores
+
+
+def test_search_matches_reference_bm25():
+    artifacts = load_artifacts()
+    index = ArtifactSearchIndex(artifacts)
+    order = {a['id']: i for i, a in enumerate(artifacts)}
+    for query in ('ritual masks', 'bronze', 'carved temple stone', 'granite mortar'):
+        expected = bm25_reference(artifacts, query)
+        found = index.search(query, per_page=len(artifacts))
+        assert found['total'] == len(expected) > 0, query
+        assert ([r['id'] for r in found['results']]
+                == sorted(expected, key=lambda k: (-round(expected[k], 4), order[k])))
+        for result in found['results']:
+            assert abs(result['search_score'] - expected[result['id']]) < 1e-4
+
+    assert index.search('zzzz')['total'] == 0
+    assert index.search('')['results'] == []
+
+
+def test_name_matches_outrank_notes():
+    artifacts = [
+        {'id': 'X1', 'name': 'Plain Bowl', 'notes': 'Decorated with a lotus'},
+        {'id': 'X2', 'name': 'Lotus Bowl', 'notes': 'Plain'},
+        {'id': 'X3', 'name': 'Spoon', 'notes': 'Plain'},
+    ]
+    found = ArtifactSearchIndex(artifacts).search('lotus')
+    assert [r['id'] for r in found['results']] == ['X2', 'X1']
+
+
+def test_search_pagination():
+    artifacts = load_artifacts()
+    index = ArtifactSearchIndex(artifacts)
+    everything = index.search('temple wood', per_page=len(artifacts))
+    total = everything['total']
+    assert total > 3
+    pages = [index.search('temple wood', page=p, per_page=3) for p in range(1, math.ceil(total / 3) + 2)]
+    assert all(p['pages'] == math.ceil(total / 3) and p['total'] == total for p in pages)
+    assert pages[-1]['results'] == []
+    assert ([r['id'] for p in pages for r in p['results']]
+            == [r['id'] for r in everything['results']])
+    # Out-of-range paging is clamped rather than rejected
+    assert index.search('temple wood', page=0, per_page=0)['page'] == 1
+    assert index.search('temple wood', page=0, per_page=0)['per_page'] == 1
+
+
+def test_autocomplete():
+    artifacts = [
+        {'id': 'J1', 'name': 'Japanese Katana'},
+        {'id': 'J2', 'name': 'Japanese Noh Mask'},
+        {'id': 'K1', 'name': 'Kandyan Drum'},
+    ]
+    index = ArtifactSearchIndex(artifacts)
+    ids = lambda prefix, limit=10: [s['id'] for s in index.autocomplete(prefix, limit)]
+    assert ids('jap') == ['J1', 'J2']
+    assert ids('JAPANESE  KA') == ['J1']
+    assert ids('ka') == ['J1', 'K1']
+    assert ids('noh m') == ['J2']
+    assert ids('ka', limit=1) == ['J1']
+    assert ids('x') == [] and ids('  ') == []
+    assert index.autocomplete('kan') == [{'id': 'K1', 'name': 'Kandyan Drum'}]
+
+    dataset = load_artifacts()
+    index = ArtifactSearchIndex(dataset)
+    for prefix in ('k', 'sri', 'brass', 'pahana'):
+        expected = sorted((a for a in dataset
+                           if any(a['name'].lower()[m.start():].startswith(prefix)
+                                  for m in re.finditer(r'\b\w', a['name'].lower()))),
+                          key=lambda a: a['name'].lower())
+        assert expected
+        assert ids(prefix, 100) == [a['id'] for a in expected][:MAX_SUGGESTIONS]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
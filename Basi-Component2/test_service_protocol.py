@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+
+# Add this directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import service_protocol
+from service_protocol import (FrameReader, ProtocolError, MAX_FRAME_SIZE, decode_payload,
+                              encode_frame, read_frame, write_frame)
+from model_service import handle_request
+from ai_explainer_v2 import ModelServiceAPI
+
+MESSAGE = {
+    'ids': ['A001', 'C002', 'Ü-3'],
+    'scores': np.array([0.9, 0.5, 0.25]),
+    'same_cluster': np.array([True, False, True]),
+    'fields': ['function', 'symbolism'],
+    'field_scores': np.arange(6, dtype=np.float32).reshape(3, 2),
+    'nested': [{'empty': np.zeros(0, dtype=np.int64)}, np.float64(1.5), None, 'text'],
+}
+
+
+def assert_same_message(decoded, expected):
+    assert decoded.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, np.ndarray):
+            assert decoded[key].dtype == value.dtype and np.array_equal(decoded[key], value)
+    assert decoded['ids'] == expected['ids']
+    assert decoded['nested'][0]['empty'].shape == (0,)
+    assert decoded['nested'][1:] == [1.5, None, 'text']
+
+
+def test_frame_round_trip():
+    frame = encode_frame(MESSAGE)
+    assert_same_message(decode_payload(frame[4:]), MESSAGE)
+    stream = io.BytesIO()
+    write_frame(stream, MESSAGE)
+    assert stream.getvalue() == frame
+    stream.seek(0)
+    assert_same_message(read_frame(stream), MESSAGE)
+    assert read_frame(io.BytesIO(frame[:-1])) is None
+    assert read_frame(io.BytesIO(b'')) is None
+
+
+def test_json_fallback_without_msgpack():
+    with mock.patch.object(service_protocol, 'msgpack', None):
+        frame = encode_frame(MESSAGE)
+        assert frame[4] == service_protocol.CODEC_JSON
+        assert_same_message(decode_payload(frame[4:]), MESSAGE)
+    if service_protocol.msgpack is not None:
+        msgpack_frame = encode_frame(MESSAGE)
+        with mock.patch.object(service_protocol, 'msgpack', None):
+            try:
+                decode_payload(msgpack_frame[4:])
+                assert False, "msgpack frame decoded without msgpack"
+            except ProtocolError:
+                pass
+
+
+def test_bad_frames_raise_protocol_error():
+    for payload in (b'', b'\x07\x00\x00\x00\x00'):
+        try:
+            decode_payload(payload)
+            assert False, payload
+        except ProtocolError:
+            pass
+    oversized = (MAX_FRAME_SIZE + 1).to_bytes(4, 'big')
+    try:
+        read_frame(io.BytesIO(oversized))
+        assert False, "oversized frame accepted"
+    except ProtocolError:
+        pass
+
+
+def test_frame_reader_over_pipe():
+    read_fd, write_fd = os.pipe()
+    try:
+        reader = FrameReader(read_fd)
+        first, second = encode_frame({'n': 1}), encode_frame(MESSAGE)
+
+        def writer():
+            # Frames split across writes, and two frames in one write
+            data = first + second
+            for cut in (3, 9, len(first) + 5):
+                os.write(write_fd, data[:cut])
+                data = data[cut:]
+                time.sleep(0.01)
+            os.write(write_fd, data + first)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        assert reader.read(timeout=5) == {'n': 1}
+        assert_same_message(reader.read(timeout=5), MESSAGE)
+        assert reader.read(timeout=5) == {'n': 1}
+        thread.join()
+
+        start = time.monotonic()
+        try:
+            reader.read(timeout=0.2)
+            assert False, "read() returned without a frame"
+        except TimeoutError:
+            pass
+        assert time.monotonic() - start < 2
+
+        os.write(write_fd, first[:5])
+        os.close(write_fd)
+        write_fd = None
+        assert reader.read(timeout=5) is None
+    finally:
+        os.close(read_fd)
+        if write_fd is not None:
+            os.close(write_fd)
+
+
+class StubModel:
+    """Records the calls handle_request makes"""
+
+    def __init__(self):
+        self.calls = []
+
+    def find_similar(self, artifact_id, top_k, n_probe=None):
+        self.calls.append(('find_similar', artifact_id, top_k, n_probe))
+        return [{'id': 'B', 'similarity_score': 0.8, 'same_cluster': True, 'name': 'x'},
+                {'id': 'C', 'similarity_score': 0.4, 'same_cluster': False, 'name': 'y'}][:top_k]
+
+    def find_similar_by_fields(self, artifact_id, field_weights, top_k):
+        self.calls.append(('find_similar_by_fields', artifact_id, field_weights, top_k))
+        return [{'id': 'C', 'similarity_score': 0.7,
+                 'field_scores': {'function': 0.9, 'symbolism': 0.2}}]
+
+    def find_similar_many(self, artifact_ids, top_k, n_probe=None):
+        self.calls.append(('find_similar_many', artifact_ids, top_k, n_probe))
+        return [self.find_similar(a, top_k) for a in artifact_ids]
+
+    def compare_artifacts(self, artifact1_id, artifact2_id):
+        return {'artifact1': {'id': artifact1_id}, 'artifact2': {'id': artifact2_id},
+                'similarity_score': 0.5, 'same_cluster': np.bool_(True)}
+
+
+def over_the_wire(result):
+    """A response as the client sees it after one frame round trip"""
+    return ModelServiceAPI._unpack_ranking(decode_payload(encode_frame(result)[4:]))
+
+
+def test_handle_request_rankings():
+    model = StubModel()
+    result = handle_request(model, 'similar', {'artifact_id': 'A', 'top_k': 2, 'n_probe': 4})
+    assert model.calls[-1] == ('find_similar', 'A', 2, 4)
+    assert over_the_wire(result) == [
+        {'id': 'B', 'similarity_score': 0.8, 'same_cluster': True},
+        {'id': 'C', 'similarity_score': 0.4, 'same_cluster': False},
+    ]
+
+    weights = {'function': 1.0, 'symbolism': 0.5}
+    result = handle_request(model, 'similar', {'artifact_id': 'A', 'top_k': 1,
+                                               'field_weights': weights})
+    assert model.calls[-1] == ('find_similar_by_fields', 'A', weights, 1)
+    assert over_the_wire(result) == [{'id': 'C', 'similarity_score': 0.7,
+                                      'field_scores': {'function': 0.9, 'symbolism': 0.2}}]
+
+    results = handle_request(model, 'similar_many', {'artifact_ids': ['A', 'D'], 'top_k': 1})
+    assert ('find_similar_many', ['A', 'D'], 1, None) in model.calls
+    assert [over_the_wire(r) for r in results] == [
+        [{'id': 'B', 'similarity_score': 0.8, 'same_cluster': True}]] * 2
+
+    result = handle_request(model, 'compare', {'artifact1_id': 'A', 'artifact2_id': 'B'})
+    assert result == {'artifact1_id': 'A', 'artifact2_id': 'B', 'similarity_score': 0.5,
+                      'same_cluster': True, 'source': 'trained_model'}
+    json.dumps(result)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
@@ -1,14 +1,10 @@
-import json
-from pathlib import Path
 from transformers import T5ForConditionalGeneration, T5Tokenizer, Trainer, TrainingArguments
 import torch
 
-# 1. Load artifact metadata
-data_path = Path('trained_model/artifact_metadata.json')
-with open(data_path, 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from artifact_store import model_version_dir, read_artifacts
 
-artifacts = data['artifacts']
+# 1. Load artifact metadata
+artifacts = read_artifacts(model_version_dir('trained_model'))
 
 # 2. Prepare dataset: concatenate all fields as input, use a structured explanation as target
 examples = []